@@ -0,0 +1,137 @@
+"""
+SafeZoneX Active Learning Sampler
+Ranks unlabeled reports by model uncertainty and exports a diverse batch for moderators to label
+"""
+import argparse
+import heapq
+import json
+import time
+
+import joblib
+import numpy as np
+from sklearn.preprocessing import normalize
+
+from alerts_export import iter_alerts, iter_chunks, alert_label
+
+MODEL_PATH = 'safety_report_classifier_high_accuracy.pkl'
+VECTORIZER_PATH = 'tfidf_vectorizer_high_accuracy.pkl'
+OUTPUT_PATH = 'labelling_batch.jsonl'
+
+STRATEGIES = ('margin', 'entropy', 'disagreement', 'combined')
+# Reports at least this cosine-similar to an already selected one are skipped
+SIMILARITY_THRESHOLD = 0.8
+# Candidates kept per requested report before diversity selection
+POOL_FACTOR = 20
+
+def member_probabilities(model, X, real_index):
+    """(members, n) real-class probabilities of a soft VotingClassifier, or (1, n) for a single model"""
+    if hasattr(model, 'estimators_') and getattr(model, 'voting', None) == 'soft':
+        return np.stack([est.predict_proba(X)[:, real_index] for est in model.estimators_])
+    return model.predict_proba(X)[:, real_index][None]
+
+def uncertainty(members, weights=None, p=None):
+    """Margin, entropy and member disagreement, each scaled to [0, 1] with 1 most uncertain.
+
+    p is the probability the model serves; without it the weighted member average is used.
+    """
+    if p is None:
+        p = np.average(members, axis=0, weights=weights)
+    q = np.clip(p, 1e-12, 1 - 1e-12)
+    scores = {
+        'realProbability': p,
+        'margin': 1 - np.abs(2 * p - 1),
+        'entropy': -(q * np.log2(q) + (1 - q) * np.log2(1 - q)),
+        # A member spread of 0.5 is the most two probabilities in [0, 1] can disagree
+        'disagreement': np.minimum(members.std(axis=0) / 0.5, 1.0)
+    }
+    scores['combined'] = (scores['margin'] + scores['entropy'] + scores['disagreement']) / 3
+    return scores
+
+def select_diverse(vectorizer, pool, n, threshold=SIMILARITY_THRESHOLD):
+    """Greedy highest-score-first selection skipping near-duplicates of earlier picks"""
+    pool = sorted(pool, key=lambda item: -item[0])
+    X = normalize(vectorizer.transform([item[2]['description'] for item in pool]), norm='l2').tocsr()
+
+    # One sparse similarity row per pick keeps memory linear in the pool size
+    blocked = np.zeros(len(pool), dtype=bool)
+    selected = []
+    for i in range(len(pool)):
+        if blocked[i]:
+            continue
+        selected.append(pool[i][2])
+        if len(selected) == n:
+            break
+        blocked |= (X @ X[i].T).toarray().ravel() >= threshold
+    return selected
+
+def sample_backlog(alerts_path, n=100, strategy='combined', model_path=MODEL_PATH,
+                   vectorizer_path=VECTORIZER_PATH, chunk_size=5000, threshold=SIMILARITY_THRESHOLD):
+    """Stream unlabeled alerts in chunks; memory is bounded by chunk_size plus n * POOL_FACTOR candidates"""
+    model = joblib.load(model_path)
+    vectorizer = joblib.load(vectorizer_path)
+    real_index = list(model.classes_).index('real')
+    weights = getattr(model, 'weights', None)
+
+    pool_size = n * POOL_FACTOR
+    pool, seen = [], set()
+    scored = 0
+    start = time.perf_counter()
+
+    for chunk in iter_chunks((a for a in iter_alerts(alerts_path) if alert_label(a) is None), chunk_size):
+        texts = [alert.get('description') or '' for alert in chunk]
+        X = vectorizer.transform(texts)
+        # Members' raw probabilities only measure disagreement; margin, entropy and
+        # realProbability use the calibrated probability inference serves
+        scores = uncertainty(member_probabilities(model, X, real_index), weights,
+                             model.predict_proba(X)[:, real_index])
+        ranking = scores[strategy]
+        scored += len(chunk)
+
+        # Only the chunk's best pool_size reports can enter the pool
+        top = np.argpartition(-ranking, min(pool_size, len(chunk)) - 1)[:pool_size]
+        for i in top.tolist():
+            text = texts[i].strip().lower()
+            if not text or text in seen:
+                continue
+            candidate = (float(ranking[i]), scored - len(chunk) + i, {
+                'alertId': chunk[i].get('alertId'),
+                'description': texts[i],
+                'alertType': chunk[i].get('alertType'),
+                'score': round(float(ranking[i]), 4),
+                **{name: round(float(scores[name][i]), 4)
+                   for name in ('realProbability', 'margin', 'entropy', 'disagreement')}
+            })
+            if len(pool) < pool_size:
+                heapq.heappush(pool, candidate)
+            elif candidate[0] > pool[0][0]:
+                seen.discard(heapq.heapreplace(pool, candidate)[2]['description'].strip().lower())
+            else:
+                continue
+            seen.add(text)
+
+    elapsed = time.perf_counter() - start
+    print(f"📊 Scored {scored} unlabeled reports in {elapsed:.1f}s "
+          f"({scored / max(elapsed, 1e-9):.0f} reports/sec)")
+    return select_diverse(vectorizer, pool, n, threshold) if pool else []
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the most informative unlabeled reports for labelling')
+    parser.add_argument('alerts', help='Alerts export (JSONL or .bson); moderated alerts are skipped')
+    parser.add_argument('--n', type=int, default=100)
+    parser.add_argument('--strategy', choices=STRATEGIES, default='combined')
+    parser.add_argument('--similarity', type=float, default=SIMILARITY_THRESHOLD)
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--vectorizer', default=VECTORIZER_PATH)
+    parser.add_argument('--out', default=OUTPUT_PATH)
+    args = parser.parse_args()
+
+    selected = sample_backlog(args.alerts, args.n, args.strategy, args.model, args.vectorizer,
+                              args.chunk_size, args.similarity)
+    with open(args.out, 'w') as f:
+        for report in selected:
+            f.write(json.dumps(report) + '\n')
+    print(f"✅ {len(selected)} reports for labelling saved to {args.out}")
+
+if __name__ == "__main__":
+    main()
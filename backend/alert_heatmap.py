@@ -0,0 +1,203 @@
+"""
+SafeZoneX Alert Heatmap Tiles
+Per-campus slippy-map tile counts by category and priority, maintained incrementally
+"""
+import argparse
+import json
+import math
+
+import joblib
+import numpy as np
+
+from alerts_export import ALERT_TYPES, PRIORITIES, DEFAULT_CAMPUS, iter_alerts, iter_chunks, alert_columns
+
+HEATMAP_PATH = 'alert_heatmap.pkl'
+
+# Campus-scale zoom levels: ~2.4 km tiles at 14 down to ~150 m tiles at 18
+ZOOM_LEVELS = (14, 15, 16, 17, 18)
+MAX_QUERY_TILES = 1024
+
+N_COLUMNS = len(ALERT_TYPES) + len(PRIORITIES)
+
+def tile_xy(latitude, longitude, zoom):
+    """Web Mercator tile coordinates; works on scalars and NumPy arrays"""
+    n = 2 ** zoom
+    lat = np.radians(np.clip(latitude, -85.05112878, 85.05112878))
+    x = np.floor((np.asarray(longitude) + 180.0) / 360.0 * n)
+    y = np.floor((1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / math.pi) / 2.0 * n)
+    return np.clip(x, 0, n - 1).astype(np.int64), np.clip(y, 0, n - 1).astype(np.int64)
+
+def tile_bounds(x, y, zoom):
+    """(south, west, north, east) of a tile"""
+    n = 2 ** zoom
+    def lat(ty):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * ty / n))))
+    return lat(y + 1), x / n * 360.0 - 180.0, lat(y), (x + 1) / n * 360.0 - 180.0
+
+class TileGrid:
+    """Occupied tiles of one campus at one zoom level, with a row of counts per tile"""
+
+    def __init__(self, zoom):
+        self.zoom = zoom
+        self.rows = {}
+        self.xs = np.zeros(16, dtype=np.int64)
+        self.ys = np.zeros(16, dtype=np.int64)
+        self.counts = np.zeros((16, N_COLUMNS), dtype=np.int32)
+
+    def _grow(self, needed):
+        capacity = len(self.xs)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        self.xs = np.resize(self.xs, capacity)
+        self.ys = np.resize(self.ys, capacity)
+        counts = np.zeros((capacity, N_COLUMNS), dtype=np.int32)
+        counts[:len(self.counts)] = self.counts
+        self.counts = counts
+
+    def row(self, x, y):
+        row = self.rows.get((x, y))
+        if row is None:
+            row = len(self.rows)
+            self._grow(row + 1)
+            self.rows[(x, y)] = row
+            self.xs[row], self.ys[row] = x, y
+        return row
+
+    def add(self, x, y, type_index, priority_index):
+        row = self.row(x, y)
+        self.counts[row, type_index] += 1
+        self.counts[row, len(ALERT_TYPES) + priority_index] += 1
+
+    def add_many(self, xs, ys, types, priorities):
+        # Python work is per distinct tile; per-alert work stays in NumPy
+        keys = np.stack([xs, ys], axis=1)
+        unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+        tile_rows = np.array([self.row(int(x), int(y)) for x, y in unique], dtype=np.int64)
+        rows = tile_rows[inverse.ravel()]
+        np.add.at(self.counts, (rows, types), 1)
+        np.add.at(self.counts, (rows, len(ALERT_TYPES) + priorities), 1)
+
+    def query(self, x0, x1, y0, y1):
+        used = len(self.rows)
+        mask = ((self.xs[:used] >= x0) & (self.xs[:used] <= x1) &
+                (self.ys[:used] >= y0) & (self.ys[:used] <= y1))
+        rows = np.flatnonzero(mask)
+        return self.xs[rows], self.ys[rows], self.counts[rows]
+
+class AlertHeatmap:
+    """Tile counts per (campus, zoom); O(zoom levels) per new alert"""
+
+    def __init__(self, zoom_levels=ZOOM_LEVELS):
+        self.zoom_levels = tuple(zoom_levels)
+        self.grids = {}
+        self.total = 0
+
+    def _grid(self, campus, zoom):
+        grid = self.grids.get((campus, zoom))
+        if grid is None:
+            grid = self.grids[(campus, zoom)] = TileGrid(zoom)
+        return grid
+
+    def add_alert(self, alert):
+        """Count one new Alert document"""
+        columns = alert_columns([alert])
+        if np.isnan(columns['latitude'][0]) or np.isnan(columns['longitude'][0]):
+            return
+        campus = columns['campus'][0]
+        for zoom in self.zoom_levels:
+            x, y = tile_xy(columns['latitude'][0], columns['longitude'][0], zoom)
+            self._grid(campus, zoom).add(int(x), int(y), int(columns['alertType'][0]),
+                                         int(columns['priority'][0]))
+        self.total += 1
+
+    def add_columns(self, columns):
+        """Vectorized bulk update from alert_columns() output"""
+        valid = ~(np.isnan(columns['latitude']) | np.isnan(columns['longitude']))
+        campuses = np.asarray(columns['campus'], dtype=object)
+        for campus in set(campuses[valid]):
+            mask = valid & (campuses == campus)
+            lat, lon = columns['latitude'][mask], columns['longitude'][mask]
+            types = columns['alertType'][mask].astype(np.int64)
+            priorities = columns['priority'][mask].astype(np.int64)
+            for zoom in self.zoom_levels:
+                xs, ys = tile_xy(lat, lon, zoom)
+                self._grid(campus, zoom).add_many(xs, ys, types, priorities)
+        self.total += int(valid.sum())
+
+    @classmethod
+    def rebuild(cls, alerts_path, zoom_levels=ZOOM_LEVELS, chunk_size=50000):
+        heatmap = cls(zoom_levels)
+        for chunk in iter_chunks(iter_alerts(alerts_path), chunk_size):
+            heatmap.add_columns(alert_columns(chunk))
+        return heatmap
+
+    def pick_zoom(self, south, west, north, east, max_tiles=MAX_QUERY_TILES):
+        """Finest zoom at which the bounding box spans at most max_tiles tiles"""
+        for zoom in sorted(self.zoom_levels, reverse=True):
+            x0, y1 = tile_xy(south, west, zoom)
+            x1, y0 = tile_xy(north, east, zoom)
+            if (x1 - x0 + 1) * (y1 - y0 + 1) <= max_tiles:
+                return zoom
+        return min(self.zoom_levels)
+
+    def query(self, south, west, north, east, campus=DEFAULT_CAMPUS, zoom=None):
+        """Heatmap cells inside a bounding box, read straight from the precomputed tiles"""
+        zoom = zoom if zoom is not None else self.pick_zoom(south, west, north, east)
+        grid = self.grids.get((campus, zoom))
+        if grid is None:
+            return {'zoom': zoom, 'campus': campus, 'cells': []}
+
+        x0, y1 = tile_xy(south, west, zoom)
+        x1, y0 = tile_xy(north, east, zoom)
+        xs, ys, counts = grid.query(int(x0), int(x1), int(y0), int(y1))
+
+        cells = []
+        for x, y, row in zip(xs, ys, counts):
+            s, w, n, e = tile_bounds(int(x), int(y), zoom)
+            by_type = row[:len(ALERT_TYPES)]
+            cells.append({
+                'tile': [zoom, int(x), int(y)],
+                'center': [(s + n) / 2, (w + e) / 2],
+                'bounds': [s, w, n, e],
+                'total': int(by_type.sum()),
+                'byCategory': {t: int(c) for t, c in zip(ALERT_TYPES, by_type) if c},
+                'byPriority': {p: int(c) for p, c in zip(PRIORITIES, row[len(ALERT_TYPES):]) if c},
+            })
+        return {'zoom': zoom, 'campus': campus, 'cells': cells}
+
+    def save(self, path=HEATMAP_PATH):
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path=HEATMAP_PATH):
+        return joblib.load(path)
+
+def main():
+    parser = argparse.ArgumentParser(description='Alert heatmap tiles')
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help='Rebuild tiles from an alerts export')
+    build.add_argument('alerts')
+    build.add_argument('--out', default=HEATMAP_PATH)
+    query = sub.add_parser('query', help='Heatmap cells for a bounding box (JSON)')
+    query.add_argument('south', type=float)
+    query.add_argument('west', type=float)
+    query.add_argument('north', type=float)
+    query.add_argument('east', type=float)
+    query.add_argument('--campus', default=DEFAULT_CAMPUS)
+    query.add_argument('--zoom', type=int)
+    query.add_argument('--heatmap', default=HEATMAP_PATH)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        heatmap = AlertHeatmap.rebuild(args.alerts)
+        heatmap.save(args.out)
+        print(f"✅ {heatmap.total} alerts in {len(heatmap.grids)} campus/zoom grids saved to {args.out}")
+        return
+
+    heatmap = AlertHeatmap.load(args.heatmap)
+    print(json.dumps(heatmap.query(args.south, args.west, args.north, args.east, args.campus, args.zoom)))
+
+if __name__ == "__main__":
+    main()
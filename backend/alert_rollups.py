@@ -0,0 +1,279 @@
+"""
+SafeZoneX Alert Rollups
+Materialized time x zone x category/priority counters for dashboard trend views
+"""
+import argparse
+import json
+import time
+
+import joblib
+import numpy as np
+
+from alerts_export import ALERT_TYPES, PRIORITIES, iter_alerts, iter_chunks, alert_columns
+from alert_heatmap import tile_xy
+
+ROLLUPS_PATH = 'alert_rollups.pkl'
+
+HOUR = 3600
+DAY = 24 * HOUR
+# Hourly buckets older than this are compacted into daily buckets
+HOURLY_RETENTION_DAYS = 30
+# Campus zones are heatmap tiles at this zoom (~300 m across)
+ZONE_ZOOM = 17
+
+COLUMNS = ALERT_TYPES + PRIORITIES
+COLUMN_INDEX = {name: i for i, name in enumerate(COLUMNS)}
+
+class RollupTier:
+    """Cumulative counts over consecutive buckets of one width.
+
+    cum[i] holds the counts of every bucket before origin + i, so the sum
+    over any bucket range is cum[end] - cum[start] whatever the history length.
+    cum is a view into a buffer whose bucket and zone capacity double as they
+    fill, so streaming in a new hour or zone is amortized O(1).
+    """
+
+    def __init__(self, bucket_seconds, n_zones=1):
+        self.bucket_seconds = bucket_seconds
+        self.origin = None
+        self.buffer = np.zeros((1, n_zones, len(COLUMNS)), dtype=np.int64)
+        self.rows = 1
+        self.n_zones = n_zones
+
+    def __setstate__(self, state):
+        # Rollups pickled before the growable buffer stored cum directly
+        if 'cum' in state:
+            cum = state.pop('cum')
+            state.update(buffer=cum, rows=len(cum), n_zones=cum.shape[1])
+        self.__dict__.update(state)
+
+    @property
+    def cum(self):
+        return self.buffer[:self.rows, :self.n_zones]
+
+    @property
+    def end(self):
+        return (self.origin or 0) + self.rows - 1
+
+    def bucket_of(self, timestamps):
+        return np.floor_divide(np.asarray(timestamps, dtype=np.float64), self.bucket_seconds).astype(np.int64)
+
+    def _reserve(self, rows, n_zones, lead=0):
+        """Make room for rows buckets and n_zones zones, shifting existing rows down by lead"""
+        capacity, zone_capacity = self.buffer.shape[:2]
+        if lead or rows > capacity or n_zones > zone_capacity:
+            if rows > capacity:
+                capacity = max(rows, 2 * capacity)
+            if n_zones > zone_capacity:
+                zone_capacity = max(n_zones, 2 * zone_capacity)
+            buffer = np.zeros((capacity, zone_capacity, len(COLUMNS)), dtype=np.int64)
+            buffer[lead:lead + self.rows, :self.n_zones] = self.cum
+            self.buffer = buffer
+        self.n_zones = max(self.n_zones, n_zones)
+
+    def ensure(self, first, last, n_zones):
+        """Cover buckets [first, last] and n_zones zones"""
+        n_zones = max(n_zones, self.n_zones)
+        if self.origin is None:
+            self.origin = first
+            self.rows = 0
+            self._reserve(last - first + 2, n_zones)
+            self.buffer[:last - first + 2] = 0
+            self.rows = last - first + 2
+            return
+        lead = max(self.origin - first, 0)
+        tail = max(last - self.end + 1, 0)
+        # Earlier buckets are empty, so existing prefix sums stay valid when shifted down
+        self._reserve(lead + self.rows + tail, n_zones, lead)
+        if lead:
+            self.origin = first
+            self.rows += lead
+        if tail:
+            self.buffer[self.rows:self.rows + tail, :self.n_zones] = self.cum[-1]
+            self.rows += tail
+
+    def add(self, bucket, zone, columns):
+        # New reports land in the latest bucket, so this touches O(1) rows
+        self.ensure(bucket, bucket, zone + 1)
+        self.cum[bucket - self.origin + 1:, zone, columns] += 1
+
+    def add_counts(self, first_bucket, counts):
+        """Add per-bucket counts (buckets, zones, columns) starting at first_bucket"""
+        self.ensure(first_bucket, first_bucket + len(counts) - 1, counts.shape[1])
+        start = first_bucket - self.origin + 1
+        running = np.cumsum(counts, axis=0)
+        cum = self.cum
+        cum[start:start + len(counts), :counts.shape[1]] += running
+        cum[start + len(counts):, :counts.shape[1]] += running[-1]
+
+    def range_counts(self, first, last):
+        """(zones, columns) totals for buckets [first, last], clipped to this tier"""
+        if self.origin is None:
+            return np.zeros(self.cum.shape[1:], dtype=np.int64)
+        lo = min(max(first, self.origin), self.end) - self.origin
+        hi = min(max(last + 1, self.origin), self.end) - self.origin
+        return self.cum[hi] - self.cum[lo]
+
+    def bucket_counts(self, first, last):
+        """Per-bucket (buckets, zones, columns) counts for [first, last] within this tier"""
+        if self.origin is None:
+            return np.zeros((0,) + self.cum.shape[1:], dtype=np.int64)
+        lo = max(first, self.origin) - self.origin
+        hi = min(last + 1, self.end) - self.origin
+        if hi <= lo:
+            return np.zeros((0,) + self.cum.shape[1:], dtype=np.int64)
+        return np.diff(self.cum[lo:hi + 1], axis=0)
+
+    def drop_before(self, bucket):
+        """Forget buckets before bucket, returning their per-bucket counts"""
+        if self.origin is None or bucket <= self.origin:
+            return self.origin, np.zeros((0,) + self.cum.shape[1:], dtype=np.int64)
+        cut = min(bucket, self.end) - self.origin
+        dropped = np.diff(self.cum[:cut + 1], axis=0)
+        first = self.origin
+        kept = self.cum[cut:] - self.cum[cut]
+        self.buffer[:len(kept), :self.n_zones] = kept
+        self.rows = len(kept)
+        self.origin += cut
+        return first, dropped
+
+class AlertRollups:
+    """Hourly tier for recent history plus a compacted daily tier for older history"""
+
+    def __init__(self, hourly_retention_days=HOURLY_RETENTION_DAYS):
+        self.hourly_retention_days = hourly_retention_days
+        self.hourly = RollupTier(HOUR)
+        self.daily = RollupTier(DAY)
+        self.zones = {}
+
+    def zone_ids(self, campuses, latitudes, longitudes):
+        xs, ys = tile_xy(np.nan_to_num(latitudes), np.nan_to_num(longitudes), ZONE_ZOOM)
+        ids = np.empty(len(campuses), dtype=np.int64)
+        for i, key in enumerate(zip(campuses, xs.tolist(), ys.tolist())):
+            ids[i] = self.zones.setdefault(key, len(self.zones))
+        return ids
+
+    def hourly_start(self, now=None):
+        """Epoch seconds where hourly buckets begin; anything older is counted per day"""
+        now = time.time() if now is None else now
+        return (int(now // DAY) - self.hourly_retention_days) * DAY
+
+    def add_alert(self, alert, now=None):
+        """Count one new Alert in amortized O(1), compacting hours that aged out"""
+        columns = alert_columns([alert])
+        timestamp = columns['createdAt'][0]
+        if np.isnan(timestamp):
+            return
+        zone = int(self.zone_ids(columns['campus'], columns['latitude'], columns['longitude'])[0])
+        tier = self.daily if timestamp < self.hourly_start(now) else self.hourly
+        targets = [int(columns['alertType'][0]), len(ALERT_TYPES) + int(columns['priority'][0])]
+        tier.add(int(tier.bucket_of(timestamp)), zone, targets)
+        self.compact(now)
+
+    def add_columns(self, columns, now=None):
+        """Vectorized group-by of a chunk of alert_columns() output into both tiers"""
+        valid = ~np.isnan(columns['createdAt'])
+        if not valid.any():
+            return
+        campuses = np.asarray(columns['campus'], dtype=object)[valid]
+        zones = self.zone_ids(campuses, columns['latitude'][valid], columns['longitude'][valid])
+        timestamps = columns['createdAt'][valid]
+        types = columns['alertType'][valid].astype(np.int64)
+        priorities = columns['priority'][valid].astype(np.int64) + len(ALERT_TYPES)
+
+        in_daily = timestamps < self.hourly_start(now)
+        for tier, mask in ((self.hourly, ~in_daily), (self.daily, in_daily)):
+            if not mask.any():
+                continue
+            buckets = tier.bucket_of(timestamps[mask])
+            first = int(buckets.min())
+            counts = np.zeros((int(buckets.max()) - first + 1, len(self.zones), len(COLUMNS)), dtype=np.int64)
+            np.add.at(counts, (buckets - first, zones[mask], types[mask]), 1)
+            np.add.at(counts, (buckets - first, zones[mask], priorities[mask]), 1)
+            tier.add_counts(first, counts)
+        self.compact(now)
+
+    @classmethod
+    def rebuild(cls, alerts_path, chunk_size=50000, now=None):
+        rollups = cls()
+        for chunk in iter_chunks(iter_alerts(alerts_path), chunk_size):
+            rollups.add_columns(alert_columns(chunk), now)
+        return rollups
+
+    def compact(self, now=None):
+        """Move whole days that left the hourly retention window into the daily tier.
+
+        Runs after every ingest; a no-op until the window has moved past the hourly tier's origin.
+        """
+        first_hour, hourly_counts = self.hourly.drop_before(self.hourly_start(now) // HOUR)
+        if not len(hourly_counts):
+            return
+        # Pad to whole days, then fold 24 hourly rows into each daily row
+        lead = first_hour % 24
+        padded = np.concatenate([np.zeros((lead,) + hourly_counts.shape[1:], dtype=np.int64), hourly_counts])
+        tail = (-len(padded)) % 24
+        padded = np.concatenate([padded, np.zeros((tail,) + padded.shape[1:], dtype=np.int64)])
+        daily_counts = padded.reshape(-1, 24, *padded.shape[1:]).sum(axis=1)
+        self.daily.add_counts((first_hour - lead) // 24, daily_counts)
+
+    def query(self, start, end):
+        """(zones, columns) counts for [start, end) in epoch seconds, independent of history size.
+
+        Ranges reaching into the compacted daily tier are widened to whole days there.
+        """
+        counts = np.zeros((len(self.zones), len(COLUMNS)), dtype=np.int64)
+        for tier in (self.daily, self.hourly):
+            partial = tier.range_counts(int(tier.bucket_of(start)), int(tier.bucket_of(end - 1)))
+            counts[:partial.shape[0]] += partial
+        return counts
+
+    def by_zone(self, start, end, column):
+        """{'campus x/y': count} for one alertType or priority, e.g. 'Harassment'"""
+        counts = self.query(start, end)[:, COLUMN_INDEX[column]]
+        return {f"{campus} {x}/{y}": int(counts[zone_id])
+                for (campus, x, y), zone_id in self.zones.items() if counts[zone_id]}
+
+    def hourly_series(self, start, end, column):
+        """Per-hour counts of one column across all zones within the hourly tier"""
+        counts = self.hourly.bucket_counts(int(start // HOUR), int((end - 1) // HOUR))
+        return counts[:, :, COLUMN_INDEX[column]].sum(axis=1)
+
+    def save(self, path=ROLLUPS_PATH):
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path=ROLLUPS_PATH):
+        return joblib.load(path)
+
+def main():
+    parser = argparse.ArgumentParser(description='Alert rollup cube for dashboard analytics')
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help='Rebuild rollups from an alerts export')
+    build.add_argument('alerts')
+    build.add_argument('--out', default=ROLLUPS_PATH)
+    query = sub.add_parser('query', help='Counts per zone for one category or priority')
+    query.add_argument('column', choices=COLUMNS)
+    query.add_argument('--days', type=float, default=7)
+    query.add_argument('--rollups', default=ROLLUPS_PATH)
+    compact = sub.add_parser('compact', help='Fold hours past the retention window into days')
+    compact.add_argument('--rollups', default=ROLLUPS_PATH)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        rollups = AlertRollups.rebuild(args.alerts)
+        rollups.save(args.out)
+        print(f"✅ Rollups over {len(rollups.zones)} zones saved to {args.out}")
+        return
+
+    rollups = AlertRollups.load(args.rollups)
+    if args.command == 'compact':
+        hours = len(rollups.hourly.cum) - 1
+        rollups.compact()
+        rollups.save(args.rollups)
+        print(f"✅ Compacted {hours - (len(rollups.hourly.cum) - 1)} hourly buckets into daily rollups")
+        return
+    now = time.time()
+    print(json.dumps(rollups.by_zone(now - args.days * DAY, now, args.column), indent=2))
+
+if __name__ == "__main__":
+    main()
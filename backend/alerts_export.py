@@ -0,0 +1,94 @@
+"""
+SafeZoneX Alerts Export Reader
+Streams Alert documents from an exported alerts file (JSONL, or a mongodump .bson file)
+"""
+import json
+from datetime import datetime, timezone
+
+import numpy as np
+
+# Alert.alertType and Alert.priority enums in models/Alert.js
+ALERT_TYPES = [
+    'Suspicious Person', 'Theft/Robbery', 'Vandalism', 'Drug Activity',
+    'Harassment', 'Safety Hazard', 'Unauthorized Access', 'Other'
+]
+PRIORITIES = ['low', 'medium', 'high', 'critical']
+DEFAULT_CAMPUS = 'University Malaya'
+
+# Moderation outcomes stored on Alert.status, mapped onto the trainers' labels
+REAL_STATUSES = {'verified', 'resolved', 'real'}
+FAKE_STATUSES = {'false_alarm'}
+
+def iter_alerts(path):
+    """Yield Alert documents from a JSONL export or a BSON dump, skipping blank lines"""
+    if path.endswith('.bson'):
+        yield from _iter_bson(path)
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+def _iter_bson(path):
+    try:
+        import bson
+    except ImportError:
+        raise ImportError("Reading .bson dumps needs the 'bson' module from pymongo (pip install pymongo)")
+    with open(path, 'rb') as f:
+        yield from bson.decode_file_iter(f)
+
+def iter_chunks(alerts, chunk_size):
+    """Group a document stream into lists of at most chunk_size"""
+    chunk = []
+    for alert in alerts:
+        chunk.append(alert)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def alert_label(alert):
+    """Return 'real'/'fake' for moderated alerts, None when not yet moderated"""
+    status = alert.get('status')
+    if status in REAL_STATUSES:
+        return 'real'
+    if status in FAKE_STATUSES:
+        return 'fake'
+    return None
+
+def alert_timestamp(value):
+    """Epoch seconds for createdAt as stored by mongoose, mongoexport or a BSON dump"""
+    if isinstance(value, dict):
+        value = value.get('$date', value.get('$numberLong'))
+        if isinstance(value, dict):
+            value = int(value['$numberLong'])
+    if isinstance(value, (int, float)):
+        return value / 1000.0  # Mongo stores milliseconds
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    return float('nan')
+
+def alert_columns(alerts):
+    """Columnar NumPy view of the fields the analytics modules aggregate on"""
+    alerts = list(alerts)
+    type_index = {name: i for i, name in enumerate(ALERT_TYPES)}
+    priority_index = {name: i for i, name in enumerate(PRIORITIES)}
+    locations = [alert.get('location') or {} for alert in alerts]
+    return {
+        'alertId': [alert.get('alertId') for alert in alerts],
+        'userId': [alert.get('userId') for alert in alerts],
+        'campus': [loc.get('campus') or DEFAULT_CAMPUS for loc in locations],
+        'latitude': np.array([loc.get('latitude', np.nan) for loc in locations], dtype=np.float64),
+        'longitude': np.array([loc.get('longitude', np.nan) for loc in locations], dtype=np.float64),
+        'alertType': np.array([type_index.get(alert.get('alertType'), type_index['Other'])
+                               for alert in alerts], dtype=np.int16),
+        'priority': np.array([priority_index.get(alert.get('priority'), priority_index['medium'])
+                              for alert in alerts], dtype=np.int16),
+        'createdAt': np.array([alert_timestamp(alert.get('createdAt')) for alert in alerts], dtype=np.float64),
+    }
@@ -0,0 +1,126 @@
+"""
+SafeZoneX Bootstrap Metrics
+Vectorized bootstrap confidence intervals and paired model comparisons for classifier metrics
+"""
+import numpy as np
+from joblib import Parallel, delayed
+
+N_RESAMPLES = 10000
+CONFIDENCE = 0.95
+BLOCK_SIZE = 500
+
+def _block_counts(n, size, seed):
+    """(size, n) resample multiplicities from a (size, n) bootstrap index matrix"""
+    rng = np.random.default_rng(seed)
+    idx = rng.integers(0, n, size=(size, n), dtype=np.int64)
+    idx += np.arange(size, dtype=np.int64)[:, None] * n
+    return np.bincount(idx.ravel(), minlength=size * n).reshape(size, n).astype(np.float64)
+
+def _metric_indicators(y_true, y_pred, labels):
+    """Per-example 0/1 columns whose resample-weighted sums give every metric's counts"""
+    columns = {'correct': y_true == y_pred}
+    for label in labels:
+        columns[f'tp_{label}'] = (y_true == label) & (y_pred == label)
+        columns[f'pred_{label}'] = y_pred == label
+        columns[f'true_{label}'] = y_true == label
+    names = list(columns)
+    return names, np.stack([columns[name] for name in names], axis=1).astype(np.float64)
+
+def _metrics_from_counts(counts, names, n, labels):
+    """{metric: values} from weighted indicator sums; undefined ratios are NaN"""
+    col = {name: counts[..., i] for i, name in enumerate(names)}
+    metrics = {'accuracy': col['correct'] / n}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for label in labels:
+            tp, pred, true = col[f'tp_{label}'], col[f'pred_{label}'], col[f'true_{label}']
+            metrics[f'precision_{label}'] = np.where(pred > 0, tp / pred, np.nan)
+            metrics[f'recall_{label}'] = np.where(true > 0, tp / true, np.nan)
+            metrics[f'f1_{label}'] = np.where(pred + true > 0, 2 * tp / (pred + true), np.nan)
+    return metrics
+
+def _resample_block(indicators, size, seed):
+    # (size, n) @ (n, models * columns): one matrix product scores every model on every resample
+    return _block_counts(indicators.shape[0], size, seed) @ indicators
+
+def _interval(values, confidence):
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return None, None
+    tail = (1 - confidence) / 2 * 100
+    low, high = np.percentile(values, [tail, 100 - tail])
+    return round(float(low), 4), round(float(high), 4)
+
+def bootstrap_metrics(y_true, predictions, n_resamples=N_RESAMPLES, confidence=CONFIDENCE,
+                      seed=42, n_jobs=-1, block_size=BLOCK_SIZE):
+    """Percentile intervals per model and paired differences between every pair of models.
+
+    All models are scored on the same resamples, so pairwise deltas are paired
+    comparisons. Resample blocks run in parallel with independent seeds.
+    """
+    y_true = np.asarray(y_true)
+    labels = sorted(set(y_true.tolist()))
+    n = len(y_true)
+
+    model_names = list(predictions)
+    per_model = [_metric_indicators(y_true, np.asarray(predictions[name]), labels) for name in model_names]
+    names = per_model[0][0]
+    indicators = np.hstack([block for _, block in per_model])
+
+    sizes = [min(block_size, n_resamples - start) for start in range(0, n_resamples, block_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    blocks = Parallel(n_jobs=n_jobs)(delayed(_resample_block)(indicators, size, s) for size, s in zip(sizes, seeds))
+    counts = np.vstack(blocks).reshape(n_resamples, len(model_names), len(names))
+
+    point = np.ones((1, n))
+    samples, results = {}, {'n_resamples': n_resamples, 'confidence': confidence, 'models': {}, 'comparisons': {}}
+    for m, name in enumerate(model_names):
+        samples[name] = _metrics_from_counts(counts[:, m], names, n, labels)
+        estimates = _metrics_from_counts(point @ per_model[m][1], names, n, labels)
+        results['models'][name] = {}
+        for metric, values in samples[name].items():
+            low, high = _interval(values, confidence)
+            estimate = float(estimates[metric][0])
+            results['models'][name][metric] = {
+                'estimate': None if np.isnan(estimate) else round(estimate, 4), 'low': low, 'high': high}
+
+    for i, a in enumerate(model_names):
+        for b in model_names[i + 1:]:
+            comparison = {}
+            for metric in samples[a]:
+                delta = samples[a][metric] - samples[b][metric]
+                delta = delta[~np.isnan(delta)]
+                if not len(delta):
+                    continue
+                low, high = _interval(delta, confidence)
+                # Two-sided bootstrap p-value for "no difference"
+                p_value = min(1.0, 2 * min(float(np.mean(delta <= 0)), float(np.mean(delta >= 0))))
+                comparison[metric] = {'delta': round(float(delta.mean()), 4), 'low': low, 'high': high,
+                                      'p_value': round(p_value, 4)}
+            results['comparisons'][f'{a} vs {b}'] = comparison
+    return results
+
+def paired(results, a, b, metric):
+    """Comparison of a minus b on metric, whichever order the pair was computed in"""
+    if f'{a} vs {b}' in results['comparisons']:
+        return results['comparisons'][f'{a} vs {b}'].get(metric)
+    comparison = results['comparisons'].get(f'{b} vs {a}', {}).get(metric)
+    if comparison is None:
+        return None
+    return dict(comparison, delta=-comparison['delta'], low=-comparison['high'], high=-comparison['low'])
+
+def select_model(results, preference, metric='accuracy', alpha=0.05):
+    """First model in preference order that is not significantly worse than the best estimate.
+
+    On a test split of a few dozen reports most differences are noise, so the
+    preferred (e.g. best cross-validated) model is kept unless a paired test says
+    it is worse.
+    """
+    estimates = {name: results['models'][name][metric]['estimate'] for name in preference}
+    leader = max(preference, key=lambda name: -1 if estimates[name] is None else estimates[name])
+    for name in preference:
+        if name == leader:
+            return name
+        comparison = paired(results, leader, name, metric)
+        if comparison is None or comparison['p_value'] >= alpha:
+            return name
+    return leader
@@ -0,0 +1,166 @@
+"""
+SafeZoneX Report Burst Detector
+Fixed-memory sliding-window report rates per user, device and location cell
+"""
+import argparse
+import hashlib
+import json
+import sys
+import time
+
+import numpy as np
+
+from alerts_export import DEFAULT_CAMPUS, iter_alerts, alert_timestamp
+from alert_heatmap import tile_xy
+
+THRESHOLDS_PATH = 'burst_thresholds.json'
+
+# Location cells are heatmap tiles at this zoom (~300 m across)
+CELL_ZOOM = 17
+# Burst scores are count / threshold, capped so one runaway script does not dominate the feature
+MAX_BURST_SCORE = 4.0
+
+class WindowedCountMin:
+    """Count-min sketch over a sliding window split into ring-buffer slots.
+
+    Each slot holds its own (depth, width) counters; a slot is cleared when the
+    ring wraps onto it, so memory is fixed and an update touches depth cells.
+    """
+
+    def __init__(self, window_seconds, width=2048, depth=4, slots=6):
+        self.window_seconds = window_seconds
+        self.slot_seconds = window_seconds / slots
+        self.width = width
+        self.depth = depth
+        self.slots = slots
+        self.counts = np.zeros((slots, depth, width), dtype=np.int32)
+        self.slot_epoch = np.full(slots, -1, dtype=np.int64)
+        self.rows = np.arange(depth)
+
+    def _columns(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return np.array([(h1 + i * h2) % self.width for i in range(self.depth)], dtype=np.int64)
+
+    def add(self, key, timestamp):
+        """Count key at timestamp and return its estimated count over the window"""
+        epoch = int(timestamp // self.slot_seconds)
+        slot = epoch % self.slots
+        columns = self._columns(key)
+        if self.slot_epoch[slot] < epoch:
+            self.counts[slot] = 0
+            self.slot_epoch[slot] = epoch
+        if self.slot_epoch[slot] == epoch:
+            self.counts[slot, self.rows, columns] += 1
+        # Events older than the ring are not counted, but are still scored
+        return self._estimate(columns, epoch)
+
+    def estimate(self, key, timestamp):
+        return self._estimate(self._columns(key), int(timestamp // self.slot_seconds))
+
+    def _estimate(self, columns, epoch):
+        live = (self.slot_epoch > epoch - self.slots) & (self.slot_epoch <= epoch)
+        # Gather the key's (slots, depth) cells before masking, rather than copying every live slot
+        cells = self.counts[:, self.rows, columns]
+        return int(cells[live].sum(axis=0).min()) if live.any() else 0
+
+def report_keys(report):
+    """(dimension, key) pairs a report is counted under; device falls back to the phone number"""
+    keys = []
+    if report.get('userId'):
+        keys.append(('user', str(report['userId'])))
+    device = report.get('deviceId') or report.get('userPhone')
+    if device:
+        keys.append(('device', str(device)))
+    location = report.get('location') or {}
+    if isinstance(location.get('latitude'), (int, float)) and isinstance(location.get('longitude'), (int, float)):
+        x, y = tile_xy(location['latitude'], location['longitude'], CELL_ZOOM)
+        keys.append(('cell', f"{location.get('campus') or DEFAULT_CAMPUS}/{int(x)}/{int(y)}"))
+    return keys
+
+class BurstDetector:
+    """One windowed sketch per (dimension, window size), scored against configured thresholds"""
+
+    def __init__(self, config):
+        self.windows = list(config['windows'])
+        self.thresholds = {dim: list(values) for dim, values in config['thresholds'].items()}
+        sketch = config.get('sketch', {})
+        self.sketches = {
+            (dim, window): WindowedCountMin(window, sketch.get('width', 2048),
+                                            sketch.get('depth', 4), sketch.get('slots', 6))
+            for dim in self.thresholds for window in self.windows
+        }
+
+    @classmethod
+    def from_file(cls, path=THRESHOLDS_PATH):
+        with open(path, 'r') as f:
+            return cls(json.load(f))
+
+    def observe(self, report, timestamp=None):
+        """Count one report and return its burst score plus any thresholds it crossed.
+
+        Without a timestamp the report's createdAt is used, or the current time for a
+        live report that has none yet; only an unparseable createdAt is skipped.
+        """
+        if timestamp is None:
+            created = report.get('createdAt')
+            try:
+                timestamp = time.time() if created is None else alert_timestamp(created)
+            except (ValueError, TypeError, KeyError):
+                timestamp = float('nan')
+        score, flags = 0.0, []
+        if np.isnan(timestamp):
+            return {'burstScore': score, 'flags': flags}
+
+        for dim, key in report_keys(report):
+            if dim not in self.thresholds:
+                continue
+            for window, threshold in zip(self.windows, self.thresholds[dim]):
+                count = self.sketches[(dim, window)].add(key, timestamp)
+                score = max(score, count / threshold)
+                if count >= threshold:
+                    flags.append({'dimension': dim, 'key': key, 'windowSeconds': window,
+                                  'count': count, 'threshold': threshold})
+        return {'burstScore': round(min(score, MAX_BURST_SCORE), 4), 'flags': flags}
+
+def annotate_bursts(alerts, detector=None):
+    """Replay alerts in createdAt order and return each one's burstScore, in input order"""
+    alerts = list(alerts)
+    detector = detector or BurstDetector.from_file()
+    timestamps = np.array([alert_timestamp(alert.get('createdAt')) for alert in alerts], dtype=np.float64)
+    scores = np.zeros(len(alerts), dtype=np.float32)
+    for i in np.argsort(timestamps, kind='stable'):
+        scores[i] = detector.observe(alerts[i], timestamps[i])['burstScore']
+    return scores
+
+def main():
+    parser = argparse.ArgumentParser(description='Report burst detection')
+    sub = parser.add_subparsers(dest='command', required=True)
+    replay = sub.add_parser('replay', help='Replay an alerts export and print flagged bursts')
+    replay.add_argument('alerts')
+    replay.add_argument('--thresholds', default=THRESHOLDS_PATH)
+    observe = sub.add_parser('observe', help='Score report JSON lines read from stdin, in arrival order')
+    observe.add_argument('--thresholds', default=THRESHOLDS_PATH)
+    args = parser.parse_args()
+
+    detector = BurstDetector.from_file(args.thresholds)
+    if args.command == 'observe':
+        for line in sys.stdin:
+            if line.strip():
+                print(json.dumps(detector.observe(json.loads(line))), flush=True)
+        return
+
+    alerts = list(iter_alerts(args.alerts))
+    timestamps = [alert_timestamp(alert.get('createdAt')) for alert in alerts]
+    flagged = 0
+    for i in np.argsort(timestamps, kind='stable'):
+        result = detector.observe(alerts[i], timestamps[i])
+        if result['flags']:
+            flagged += 1
+            print(f"🚨 {alerts[i].get('alertId')}: burst score {result['burstScore']} "
+                  f"({', '.join(f['dimension'] + '/' + str(f['windowSeconds']) + 's' for f in result['flags'])})")
+    print(f"✅ {flagged} of {len(alerts)} reports crossed a burst threshold")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+SafeZoneX Probability Calibration
+Sigmoid or isotonic calibrators fitted on out-of-fold decision scores, with reliability reporting
+"""
+import numpy as np
+
+METHODS = ('sigmoid', 'isotonic')
+RELIABILITY_BINS = 10
+# Folds for cross-fitting calibrators over the out-of-fold scores when choosing a method
+SELECTION_FOLDS = 5
+
+def decision_scores(model, X):
+    """1-d score increasing with the positive (classes_[1]) class.
+
+    decision_function where the model has one, otherwise the logit of its
+    positive-class probability, so a sigmoid calibrator is a shift and scale.
+    """
+    try:
+        scores = model.decision_function(X)
+    except AttributeError:
+        p = np.clip(model.predict_proba(X)[:, 1], 1e-6, 1 - 1e-6)
+        return np.log(p / (1 - p))
+    return np.asarray(scores, dtype=np.float64).ravel()
+
+class ScoreCalibrator:
+    """Maps decision scores to positive-class probabilities"""
+
+    def __init__(self, method='sigmoid'):
+        if method not in METHODS:
+            raise ValueError(f"Unknown calibration method {method!r}; expected one of {METHODS}")
+        self.method = method
+
+    def fit(self, scores, positive):
+        scores = np.asarray(scores, dtype=np.float64).reshape(-1, 1)
+        if self.method == 'sigmoid':
+            from sklearn.linear_model import LogisticRegression
+            # Platt scaling: a one-feature logistic regression, effectively unregularized
+            self.mapping_ = LogisticRegression(C=1e6).fit(scores, positive)
+        else:
+            from sklearn.isotonic import IsotonicRegression
+            self.mapping_ = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds='clip').fit(scores.ravel(), positive)
+        return self
+
+    def predict(self, scores):
+        scores = np.asarray(scores, dtype=np.float64)
+        if self.method == 'sigmoid':
+            return self.mapping_.predict_proba(scores.reshape(-1, 1))[:, 1]
+        return self.mapping_.predict(scores.ravel())
+
+class CalibratedModel:
+    """A fitted classifier whose predict_proba goes through a calibrator.
+
+    predict() thresholds the calibrated positive-class probability at 0.5, as
+    inference does, so labels always agree with predict_proba. With no
+    calibrator (calibration did not help out of fold) the wrapped model's own
+    predict and predict_proba are used. Other attributes (estimators_,
+    voting, ...) are read through from the wrapped model for the tools that
+    inspect ensemble members.
+    """
+
+    def __init__(self, model, calibrator, selection=None):
+        self.model = model
+        self.calibrator = calibrator
+        self.selection = selection
+        self.classes_ = model.classes_
+
+    def __getattr__(self, name):
+        if name.startswith('__') or name in ('model', 'calibrator', 'selection'):
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+    @property
+    def method(self):
+        return self.calibrator.method if self.calibrator is not None else 'none'
+
+    def predict(self, X):
+        if self.calibrator is None:
+            return self.model.predict(X)
+        return np.asarray(self.classes_)[(self._positive_probability(X) >= 0.5).astype(int)]
+
+    def predict_proba(self, X):
+        if self.calibrator is None:
+            return self.model.predict_proba(X)
+        p = self._positive_probability(X)
+        return np.column_stack([1 - p, p])
+
+    def _positive_probability(self, X):
+        return self.calibrator.predict(decision_scores(self.model, X))
+
+    def score(self, X, y):
+        return float(np.mean(self.predict(X) == np.asarray(y)))
+
+def cross_fitted_probabilities(oof_scores, positive, method, folds=SELECTION_FOLDS):
+    """Calibrated probability of every out-of-fold score from a calibrator that never saw it"""
+    from sklearn.model_selection import StratifiedKFold
+
+    oof_scores = np.asarray(oof_scores, dtype=np.float64)
+    p = np.empty(len(oof_scores))
+    for train, held_out in StratifiedKFold(folds, shuffle=True, random_state=42).split(oof_scores, positive):
+        p[held_out] = ScoreCalibrator(method).fit(oof_scores[train], positive[train]).predict(oof_scores[held_out])
+    return p
+
+def choose_method(model, oof_scores, positive, methods=METHODS):
+    """Method ('none' included) with the lowest out-of-fold ECE, and each method's ECE and accuracy.
+
+    'none' is only a candidate for models with their own predict_proba, whose
+    out-of-fold probability is the sigmoid of the score decision_scores returned.
+    Choosing on out-of-fold scores keeps the test split out of the decision.
+    """
+    oof_scores = np.asarray(oof_scores, dtype=np.float64)
+    candidates = {method: cross_fitted_probabilities(oof_scores, positive, method) for method in methods}
+    if hasattr(model, 'predict_proba'):
+        candidates['none'] = 1 / (1 + np.exp(-oof_scores))
+    scores = {method: {'ece': round(expected_calibration_error(p, positive), 4),
+                       'accuracy': round(float(np.mean((p >= 0.5) == positive)), 4)}
+              for method, p in candidates.items()}
+    return min(scores, key=lambda method: scores[method]['ece']), scores
+
+def calibrate(model, oof_scores, y, method='auto'):
+    """Wrap a fitted model with a calibrator fitted on its out-of-fold scores for y.
+
+    method='auto' picks sigmoid, isotonic or no calibration by out-of-fold ECE.
+    """
+    positive = (np.asarray(y) == model.classes_[1]).astype(int)
+    selection = None
+    if method == 'auto':
+        method, scores = choose_method(model, oof_scores, positive)
+        selection = {'chosen': method, 'oof': scores}
+    if method == 'none':
+        return CalibratedModel(model, None, selection)
+    return CalibratedModel(model, ScoreCalibrator(method).fit(oof_scores, positive), selection)
+
+def uncalibrated_if_worse(model, X, y):
+    """The model without its calibrator when the calibrator raises ECE on held-out (X, y).
+
+    Out-of-fold selection can still pick a calibrator that generalizes badly on
+    a small corpus; the raw model is kept whenever it is better calibrated here.
+    """
+    if model.calibrator is None or not hasattr(model.model, 'predict_proba'):
+        return model
+    positive = (np.asarray(y) == model.classes_[1]).astype(np.float64)
+    calibrated = expected_calibration_error(model.predict_proba(X)[:, 1], positive)
+    raw = expected_calibration_error(model.model.predict_proba(X)[:, 1], positive)
+    if calibrated <= raw:
+        return model
+    selection = dict(model.selection or {}, chosen='none', rejected=model.calibrator.method)
+    return CalibratedModel(model.model, None, selection)
+
+def reliability_curve(p, positive, bins=RELIABILITY_BINS):
+    """Equal-width bins over the positive-class probability: count, mean prediction, observed rate"""
+    edges = np.linspace(0, 1, bins + 1)
+    which = np.clip(np.digitize(p, edges[1:-1]), 0, bins - 1)
+    counts = np.bincount(which, minlength=bins)
+    predicted = np.bincount(which, weights=p, minlength=bins)
+    observed = np.bincount(which, weights=positive, minlength=bins)
+    curve = []
+    for i in range(bins):
+        if counts[i]:
+            curve.append({'bin': [round(float(edges[i]), 2), round(float(edges[i + 1]), 2)],
+                          'count': int(counts[i]),
+                          'mean_predicted': round(float(predicted[i] / counts[i]), 4),
+                          'observed': round(float(observed[i] / counts[i]), 4)})
+    return curve
+
+def expected_calibration_error(p, positive, bins=RELIABILITY_BINS):
+    """Count-weighted mean gap between predicted probability and observed rate over the bins"""
+    curve = reliability_curve(p, positive, bins)
+    return sum(b['count'] * abs(b['mean_predicted'] - b['observed']) for b in curve) / len(p)
+
+def calibration_report(model, X, y):
+    """ECE, Brier score and reliability curve of a CalibratedModel on held-out data.
+
+    ece_uncalibrated compares the wrapped model's own predict_proba, where it has one;
+    selection holds the out-of-fold ECE and accuracy the method was chosen on.
+    """
+    positive = (np.asarray(y) == model.classes_[1]).astype(np.float64)
+    p = model.predict_proba(X)[:, 1]
+    try:
+        raw = model.model.predict_proba(X)[:, 1]
+        ece_raw = round(expected_calibration_error(raw, positive), 4)
+    except AttributeError:
+        ece_raw = None
+    return {
+        'method': model.method,
+        'ece': round(expected_calibration_error(p, positive), 4),
+        'ece_uncalibrated': ece_raw,
+        'brier': round(float(np.mean((p - positive) ** 2)), 4),
+        'reliability': reliability_curve(p, positive),
+        'selection': getattr(model, 'selection', None)
+    }
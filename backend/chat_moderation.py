@@ -0,0 +1,299 @@
+"""
+SafeZoneX Chat Moderation
+Streams chat messages through the rule prefilter and report classifier in per-room micro-batches
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
+from rule_prefilter import RULES_PATH, RulePrefilter
+
+# A room's pending messages are scored once it holds BATCH_SIZE or its oldest has waited MAX_DELAY_MS
+BATCH_SIZE = 32
+MAX_DELAY_MS = 50
+# Fake-report probability at or above which a message counts as spam. The classifier learned
+# report authenticity, so short casual chat also looks "fake"; only links or longer messages qualify
+SPAM_THRESHOLD = 0.9
+MIN_SPAM_WORDS = 8
+# Scoring batches in flight per worker; rooms past this wait in their buffers
+BATCHES_PER_WORKER = 2
+# put() waits while this many messages are buffered and not yet scored
+MAX_BUFFERED = 20000
+
+_scorer = None
+
+def room_of(message):
+    """Chat room key: an explicit roomId, else the unordered sender/recipient pair"""
+    if message.get('roomId'):
+        return str(message['roomId'])
+    return ':'.join(sorted([str(message.get('senderId', '')), str(message.get('recipientId', ''))]))
+
+class MessageScorer:
+    """Scam and harassment rules plus the report classifier's spam probability, one batch at a time"""
+
+    def __init__(self, family=None, rules_path=RULES_PATH):
+        from inference import DEFAULT_FAMILY, ModelService
+        self.service = ModelService.from_family(family or DEFAULT_FAMILY, monitor=False)
+        with open(rules_path, 'r') as f:
+            rules = json.load(f)
+        self.scam = RulePrefilter(rules)
+        self.harassment = RulePrefilter({'block_phrases': rules.get('harassment_phrases', [])})
+
+    def score(self, texts):
+        """A {flags, reasons, spamProbability} dict per text, or None when nothing fired"""
+        spam = 1 - self.service.real_probability(texts)
+        results = []
+        for text, p in zip(texts, spam):
+            flags, reasons = [], []
+            block_hits, allow_hits, review_hits = self.scam.scan(text)
+            for kind, verdict in (('scam', self.scam.verdict(block_hits, allow_hits)),
+                                  ('harassment', self.harassment.check(text))):
+                if verdict is not None:
+                    flags.append(kind)
+                    reasons.append(verdict['reason'])
+            lowered = text.lower()
+            if p >= SPAM_THRESHOLD and ('http' in lowered or 'www.' in lowered or
+                                        len(text.split()) >= MIN_SPAM_WORDS):
+                flags.append('spam')
+                # Generic scam wording only backs up the classifier; it never flags on its own
+                reasons.append('; '.join([f"classifier spam probability {p:.2f}"] + review_hits))
+            results.append({'flags': flags, 'reasons': reasons, 'spamProbability': round(float(p), 4)}
+                           if flags else None)
+        return results
+
+def _init_worker(family, rules_path):
+    global _scorer
+    _scorer = MessageScorer(family, rules_path)
+
+def _score_batch(texts):
+    return _scorer.score(texts)
+
+class ChatModerator:
+    """Non-blocking moderation: submit() only buffers; scoring runs on a worker pool.
+
+    Messages are buffered per room and a room is dispatched when its batch is
+    full or its oldest message is MAX_DELAY_MS old. Overdue rooms are scored
+    together in one classifier call. A room has at most one batch in flight, so
+    flags go to on_flag(flag) in each room's message order, and at most
+    workers * BATCHES_PER_WORKER batches are pending; put() waits while
+    MAX_BUFFERED messages are unscored.
+    """
+
+    def __init__(self, on_flag, workers=1, family=None, rules_path=RULES_PATH,
+                 batch_size=BATCH_SIZE, max_delay_ms=MAX_DELAY_MS, max_buffered=MAX_BUFFERED):
+        self.on_flag = on_flag
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_delay = max_delay_ms / 1000
+        self.max_tasks = workers * BATCHES_PER_WORKER
+        self.max_buffered = max_buffered
+        if workers == 1:
+            # Single core: score on one thread of this process, off the event loop
+            _init_worker(family, rules_path)
+            self.executor = ThreadPoolExecutor(max_workers=1)
+        else:
+            self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                                initargs=(family, rules_path))
+        self.pending = {}
+        self.oldest = {}
+        self.in_flight = set()
+        self.buffered = 0
+        self.tasks = {}
+        self.space = None
+        self.ticker = None
+        self.stats = {'messages': 0, 'scored': 0, 'flagged': 0, 'batches': 0, 'failed': 0}
+
+    def start(self):
+        self.space = asyncio.Event()
+        self.space.set()
+        self.ticker = asyncio.get_running_loop().create_task(self._tick())
+        return self
+
+    def submit(self, message):
+        """Buffer one Message document (or socket payload); never waits on scoring"""
+        text = message.get('message')
+        if not isinstance(text, str) or not text.strip() or message.get('messageType', 'text') != 'text':
+            return
+        room = room_of(message)
+        self.stats['messages'] += 1
+        self.buffered += 1
+        if self.buffered >= self.max_buffered:
+            self.space.clear()
+        batch = self.pending.setdefault(room, [])
+        if not batch:
+            self.oldest[room] = time.monotonic()
+        batch.append(message)
+        if len(batch) >= self.batch_size:
+            self._pump()
+
+    async def put(self, message):
+        """submit() once fewer than max_buffered messages are waiting to be scored"""
+        while not self.space.is_set():
+            await self.space.wait()
+        self.submit(message)
+
+    def _take(self, room):
+        """Up to batch_size of a room's oldest buffered messages"""
+        batch = self.pending.pop(room)
+        if len(batch) > self.batch_size:
+            # The rest keep the old timestamp, so they go out on the next tick
+            self.pending[room], batch = batch[self.batch_size:], batch[:self.batch_size]
+        else:
+            self.oldest.pop(room, None)
+        self.in_flight.add(room)
+        return room, batch
+
+    def _pump(self, flush=False):
+        """Dispatch full rooms one per task and overdue rooms together, skipping rooms
+        with a batch in flight, until max_tasks are pending"""
+        now = time.monotonic()
+        ready = [room for room in self.pending if room not in self.in_flight]
+        full = [room for room in ready if len(self.pending[room]) >= self.batch_size]
+        overdue = [room for room in ready if len(self.pending[room]) < self.batch_size and
+                   (flush or now - self.oldest[room] >= self.max_delay)]
+        for room in full:
+            if len(self.tasks) >= self.max_tasks:
+                return
+            self._dispatch([self._take(room)])
+        if overdue and len(self.tasks) < self.max_tasks:
+            self._dispatch([self._take(room) for room in overdue])
+
+    def _dispatch(self, batches):
+        task = asyncio.get_running_loop().create_task(self._score(batches))
+        self.tasks[task] = batches
+        task.add_done_callback(self._finished)
+
+    def _finished(self, task):
+        batches = self.tasks.pop(task)
+        count = sum(len(batch) for _, batch in batches)
+        self.buffered -= count
+        if self.buffered < self.max_buffered:
+            self.space.set()
+        self.in_flight.difference_update(room for room, _ in batches)
+        if not task.cancelled() and task.exception() is not None:
+            self.stats['failed'] += count
+            print(f"⚠️ Scoring {count} messages from {len(batches)} room(s) failed: {task.exception()!r}",
+                  file=sys.stderr)
+        self._pump()
+
+    async def _tick(self):
+        while True:
+            await asyncio.sleep(self.max_delay / 2)
+            self._pump()
+
+    async def _score(self, batches):
+        messages = [message for _, batch in batches for message in batch]
+        results = await asyncio.get_running_loop().run_in_executor(
+            self.executor, _score_batch, [m['message'] for m in messages])
+        self.stats['scored'] += len(messages)
+        self.stats['batches'] += 1
+        for message, result in zip(messages, results):
+            if result is None:
+                continue
+            self.stats['flagged'] += 1
+            flag = dict(result, messageId=message.get('messageId'), room=room_of(message),
+                        senderId=message.get('senderId'), recipientId=message.get('recipientId'),
+                        flaggedAt=datetime.now().isoformat())
+            outcome = self.on_flag(flag)
+            if asyncio.iscoroutine(outcome):
+                await outcome
+
+    async def drain(self):
+        """Score everything still buffered and wait for in-flight batches"""
+        while self.pending or self.tasks:
+            self._pump(flush=True)
+            await asyncio.wait(list(self.tasks))
+
+    async def close(self):
+        await self.drain()
+        if self.ticker is not None:
+            self.ticker.cancel()
+        self.executor.shutdown()
+
+async def stream(workers, family, batch_size, max_delay_ms):
+    """JSON Message lines on stdin, one JSON flag line on stdout per flagged message"""
+    loop = asyncio.get_running_loop()
+    lines = asyncio.Queue(maxsize=1000)
+
+    def read_stdin():
+        # Blocking on a full queue stops reading, so the pipe pushes back on the server
+        for line in sys.stdin:
+            asyncio.run_coroutine_threadsafe(lines.put(line), loop).result()
+        asyncio.run_coroutine_threadsafe(lines.put(None), loop).result()
+
+    threading.Thread(target=read_stdin, daemon=True).start()
+    moderator = ChatModerator(lambda flag: print(json.dumps(flag), flush=True), workers, family,
+                              batch_size=batch_size, max_delay_ms=max_delay_ms).start()
+    while True:
+        line = await lines.get()
+        if line is None:
+            break
+        if line.strip():
+            try:
+                message = json.loads(line)
+                await moderator.put(message)
+            except (json.JSONDecodeError, AttributeError):
+                print(f"⚠️ Skipping malformed message line: {line[:80]!r}", file=sys.stderr)
+    await moderator.close()
+    print(json.dumps(moderator.stats), file=sys.stderr)
+
+def synthetic_stream(n, rooms=500):
+    """n chat-like messages spread over rooms, drawn from both trainers' datasets and SMOKE_REPORTS"""
+    from inference import SMOKE_REPORTS
+    from rule_prefilter import load_labelled_corpora
+    texts = [text for _, corpus, _ in load_labelled_corpora() for text in corpus]
+    texts += [text for text, _ in SMOKE_REPORTS] + ["hey are you home yet?", "ok see you at the library"]
+    return [{'messageId': f'm{i}', 'senderId': f'u{i % rooms}', 'recipientId': f'u{(i * 7 + 1) % rooms}',
+             'message': texts[i % len(texts)], 'messageType': 'text'} for i in range(n)]
+
+async def benchmark(messages, workers, family, batch_size, max_delay_ms):
+    """Messages/sec from first submit until every batch is scored"""
+    moderator = ChatModerator(lambda flag: None, workers, family, batch_size=batch_size,
+                              max_delay_ms=max_delay_ms).start()
+    # Warm the pool so process start-up and model loading are not timed
+    await asyncio.gather(*[asyncio.get_running_loop().run_in_executor(moderator.executor, _score_batch, ['warm up'])
+                           for _ in range(workers)])
+    start = time.perf_counter()
+    for i, message in enumerate(messages):
+        await moderator.put(message)
+        if i % 1000 == 999:
+            # Let the ticker and finished batches run, as a live socket stream would
+            await asyncio.sleep(0)
+    await moderator.drain()
+    elapsed = time.perf_counter() - start
+    await moderator.close()
+    return {'workers': workers, 'messages': len(messages), 'seconds': round(elapsed, 3),
+            'messagesPerSecond': round(len(messages) / elapsed, 1), **moderator.stats}
+
+def main():
+    parser = argparse.ArgumentParser(description='Streaming chat moderation')
+    sub = parser.add_subparsers(dest='command', required=True)
+    run = sub.add_parser('stream', help='Moderate JSON message lines from stdin, printing flags')
+    bench = sub.add_parser('bench', help='Throughput on one core and on all cores')
+    bench.add_argument('--messages', type=int, default=50000)
+    for command in (run, bench):
+        command.add_argument('--family', default=None, help='Model family (default: inference default)')
+        command.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        command.add_argument('--max-delay-ms', type=float, default=MAX_DELAY_MS)
+    run.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+
+    if args.command == 'stream':
+        asyncio.run(stream(args.workers, args.family, args.batch_size, args.max_delay_ms))
+        return
+
+    messages = synthetic_stream(args.messages)
+    for workers in dict.fromkeys([1, os.cpu_count() or 1]):
+        result = asyncio.run(benchmark(messages, workers, args.family, args.batch_size, args.max_delay_ms))
+        print(f"⚡ {workers} worker(s): {result['messagesPerSecond']:.0f} msgs/sec "
+              f"({result['batches']} batches, {result['flagged']} flagged)")
+        print(json.dumps(result))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+SafeZoneX Compact Model Export
+Converts fitted artifacts to float32/int16 dtypes and reports the memory saved
+"""
+import argparse
+import copy
+
+import joblib
+import numpy as np
+from scipy import sparse
+from sklearn.ensemble import RandomForestClassifier, VotingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.tree._tree import Tree
+
+from calibration import CalibratedModel
+from forest_evaluator import FlatForest
+
+MODEL_PATH = 'safety_report_classifier_high_accuracy.pkl'
+VECTORIZER_PATH = 'tfidf_vectorizer_high_accuracy.pkl'
+COMPACT_MODEL_PATH = 'safety_report_classifier_high_accuracy_compact.pkl'
+COMPACT_VECTORIZER_PATH = 'tfidf_vectorizer_high_accuracy_compact.pkl'
+
+def array_nbytes(obj, seen=None):
+    """Bytes held in NumPy/SciPy arrays reachable from obj (sklearn trees included)"""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        if obj.dtype == object:
+            return obj.nbytes + sum(array_nbytes(item, seen) for item in obj.ravel())
+        return obj.nbytes
+    if sparse.issparse(obj):
+        return sum(getattr(obj, name).nbytes for name in ('data', 'indices', 'indptr') if hasattr(obj, name))
+    if isinstance(obj, dict):
+        return sum(array_nbytes(value, seen) for value in obj.values())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sum(array_nbytes(item, seen) for item in obj)
+    if isinstance(obj, Tree):
+        state = obj.__getstate__()
+        return state['nodes'].nbytes + state['values'].nbytes
+    if hasattr(obj, '__dict__'):
+        return array_nbytes(vars(obj), seen)
+    return 0
+
+def compact_vectorizer(vectorizer):
+    """Copy of a TfidfVectorizer with float32 IDF weights that emits float32 matrices"""
+    compact = copy.deepcopy(vectorizer)
+    compact.dtype = np.float32
+    compact.idf_ = vectorizer.idf_.astype(np.float32)
+    # Only kept for introspection; can be dropped before pickling per sklearn docs
+    if hasattr(compact, 'stop_words_'):
+        compact.stop_words_ = None
+    return compact
+
+def compact_estimator(estimator, leaf_bits=8):
+    """Compact copy of a fitted estimator; unsupported estimators are returned unchanged"""
+    if isinstance(estimator, CalibratedModel):
+        compact = copy.copy(estimator)
+        compact.model = compact_estimator(estimator.model, leaf_bits)
+        return compact
+
+    if isinstance(estimator, VotingClassifier):
+        compact = copy.copy(estimator)
+        compact.estimators_ = [compact_estimator(est, leaf_bits) for est in estimator.estimators_]
+        compact.named_estimators_ = copy.copy(estimator.named_estimators_)
+        for key, est in zip(compact.named_estimators_.keys(), compact.estimators_):
+            compact.named_estimators_[key] = est
+        return compact
+
+    if isinstance(estimator, RandomForestClassifier):
+        return FlatForest.from_forest(estimator, compact=True, leaf_bits=leaf_bits)
+
+    compact = copy.deepcopy(estimator)
+    if isinstance(estimator, LogisticRegression):
+        compact.coef_ = estimator.coef_.astype(np.float32)
+        compact.intercept_ = estimator.intercept_.astype(np.float32)
+    elif isinstance(estimator, MultinomialNB):
+        for attr in ('feature_log_prob_', 'class_log_prior_', 'feature_count_', 'class_count_'):
+            setattr(compact, attr, getattr(estimator, attr).astype(np.float32))
+    return compact
+
+def memory_breakdown(model, vectorizer):
+    """Array bytes per component: the vectorizer plus each ensemble member"""
+    components = {'vectorizer': vectorizer}
+    if hasattr(model, 'named_estimators_'):
+        components.update(model.named_estimators_)
+    else:
+        components[type(model).__name__] = model
+    return {name: array_nbytes(obj) for name, obj in components.items()}
+
+def verify_agreement(original, compact, texts):
+    """Prediction agreement and largest probability delta on held-out texts"""
+    model, vectorizer = original
+    compact_model, compact_vec = compact
+    texts = list(texts)
+
+    proba = model.predict_proba(vectorizer.transform(texts))
+    compact_proba = compact_model.predict_proba(compact_vec.transform(texts))
+    agreement = float(np.mean(proba.argmax(axis=1) == compact_proba.argmax(axis=1)))
+    return agreement, float(np.abs(proba - compact_proba).max())
+
+def export_compact(model_path=MODEL_PATH, vectorizer_path=VECTORIZER_PATH,
+                   out_model=COMPACT_MODEL_PATH, out_vectorizer=COMPACT_VECTORIZER_PATH):
+    """Compact the saved artifacts, verify them on the held-out split and save them"""
+    from train_high_accuracy import create_comprehensive_dataset, split_dataset
+
+    model = joblib.load(model_path)
+    vectorizer = joblib.load(vectorizer_path)
+    _, X_test, _, _ = split_dataset(create_comprehensive_dataset())
+
+    # 8-bit leaves first; fall back to 16 bits if any held-out prediction flips
+    for leaf_bits in (8, 16):
+        compact = (compact_estimator(model, leaf_bits), compact_vectorizer(vectorizer))
+        agreement, max_delta = verify_agreement((model, vectorizer), compact, X_test)
+        if agreement == 1.0:
+            break
+
+    print(f"\n🔍 Held-out agreement: {agreement:.1%} ({len(X_test)} reports), "
+          f"max probability delta {max_delta:.5f}, leaf probabilities {leaf_bits}-bit")
+
+    before = memory_breakdown(model, vectorizer)
+    after = memory_breakdown(*compact)
+    print(f"\n{'Component':<12} {'Before KB':>10} {'After KB':>10} {'Saved':>7}")
+    for name in before:
+        saved = 1 - after[name] / before[name] if before[name] else 0.0
+        print(f"{name:<12} {before[name] / 1024:>10.1f} {after[name] / 1024:>10.1f} {saved:>7.1%}")
+    total_before, total_after = sum(before.values()), sum(after.values())
+    print(f"{'total':<12} {total_before / 1024:>10.1f} {total_after / 1024:>10.1f} "
+          f"{1 - total_after / total_before:>7.1%}")
+
+    if agreement < 1.0:
+        print("❌ Compact model disagrees with the original; not saving")
+        return None
+
+    joblib.dump(compact[0], out_model)
+    joblib.dump(compact[1], out_vectorizer)
+    print(f"\n✅ Compact model saved:")
+    print(f"   - {out_model}")
+    print(f"   - {out_vectorizer}")
+    return compact
+
+def main():
+    parser = argparse.ArgumentParser(description='Export compact float32/int16 model artifacts')
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--vectorizer', default=VECTORIZER_PATH)
+    parser.add_argument('--out-model', default=COMPACT_MODEL_PATH)
+    parser.add_argument('--out-vectorizer', default=COMPACT_VECTORIZER_PATH)
+    args = parser.parse_args()
+
+    print("📦 SafeZoneX Compact Model Export")
+    print("=" * 50)
+    export_compact(args.model, args.vectorizer, args.out_model, args.out_vectorizer)
+
+if __name__ == "__main__":
+    main()
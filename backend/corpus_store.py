@@ -0,0 +1,172 @@
+"""
+SafeZoneX Shared Corpus and Feature Store
+Deduplicates both trainers' datasets, tokenizes once into cached n-gram counts and
+derives each family's TF-IDF features from those counts
+"""
+import argparse
+import hashlib
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import CountVectorizer, strip_accents_unicode
+from sklearn.preprocessing import normalize
+
+STORE_PATH = 'corpus_features.pkl'
+
+# Tokenization shared by both families' TfidfVectorizer settings
+COUNT_PARAMS = {'ngram_range': (1, 3), 'stop_words': 'english', 'lowercase': True, 'analyzer': 'word'}
+# Text column of each trainer's create_comprehensive_dataset()
+TEXT_COLUMNS = {'high_accuracy': 'text', 'enhanced': 'content'}
+
+def load_corpus():
+    """Both trainers' datasets merged on text, with the families each report belongs to"""
+    from train_high_accuracy import create_comprehensive_dataset as high_accuracy_dataset
+    from train_ml_enhanced import create_comprehensive_dataset as enhanced_dataset
+
+    frames = {'high_accuracy': high_accuracy_dataset(), 'enhanced': enhanced_dataset()}
+    merged = pd.concat([
+        pd.DataFrame({'text': df[TEXT_COLUMNS[name]], 'label': df['label'], 'family': name})
+        for name, df in frames.items()
+    ], ignore_index=True)
+
+    conflicts = merged.groupby('text')['label'].nunique()
+    if (conflicts > 1).any():
+        print(f"⚠️ {(conflicts > 1).sum()} reports carry different labels in the two datasets")
+    corpus = merged.groupby('text', sort=False).agg(
+        label=('label', 'first'), families=('family', lambda f: sorted(set(f)))).reset_index()
+    print(f"📚 Shared corpus: {len(corpus)} unique reports from {len(merged)} dataset rows")
+    return corpus, frames
+
+def corpus_fingerprint(texts):
+    digest = hashlib.blake2b(repr(sorted(COUNT_PARAMS.items())).encode('utf-8'), digest_size=16)
+    for text in texts:
+        digest.update(text.encode('utf-8') + b'\0')
+    return digest.hexdigest()
+
+class FeatureStore:
+    """Document x n-gram count matrix of the deduplicated corpus, tokenized once"""
+
+    def __init__(self, texts, counts, terms, fingerprint):
+        self.texts = list(texts)
+        self.row_of = {text: i for i, text in enumerate(self.texts)}
+        self.counts = counts.tocsr()
+        self.terms = np.asarray(terms, dtype=object)
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def build(cls, texts):
+        texts = list(texts)
+        start = time.perf_counter()
+        counter = CountVectorizer(**COUNT_PARAMS, dtype=np.int32)
+        counts = counter.fit_transform(texts)
+        print(f"🔤 Tokenized {len(texts)} reports into {counts.shape[1]} n-grams "
+              f"in {time.perf_counter() - start:.2f}s")
+        return cls(texts, counts, counter.get_feature_names_out(), corpus_fingerprint(texts))
+
+    @classmethod
+    def load_or_build(cls, texts, path=STORE_PATH):
+        """Reuse the cached counts while the corpus and tokenization are unchanged"""
+        texts = list(texts)
+        if os.path.exists(path):
+            store = joblib.load(path)
+            if store.fingerprint == corpus_fingerprint(texts):
+                print(f"♻️ Reusing cached n-gram counts from {path}")
+                return store
+        store = cls.build(texts)
+        joblib.dump(store, path)
+        return store
+
+    def rows(self, texts):
+        return np.array([self.row_of[text] for text in texts], dtype=np.int64)
+
+    def _compatible(self, template, texts):
+        """Whether counts from the shared tokenization equal what template would produce"""
+        same = (template.ngram_range == COUNT_PARAMS['ngram_range'] and
+                template.stop_words == COUNT_PARAMS['stop_words'] and
+                template.lowercase == COUNT_PARAMS['lowercase'] and
+                template.analyzer == COUNT_PARAMS['analyzer'] and
+                template.token_pattern == CountVectorizer().token_pattern and
+                template.preprocessor is None and template.tokenizer is None and
+                not template.binary and template.use_idf and template.smooth_idf and template.norm == 'l2' and
+                template.strip_accents in (None, 'unicode') and
+                all(text in self.row_of for text in texts))
+        if same and template.strip_accents == 'unicode':
+            # Accent stripping only matters if some text has accents to strip
+            same = all(strip_accents_unicode(text) == text for text in texts)
+        return same
+
+    def _select_columns(self, train_rows, template):
+        """min_df / max_df / max_features cuts as TfidfVectorizer.fit applies them on the training rows"""
+        counts = self.counts[train_rows]
+        n_docs = len(train_rows)
+        df = np.bincount(counts.indices, minlength=counts.shape[1])
+        min_df = template.min_df if isinstance(template.min_df, (int, np.integer)) else template.min_df * n_docs
+        max_df = template.max_df if isinstance(template.max_df, (int, np.integer)) else template.max_df * n_docs
+        columns = np.flatnonzero((df >= min_df) & (df <= max_df))
+        if template.max_features is not None and len(columns) > template.max_features:
+            totals = np.asarray(counts[:, columns].sum(axis=0)).ravel()
+            columns = np.sort(columns[np.argsort(-totals, kind='stable')[:template.max_features]])
+        return columns, df[columns]
+
+    def _tfidf(self, rows, columns, idf, sublinear_tf):
+        X = self.counts[rows][:, columns].astype(np.float64)
+        if sublinear_tf:
+            np.log(X.data, X.data)
+            X.data += 1
+        return normalize(X.multiply(idf).tocsr(), norm='l2', copy=False)
+
+    def featurizer(self, factory):
+        """featurize(X_train, X_test) for a trainer, built from its vectorizer factory(vocabulary=None)"""
+        def featurize(X_train, X_test):
+            template = factory()
+            X_train, X_test = list(X_train), list(X_test)
+            if not self._compatible(template, X_train + X_test):
+                print("🔤 Vectorizer settings differ from the shared tokenization; fitting directly")
+                return template, template.fit_transform(X_train), template.transform(X_test)
+
+            train_rows, test_rows = self.rows(X_train), self.rows(X_test)
+            columns, df = self._select_columns(train_rows, template)
+            # Smoothed IDF exactly as TfidfTransformer computes it
+            idf = np.log((1 + len(train_rows)) / (1 + df)) + 1
+
+            vectorizer = factory(vocabulary=list(self.terms[columns]))
+            vectorizer.idf_ = idf
+            return (vectorizer,
+                    self._tfidf(train_rows, columns, idf, template.sublinear_tf),
+                    self._tfidf(test_rows, columns, idf, template.sublinear_tf))
+        return featurize
+
+def train_all(store_path=STORE_PATH):
+    """Both artifact families from one corpus load and one tokenization pass"""
+    import train_high_accuracy
+    import train_ml_enhanced
+
+    corpus, frames = load_corpus()
+    store = FeatureStore.load_or_build(corpus['text'], store_path)
+
+    start = time.perf_counter()
+    train_high_accuracy.train_and_save(frames['high_accuracy'],
+                                       store.featurizer(train_high_accuracy.create_vectorizer))
+    train_ml_enhanced.train_and_save(frames['enhanced'], store.featurizer(train_ml_enhanced.create_vectorizer))
+    print(f"\n✅ Both model families trained in {time.perf_counter() - start:.1f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description='Shared corpus and n-gram feature store')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('build', help='Deduplicate both datasets and cache their n-gram counts')
+    sub.add_parser('train', help='Train and save both model families from the shared features')
+    parser.add_argument('--store', default=STORE_PATH)
+    args = parser.parse_args()
+
+    if args.command == 'train':
+        train_all(args.store)
+        return
+    corpus, _ = load_corpus()
+    store = FeatureStore.load_or_build(corpus['text'], args.store)
+    print(f"✅ {store.counts.shape[0]} reports x {store.counts.shape[1]} n-grams cached in {args.store}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+SafeZoneX Dense Feature Path
+Low-rank dense projections of the sparse TF-IDF matrix for tree and kernel models
+"""
+import hashlib
+import os
+import time
+
+import joblib
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin, clone
+from sklearn.utils.metaestimators import available_if
+
+# Fitted projections, one file per training matrix fingerprint (each CV fold and the full split)
+REDUCER_DIR = 'dense_reducers'
+N_COMPONENTS = 100
+METHODS = ('svd', 'random_projection')
+
+class Projection:
+    """A fitted reducer followed by L2 row normalization"""
+
+    def __init__(self, reducer, method, fingerprint, fit_seconds):
+        self.reducer = reducer
+        self.method = method
+        self.fingerprint = fingerprint
+        self.fit_seconds = fit_seconds
+
+    @property
+    def n_components(self):
+        return self.reducer.n_components
+
+    def transform(self, X):
+        from sklearn.preprocessing import normalize
+        dense = self.reducer.transform(X)
+        if hasattr(dense, 'toarray'):
+            dense = dense.toarray()
+        return normalize(np.asarray(dense, dtype=np.float64))
+
+def _fingerprint(X, method, n_components):
+    # Reducers sort a matrix's indices in place, so hash a canonical copy
+    X = X.tocsr().copy()
+    X.sort_indices()
+    digest = hashlib.blake2b(f"{method}:{n_components}:{X.shape}".encode('utf-8'), digest_size=16)
+    for array in (X.indptr, X.indices, X.data):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
+
+def fit_projection(X_train, method='svd', n_components=N_COMPONENTS, cache_dir=REDUCER_DIR):
+    """Projection fitted on the training matrix, reused from cache_dir while that matrix is unchanged.
+
+    fit_seconds is always the original fit time, so cached projections are still costed.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown reduction method {method!r}; expected one of {METHODS}")
+    # SVD cannot produce as many components as the matrix's smaller dimension, and a
+    # CV fold of a few hundred reports has fewer rows than the vocabulary has columns
+    n_components = max(1, min(n_components, min(X_train.shape) - 1))
+    fingerprint = _fingerprint(X_train, method, n_components)
+    path = os.path.join(cache_dir, f'{fingerprint}.pkl') if cache_dir else None
+    if path and os.path.exists(path):
+        return joblib.load(path)
+
+    if method == 'svd':
+        from sklearn.decomposition import TruncatedSVD
+        reducer = TruncatedSVD(n_components=n_components, random_state=42)
+    else:
+        from sklearn.random_projection import SparseRandomProjection
+        reducer = SparseRandomProjection(n_components=n_components, random_state=42, dense_output=True)
+
+    start = time.perf_counter()
+    reducer.fit(X_train)
+    projection = Projection(reducer, method, fingerprint, time.perf_counter() - start)
+    if path:
+        os.makedirs(cache_dir, exist_ok=True)
+        joblib.dump(projection, path)
+    return projection
+
+def prefit_projections(X_train, y_train, method='svd', cv=5, n_components=N_COMPONENTS, cache_dir=REDUCER_DIR):
+    """Fit (or load) the projection of every CV fold's training rows and of the full matrix.
+
+    Folds are cross_val_progress's StratifiedKFold(cv) splits, so every dense
+    candidate's fits then hit the cache. Returns total projection fit seconds,
+    the cost each dense model's CV and final fit carry.
+    """
+    from sklearn.model_selection import StratifiedKFold
+
+    start = time.perf_counter()
+    folds = [train for train, _ in StratifiedKFold(cv).split(X_train, y_train)]
+    projections = [fit_projection(X_train[train], method, n_components, cache_dir) for train in folds]
+    projections.append(fit_projection(X_train, method, n_components, cache_dir))
+    fit_seconds = sum(projection.fit_seconds for projection in projections)
+    print(f"🧮 {method} projections to {projections[-1].n_components} dimensions for {cv} folds and the full split: "
+          f"{fit_seconds:.2f}s of fitting ({time.perf_counter() - start:.2f}s now, cached in {cache_dir})")
+    if method == 'svd':
+        print(f"   Explained variance: {projections[-1].reducer.explained_variance_ratio_.sum():.3f}")
+    return fit_seconds
+
+class DenseModel(ClassifierMixin, BaseEstimator):
+    """Classifier on a projection of X fitted in fit(); a drop-in for the sparse TF-IDF models.
+
+    The projection is part of the estimator, so each CV fold fits its own on
+    that fold's training rows and validation rows never shape the reducer.
+    """
+
+    def __init__(self, model, method='svd', n_components=N_COMPONENTS, cache_dir=REDUCER_DIR):
+        self.model = model
+        self.method = method
+        self.n_components = n_components
+        self.cache_dir = cache_dir
+
+    def fit(self, X, y):
+        self.projection_ = fit_projection(X, self.method, self.n_components, self.cache_dir)
+        self.model_ = clone(self.model).fit(self.projection_.transform(X), y)
+        self.classes_ = self.model_.classes_
+        return self
+
+    def predict(self, X):
+        return self.model_.predict(self.projection_.transform(X))
+
+    # Only exposed when the wrapped model has them, so hasattr checks see through the wrapper
+    @available_if(lambda self: hasattr(self.model, 'predict_proba'))
+    def predict_proba(self, X):
+        return self.model_.predict_proba(self.projection_.transform(X))
+
+    @available_if(lambda self: hasattr(self.model, 'decision_function'))
+    def decision_function(self, X):
+        return self.model_.decision_function(self.projection_.transform(X))
+
+def dense_candidates(method, models):
+    """Dense variants of the given sparse models plus histogram gradient boosting"""
+    from sklearn.ensemble import HistGradientBoostingClassifier
+
+    candidates = {f'{name} (dense)': DenseModel(model, method) for name, model in models.items()}
+    candidates['HistGradientBoosting (dense)'] = DenseModel(HistGradientBoostingClassifier(
+        max_iter=200, learning_rate=0.1, early_stopping=False, random_state=42), method)
+    return candidates
+
+def latency_ms(model, X, repeats=5):
+    """Best-of-repeats milliseconds per row for predict_proba on X"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict_proba(X)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000 / X.shape[0]
+
+def compare_paths(model_results):
+    """Dense minus sparse accuracy, and dense/sparse time ratios, for models trained both ways.
+
+    The dense side's training time includes its projection_seconds (fold and full-split fits).
+    """
+    comparison = {}
+    for name, dense in model_results.items():
+        if not name.endswith(' (dense)'):
+            continue
+        sparse = model_results.get(name[:-len(' (dense)')])
+        if sparse is None:
+            continue
+        comparison[name[:-len(' (dense)')]] = {
+            'cv_delta': round(float(dense['cv_mean'] - sparse['cv_mean']), 4),
+            'test_delta': round(float(dense['test_accuracy'] - sparse['test_accuracy']), 4),
+            'train_speedup': round(sparse['train_seconds'] /
+                                   (dense['train_seconds'] + dense.get('projection_seconds', 0.0)), 2),
+            'latency_speedup': round(sparse['latency_ms'] / dense['latency_ms'], 2)
+        }
+    return comparison
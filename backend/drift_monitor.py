@@ -0,0 +1,247 @@
+"""
+SafeZoneX Prediction Drift Monitor
+Bounded-memory per-window sketches of live predictions, compared with the training reference
+"""
+import json
+import math
+import random
+import re
+import time
+from collections import Counter
+
+import numpy as np
+
+ALERT_LOG_PATH = 'drift_alerts.jsonl'
+
+# Reference quantiles are stored at these probabilities (equal-mass bins of 5%)
+QUANTILE_GRID = [i / 20 for i in range(21)]
+TOP_NGRAMS = 50
+WINDOW_SECONDS = 3600
+MIN_WINDOW_SIZE = 50
+# Window summaries kept in memory: one week of hourly windows
+MAX_SUMMARIES = 168
+
+DRIFT_THRESHOLDS = {
+    'ks': 0.2,               # max CDF gap of the real probability
+    'psi': 0.25,             # population stability index over the reference quantile bins
+    'fake_rate_delta': 0.15,
+    'category_tvd': 0.3,     # total variation distance of the alertType mix
+    'ngram_novelty': 0.6     # share of the window's top n-grams unseen in the reference top list
+}
+
+WORD_RE = re.compile(r"[a-z0-9']+")
+
+def ngrams(text):
+    """Word unigrams and bigrams of a report"""
+    words = WORD_RE.findall(text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+class KLLSketch:
+    """KLL quantile sketch: about k * 3 retained values whatever the stream length"""
+
+    def __init__(self, k=200, seed=42):
+        self.k = k
+        self.compactors = [[]]
+        self.size = 0
+        self.n = 0
+        self.rng = random.Random(seed)
+
+    def _capacity(self, level):
+        depth = len(self.compactors) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _max_size(self):
+        return sum(self._capacity(level) for level in range(len(self.compactors)))
+
+    def update_many(self, values):
+        self.compactors[0].extend(float(v) for v in values)
+        self.size = sum(len(items) for items in self.compactors)
+        self.n += len(values)
+        while self.size >= self._max_size():
+            self._compress()
+
+    def _compress(self):
+        for level, items in enumerate(self.compactors):
+            if len(items) < self._capacity(level):
+                continue
+            if level + 1 == len(self.compactors):
+                self.compactors.append([])
+            items.sort()
+            # An odd item out stays at this level
+            keep = [items.pop()] if len(items) % 2 else []
+            self.compactors[level + 1].extend(items[self.rng.randint(0, 1)::2])
+            self.compactors[level] = keep
+            break
+        self.size = sum(len(items) for items in self.compactors)
+
+    def _weighted(self):
+        values = np.concatenate([np.asarray(items, dtype=np.float64) for items in self.compactors])
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.compactors)])
+        order = np.argsort(values, kind='stable')
+        return values[order], np.cumsum(weights[order])
+
+    def quantiles(self, qs):
+        if not self.n:
+            return [float('nan')] * len(qs)
+        values, cumulative = self._weighted()
+        ranks = np.asarray(qs, dtype=np.float64) * cumulative[-1]
+        idx = np.minimum(np.searchsorted(cumulative, ranks, side='left'), len(values) - 1)
+        return values[idx].tolist()
+
+    def cdf(self, xs):
+        """Fraction of the stream at or below each x"""
+        if not self.n:
+            return np.zeros(len(xs))
+        values, cumulative = self._weighted()
+        idx = np.searchsorted(values, np.asarray(xs, dtype=np.float64), side='right')
+        return np.where(idx > 0, cumulative[np.maximum(idx - 1, 0)], 0.0) / cumulative[-1]
+
+class HeavyHitters:
+    """Misra-Gries counters: frequent items within n / (capacity + 1) using fixed memory"""
+
+    def __init__(self, capacity=500):
+        self.capacity = capacity
+        self.counts = {}
+
+    def update_many(self, items):
+        for item, count in Counter(items).items():
+            self.counts[item] = self.counts.get(item, 0) + count
+        if len(self.counts) > self.capacity:
+            ranked = sorted(self.counts.items(), key=lambda kv: -kv[1])
+            floor = ranked[self.capacity][1]
+            self.counts = {item: count - floor for item, count in ranked[:self.capacity] if count > floor}
+
+    def top(self, n):
+        return [item for item, _ in sorted(self.counts.items(), key=lambda kv: -kv[1])[:n]]
+
+def reference_distribution(model, vectorizer, texts, categories=None, top_n=TOP_NGRAMS):
+    """Training-time distribution summary stored in model metadata as 'reference_distribution'"""
+    texts = list(texts)
+    real_index = list(model.classes_).index('real')
+    probabilities = model.predict_proba(vectorizer.transform(texts))[:, real_index]
+    grams = Counter(gram for text in texts for gram in set(ngrams(text)))
+
+    reference = {
+        'size': len(texts),
+        'quantile_grid': QUANTILE_GRID,
+        'real_probability_quantiles': np.quantile(probabilities, QUANTILE_GRID).round(6).tolist(),
+        'predicted_fake_rate': round(float(np.mean(probabilities < 0.5)), 6),
+        'top_ngrams': [gram for gram, _ in grams.most_common(top_n)]
+    }
+    if categories is not None:
+        shares = Counter(categories)
+        reference['categories'] = {c: round(n / len(texts), 6) for c, n in shares.items()}
+    return reference
+
+class DriftWindow:
+    """Sketches for one time window of live predictions"""
+
+    def __init__(self, start):
+        self.start = start
+        self.probabilities = KLLSketch()
+        self.fake = 0
+        self.categories = Counter()
+        self.ngrams = HeavyHitters()
+
+    @property
+    def n(self):
+        return self.probabilities.n
+
+    def add(self, probabilities, categories=None, texts=None):
+        probabilities = np.asarray(probabilities, dtype=np.float64)
+        self.probabilities.update_many(probabilities)
+        self.fake += int((probabilities < 0.5).sum())
+        if categories is not None:
+            self.categories.update(categories)
+        if texts is not None:
+            self.ngrams.update_many(gram for text in texts for gram in set(ngrams(text)))
+
+    def category_shares(self):
+        total = sum(self.categories.values())
+        return {c: n / total for c, n in self.categories.items()} if total else {}
+
+def compare(window, reference, category_baseline=None):
+    """Drift metrics of a window against the reference distribution"""
+    grid = np.asarray(reference.get('quantile_grid', QUANTILE_GRID))
+    ref_quantiles = np.asarray(reference['real_probability_quantiles'])
+    observed = window.probabilities.cdf(ref_quantiles)
+
+    # Bin masses between consecutive reference quantiles, with the outermost bins left open
+    edges = np.concatenate([[0.0], observed[1:-1], [1.0]])
+    ref_mass = np.clip(np.diff(grid), 1e-4, None)
+    win_mass = np.clip(np.diff(edges), 1e-4, None)
+    metrics = {
+        'ks': float(np.abs(observed - grid)[1:-1].max()),
+        'psi': float(((win_mass - ref_mass) * np.log(win_mass / ref_mass)).sum()),
+        'fake_rate_delta': abs(window.fake / window.n - reference['predicted_fake_rate'])
+    }
+
+    baseline = reference.get('categories') or category_baseline
+    shares = window.category_shares()
+    if baseline and shares:
+        metrics['category_tvd'] = 0.5 * sum(abs(shares.get(c, 0.0) - baseline.get(c, 0.0))
+                                            for c in set(shares) | set(baseline))
+
+    top = window.ngrams.top(len(reference.get('top_ngrams', [])))
+    if top:
+        metrics['ngram_novelty'] = 1 - len(set(top) & set(reference['top_ngrams'])) / len(top)
+    return {name: round(value, 4) for name, value in metrics.items()}
+
+class DriftMonitor:
+    """Rolls fixed-length windows of live predictions and raises alerts when one drifts"""
+
+    def __init__(self, reference, window_seconds=WINDOW_SECONDS, min_window_size=MIN_WINDOW_SIZE,
+                 thresholds=None, alert_log=ALERT_LOG_PATH):
+        self.reference = reference
+        self.window_seconds = window_seconds
+        self.min_window_size = min_window_size
+        self.thresholds = dict(DRIFT_THRESHOLDS, **(thresholds or {}))
+        self.alert_log = alert_log
+        self.window = None
+        # Without training category shares, the first full window becomes the category baseline
+        self.category_baseline = None
+        self.summaries = []
+
+    @classmethod
+    def from_metadata(cls, metadata_path, **kwargs):
+        with open(metadata_path, 'r') as f:
+            metadata = json.load(f)
+        if 'reference_distribution' not in metadata:
+            raise ValueError(f"{metadata_path} has no reference_distribution; retrain to record one")
+        return cls(metadata['reference_distribution'], **kwargs)
+
+    def observe(self, probabilities, categories=None, texts=None, timestamp=None):
+        """Add a batch of real-class probabilities; returns alerts of any window this closed"""
+        timestamp = time.time() if timestamp is None else timestamp
+        alerts = []
+        if self.window is not None and timestamp >= self.window.start + self.window_seconds:
+            alerts = self.close_window()
+        if self.window is None:
+            self.window = DriftWindow(timestamp - timestamp % self.window_seconds)
+        self.window.add(probabilities, categories, texts)
+        return alerts
+
+    def close_window(self):
+        window, self.window = self.window, None
+        if window is None or window.n < self.min_window_size:
+            return []
+
+        metrics = compare(window, self.reference, self.category_baseline)
+        if self.category_baseline is None and 'categories' not in self.reference:
+            self.category_baseline = window.category_shares() or None
+        alerts = [{
+            'windowStart': window.start,
+            'windowEnd': window.start + self.window_seconds,
+            'metric': name,
+            'value': value,
+            'threshold': self.thresholds[name]
+        } for name, value in metrics.items() if value > self.thresholds[name]]
+
+        self.summaries.append({'windowStart': window.start, 'size': window.n,
+                               'metrics': metrics, 'alerts': len(alerts)})
+        del self.summaries[:-MAX_SUMMARIES]
+        if alerts and self.alert_log:
+            with open(self.alert_log, 'a') as f:
+                for alert in alerts:
+                    f.write(json.dumps(alert) + '\n')
+        return alerts
@@ -0,0 +1,247 @@
+"""
+SafeZoneX Flat Forest Evaluator
+Flattens the ensemble's random forest into contiguous arrays and evaluates all trees per batch at once
+"""
+import argparse
+import time
+
+import joblib
+import numpy as np
+from scipy import sparse
+from sklearn.ensemble import RandomForestClassifier
+
+from calibration import CalibratedModel
+
+MODEL_PATH = 'safety_report_classifier_high_accuracy.pkl'
+VECTORIZER_PATH = 'tfidf_vectorizer_high_accuracy.pkl'
+FLAT_FOREST_PATH = 'random_forest_high_accuracy_flat.npz'
+
+BENCHMARK_BATCH_SIZES = (1, 32, 1024)
+# Largest dense (rows x split features) block densified from a sparse batch at once
+DENSE_CHUNK_CELLS = 1 << 22
+
+def float32_threshold(threshold):
+    """Largest float32 <= each float64 threshold, so x <= t is unchanged for float32 x"""
+    t32 = threshold.astype(np.float32)
+    too_high = t32.astype(np.float64) > threshold
+    t32[too_high] = np.nextafter(t32[too_high], np.float32(-np.inf))
+    return t32
+
+def _smallest_int(limit):
+    return np.int16 if limit < np.iinfo(np.int16).max else np.int32
+
+class FlatForest:
+    """All trees of a fitted forest in one set of node arrays.
+
+    Node i of every tree lives at roots[t] + i; children hold global node
+    positions and are -1 at leaves. value holds per-node class
+    probabilities, already normalised the way DecisionTreeClassifier does,
+    optionally quantized to integers out of leaf_scale.
+    """
+
+    def __init__(self, classes, n_features, roots, feature, threshold, left, right, value, leaf_scale=1):
+        self.classes_ = classes
+        self.n_classes_ = len(classes)
+        self.n_features = n_features
+        self.roots = roots
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.leaf_scale = leaf_scale
+
+    @classmethod
+    def from_forest(cls, forest, compact=False, leaf_bits=8):
+        """Flatten a fitted RandomForestClassifier; compact=True shrinks every dtype"""
+        trees = [est.tree_ for est in forest.estimators_]
+        counts = np.array([tree.node_count for tree in trees])
+        roots = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        total = int(counts.sum())
+
+        def children(attr):
+            parts = []
+            for root, tree in zip(roots, trees):
+                child = getattr(tree, attr).astype(np.int64)
+                parts.append(np.where(child >= 0, child + root, -1))
+            return np.concatenate(parts)
+
+        values = np.concatenate([tree.value[:, 0, :] for tree in trees])
+        totals = values.sum(axis=1, keepdims=True)
+        totals[totals == 0] = 1.0
+        values = values / totals
+
+        feature = np.concatenate([tree.feature for tree in trees])
+        threshold = np.concatenate([tree.threshold for tree in trees])
+        left, right = children('children_left'), children('children_right')
+
+        if not compact:
+            return cls(forest.classes_, forest.n_features_in_, roots.astype(np.int64),
+                       feature.astype(np.int64), threshold, left, right, values)
+
+        leaf_dtype = np.uint8 if leaf_bits <= 8 else np.uint16
+        leaf_scale = int(np.iinfo(leaf_dtype).max)
+        index_dtype = _smallest_int(total)
+        return cls(forest.classes_, forest.n_features_in_, roots.astype(index_dtype),
+                   feature.astype(_smallest_int(forest.n_features_in_)),
+                   float32_threshold(threshold),
+                   left.astype(index_dtype), right.astype(index_dtype),
+                   np.rint(values * leaf_scale).astype(leaf_dtype), leaf_scale)
+
+    def __getstate__(self):
+        # Walk tables are rebuilt on first use rather than pickled with the forest
+        state = dict(self.__dict__)
+        state.pop('_walk', None)
+        return state
+
+    @property
+    def walk_tables(self):
+        """Split feature ids plus per-node tables for a fixed-depth walk.
+
+        Leaves loop back to themselves with an infinite threshold, so every
+        (row, tree) pair can take the same number of steps without tracking
+        which ones have finished. children interleaves right/left so one
+        gather at 2 * node + go_left picks the next node.
+        """
+        if getattr(self, '_walk', None) is None:
+            split = self.left >= 0
+            nodes = np.arange(len(self.left), dtype=np.intp)
+            used = np.unique(self.feature[split].astype(np.int64))
+            column = np.zeros(len(self.left), dtype=np.intp)
+            column[split] = np.searchsorted(used, self.feature[split].astype(np.int64))
+            # Rows are densified as float32, so float32 thresholds give the same comparisons
+            threshold = float32_threshold(np.where(split, self.threshold, np.inf).astype(np.float64))
+            children = np.stack([np.where(split, self.right, nodes), np.where(split, self.left, nodes)],
+                                axis=1).astype(np.intp).ravel()
+
+            depth, frontier = 0, self.roots.astype(np.int64)
+            while True:
+                frontier = frontier[split[frontier]]
+                if not frontier.size:
+                    break
+                depth += 1
+                frontier = np.concatenate([self.left[frontier], self.right[frontier]]).astype(np.int64)
+            self._walk = used, column, threshold, children, depth
+        return self._walk
+
+    def _dense_columns(self, X):
+        """The batch restricted to the split features, as a dense float32 (rows, used) array"""
+        used = self.walk_tables[0]
+        if sparse.issparse(X):
+            return sparse.csr_matrix(X)[:, used].toarray().astype(np.float32, copy=False)
+        return np.asarray(X, dtype=np.float32)[:, used]
+
+    def apply(self, X):
+        """Leaf position reached by every row in every tree, shape (rows, trees)"""
+        # Row chunks bound the dense copy of the split features
+        chunk = max(1, DENSE_CHUNK_CELLS // max(len(self.walk_tables[0]), 1))
+        if X.shape[0] <= chunk:
+            return self._walk_dense(self._dense_columns(X))
+        return np.concatenate([self._walk_dense(self._dense_columns(X[first:first + chunk]))
+                               for first in range(0, X.shape[0], chunk)])
+
+    def _walk_dense(self, dense):
+        _, column, threshold, children, depth = self.walk_tables
+        n_rows, n_used = dense.shape
+        n_trees = len(self.roots)
+        flat = dense.ravel()
+        row_start = np.repeat(np.arange(n_rows, dtype=np.intp) * n_used, n_trees)
+        node = np.tile(self.roots.astype(np.intp), n_rows)
+
+        # One step per depth level for all (row, tree) pairs at once
+        for _ in range(depth):
+            go_left = flat[row_start + column[node]] <= threshold[node]
+            node = children[2 * node + go_left]
+
+        return node.reshape(n_rows, n_trees)
+
+    def predict_proba(self, X):
+        leaves = self.apply(X)
+        proba = self.value[leaves].sum(axis=1, dtype=np.float64)
+        return proba / (self.leaf_scale * len(self.roots))
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def save(self, path=FLAT_FOREST_PATH):
+        np.savez(path, classes=self.classes_, n_features=self.n_features, roots=self.roots,
+                 feature=self.feature, threshold=self.threshold, left=self.left,
+                 right=self.right, value=self.value, leaf_scale=self.leaf_scale)
+
+    @classmethod
+    def load(cls, path=FLAT_FOREST_PATH):
+        arrays = np.load(path, allow_pickle=True)
+        return cls(arrays['classes'], int(arrays['n_features']), arrays['roots'],
+                   arrays['feature'], arrays['threshold'], arrays['left'], arrays['right'],
+                   arrays['value'], int(arrays['leaf_scale']))
+
+def find_forest(model):
+    """The random forest member of a saved model (the model itself or a VotingClassifier member)"""
+    if isinstance(model, RandomForestClassifier):
+        return model
+    if isinstance(model, CalibratedModel):
+        return find_forest(model.model)
+    for est in getattr(model, 'estimators_', []):
+        if isinstance(est, RandomForestClassifier):
+            return est
+    raise ValueError(f"No RandomForestClassifier in {type(model).__name__}")
+
+def benchmark(forest, flat, X, batch_sizes=BENCHMARK_BATCH_SIZES, repeats=20):
+    """ms per batch for sklearn's predict_proba and the flat evaluator"""
+    rng = np.random.default_rng(42)
+    results = []
+
+    print(f"\n{'Batch':>6} {'sklearn ms':>11} {'flat ms':>9} {'Speedup':>8} {'Max |Δp|':>10}")
+    for size in batch_sizes:
+        batch = X[rng.integers(0, X.shape[0], size=size)]
+        expected = forest.predict_proba(batch)
+        actual = flat.predict_proba(batch)
+        max_delta = float(np.abs(expected - actual).max())
+
+        timings = {}
+        for name, fn in (('sklearn', forest.predict_proba), ('flat', flat.predict_proba)):
+            start = time.perf_counter()
+            for _ in range(repeats):
+                fn(batch)
+            timings[name] = (time.perf_counter() - start) / repeats * 1000
+
+        results.append({
+            'batch_size': size,
+            'sklearn_ms': round(timings['sklearn'], 3),
+            'flat_ms': round(timings['flat'], 3),
+            'speedup': round(timings['sklearn'] / timings['flat'], 2),
+            'max_abs_delta': max_delta
+        })
+        print(f"{size:>6} {timings['sklearn']:>11.3f} {timings['flat']:>9.3f} "
+              f"{timings['sklearn'] / timings['flat']:>7.1f}x {max_delta:>10.2e}")
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Export and benchmark the flat random forest evaluator')
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--vectorizer', default=VECTORIZER_PATH)
+    parser.add_argument('--out', default=FLAT_FOREST_PATH)
+    args = parser.parse_args()
+
+    print("🌲 SafeZoneX Flat Forest Export")
+    print("=" * 50)
+
+    from train_high_accuracy import create_comprehensive_dataset
+
+    forest = find_forest(joblib.load(args.model))
+    vectorizer = joblib.load(args.vectorizer)
+    flat = FlatForest.from_forest(forest)
+    flat.save(args.out)
+    print(f"✅ {len(flat.roots)} trees, {len(flat.left)} nodes flattened to {args.out}")
+
+    X = vectorizer.transform(create_comprehensive_dataset()['text'])
+    if not np.allclose(forest.predict_proba(X), flat.predict_proba(X), rtol=0, atol=1e-12):
+        print("❌ Flat evaluator disagrees with predict_proba")
+        return
+    print("🔍 Probabilities match predict_proba on the full corpus")
+
+    benchmark(forest, flat, X)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+SafeZoneX Evidence Image Hashes
+Perceptual hashes of evidence images with a BK-tree for spotting reused photos across reports
+"""
+import argparse
+import base64
+import hashlib
+import io
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import joblib
+import numpy as np
+
+from alerts_export import iter_alerts, iter_chunks
+
+HASH_INDEX_PATH = 'image_hash_index.pkl'
+
+# Hamming distance on the 64-bit pHash at or below which two images count as the same photo
+MATCH_DISTANCE = 8
+HASH_SIZE = 8
+DCT_SIZE = 32
+
+def _dct_matrix(n):
+    k = np.arange(n)[:, None]
+    matrix = np.cos(np.pi * (2 * np.arange(n)[None] + 1) * k / (2 * n))
+    matrix[0] /= np.sqrt(2)
+    return matrix * np.sqrt(2 / n)
+
+DCT = _dct_matrix(DCT_SIZE)
+
+def _pack(bits):
+    return int(np.packbits(bits.ravel().astype(np.uint8)).view('>u8')[0])
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+def _read_source(source):
+    """Raw bytes of a file path, data: URI or http(s) URL as stored in evidenceImages"""
+    if source.startswith('data:'):
+        return base64.b64decode(source.split(',', 1)[1])
+    if source.startswith(('http://', 'https://')):
+        from urllib.request import urlopen
+        with urlopen(source, timeout=10) as response:
+            return response.read()
+    with open(source, 'rb') as f:
+        return f.read()
+
+def _open_image(data):
+    try:
+        from PIL import Image
+    except ImportError:
+        raise ImportError("Hashing evidence images needs Pillow (pip install Pillow)")
+    image = Image.open(io.BytesIO(data))
+    # JPEG draft mode decodes straight to a reduced scale, skipping most of the full-size work
+    image.draft('L', (DCT_SIZE * 2, DCT_SIZE * 2))
+    return image.convert('L')
+
+def perceptual_hashes(image):
+    """aHash, dHash and pHash (64-bit ints) of a greyscale PIL image"""
+    from PIL import Image
+    small = np.asarray(image.resize((DCT_SIZE, DCT_SIZE), Image.LANCZOS), dtype=np.float64)
+    tiny = np.asarray(image.resize((HASH_SIZE, HASH_SIZE), Image.BILINEAR), dtype=np.float64)
+    wide = np.asarray(image.resize((HASH_SIZE + 1, HASH_SIZE), Image.BILINEAR), dtype=np.float64)
+
+    low = (DCT @ small @ DCT.T)[:HASH_SIZE, :HASH_SIZE].ravel()
+    return {
+        'ahash': _pack(tiny > tiny.mean()),
+        'dhash': _pack(wide[:, 1:] > wide[:, :-1]),
+        # The DC term is left out of the median so a flat brightness shift does not flip bits
+        'phash': _pack(low > np.median(low[1:]))
+    }
+
+def source_key(source):
+    """Cache key: path plus mtime and size for files, a content digest for data: URIs"""
+    if source.startswith('data:'):
+        return 'data:' + hashlib.blake2b(source.encode('utf-8'), digest_size=16).hexdigest()
+    if source.startswith(('http://', 'https://')):
+        return source
+    stat = os.stat(source)
+    return f"{os.path.abspath(source)}:{stat.st_mtime_ns}:{stat.st_size}"
+
+class BKTree:
+    """Burkhard-Keller tree over 64-bit hashes; radius queries skip subtrees by the triangle inequality"""
+
+    def __init__(self):
+        self.root = None
+
+    def add(self, value, item):
+        if self.root is None:
+            self.root = [value, [item], {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [item], {}]
+                return
+            node = child
+
+    def query(self, value, radius):
+        """(distance, item) pairs within radius"""
+        found, stack = [], [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if distance <= radius:
+                found.extend((distance, item) for item in node[1])
+            for edge, child in node[2].items():
+                if distance - radius <= edge <= distance + radius:
+                    stack.append(child)
+        return sorted(found, key=lambda pair: pair[0])
+
+def _hash_source(source):
+    """Hashes of one source, or None for unreadable or non-image evidence"""
+    try:
+        return perceptual_hashes(_open_image(_read_source(source)))
+    except ImportError:
+        raise
+    except Exception:
+        # Unreadable or non-image evidence is skipped, not fatal
+        return None
+
+class ImageHashIndex:
+    """Hashes cached per source, plus a BK-tree of pHashes pointing at the reports that used them"""
+
+    def __init__(self, max_workers=8):
+        self.max_workers = max_workers
+        self.cache = {}
+        self.tree = BKTree()
+        self.size = 0
+        self._pool = None
+
+    def __getstate__(self):
+        # The decoding pool belongs to this process; a loaded index starts its own
+        state = dict(self.__dict__)
+        state['_pool'] = None
+        return state
+
+    def __setstate__(self, state):
+        state.setdefault('_pool', None)
+        self.__dict__.update(state)
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def hash_images(self, sources):
+        """Hashes for each source, decoding each uncached source once on the shared thread pool.
+
+        Sources are deduplicated by source_key first, so a photo repeated within a
+        batch is read and decoded once; the cache is only written from this thread.
+        """
+        keys = []
+        for source in sources:
+            try:
+                keys.append((source_key(source), source))
+            except OSError:
+                keys.append((None, source))
+        missing = {}
+        for key, source in keys:
+            if key is not None and key not in self.cache:
+                missing.setdefault(key, source)
+        if len(missing) == 1:
+            key, source = next(iter(missing.items()))
+            self.cache[key] = _hash_source(source)
+        elif missing:
+            for key, hashes in zip(missing, self.pool.map(_hash_source, missing.values())):
+                self.cache[key] = hashes
+        return [None if key is None else self.cache[key] for key, _ in keys]
+
+    def add_report(self, alert_id, sources):
+        sources = list(sources)
+        for source, hashes in zip(sources, self.hash_images(sources)):
+            if hashes is not None:
+                self.tree.add(hashes['phash'], (alert_id, source))
+                self.size += 1
+
+    def add_alerts(self, alerts):
+        """Index a batch of Alert documents, decoding all of their images on one pool"""
+        pairs = [(alert.get('alertId'), source) for alert in alerts
+                 for source in (alert.get('evidenceImages') or [])]
+        for (alert_id, source), hashes in zip(pairs, self.hash_images(source for _, source in pairs)):
+            if hashes is not None:
+                self.tree.add(hashes['phash'], (alert_id, source))
+                self.size += 1
+
+    def check(self, sources, radius=MATCH_DISTANCE, exclude_alert=None):
+        """Earlier reports that used a near-identical image, per submitted image"""
+        sources = list(sources)
+        matches = []
+        for source, hashes in zip(sources, self.hash_images(sources)):
+            if hashes is None:
+                continue
+            for distance, (alert_id, seen_source) in self.tree.query(hashes['phash'], radius):
+                if alert_id != exclude_alert:
+                    matches.append({'image': source, 'matchedAlertId': alert_id,
+                                    'matchedImage': seen_source, 'distance': distance})
+        return matches
+
+    def save(self, path=HASH_INDEX_PATH):
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path=HASH_INDEX_PATH):
+        return joblib.load(path)
+
+def main():
+    parser = argparse.ArgumentParser(description='Perceptual-hash index of evidence images')
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help='Hash and index the evidenceImages of an alerts export')
+    build.add_argument('alerts')
+    build.add_argument('--workers', type=int, default=8)
+    build.add_argument('--out', default=HASH_INDEX_PATH)
+    check = sub.add_parser('check', help='Look up images (paths, URLs or data: URIs) against the index')
+    check.add_argument('images', nargs='+')
+    check.add_argument('--radius', type=int, default=MATCH_DISTANCE)
+    check.add_argument('--index', default=HASH_INDEX_PATH)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        index = ImageHashIndex(args.workers)
+        start = time.perf_counter()
+        for chunk in iter_chunks(iter_alerts(args.alerts), 1000):
+            index.add_alerts(chunk)
+        index.close()
+        index.save(args.out)
+        print(f"✅ Indexed {index.size} images in {time.perf_counter() - start:.1f}s, saved to {args.out}")
+        return
+
+    index = ImageHashIndex.load(args.index)
+    start = time.perf_counter()
+    matches = index.check(args.images, args.radius)
+    index.close()
+    print(json.dumps({'matches': matches, 'elapsedMs': round((time.perf_counter() - start) * 1000, 3)}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,527 @@
+"""
+SafeZoneX Inference Service
+Loads a trained model family once and scores report batches, with live drift monitoring
+"""
+import argparse
+import json
+import os
+import queue
+import random
+import re
+import shutil
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import joblib
+import numpy as np
+
+from alerts_export import DEFAULT_CAMPUS
+from model_registry import REGISTRY_DIR, current_version, set_current, version_paths
+from report_scorer import as_report
+
+# Artifacts written by train_high_accuracy.py (v4.0) and train_ml_enhanced.py (v3.0)
+FAMILIES = {
+    'high_accuracy': {
+        'model': 'safety_report_classifier_high_accuracy.pkl',
+        'vectorizer': 'tfidf_vectorizer_high_accuracy.pkl',
+        'metadata': 'model_metadata_high_accuracy.json'
+    },
+    'enhanced': {
+        'model': 'safety_report_classifier_enhanced.pkl',
+        'vectorizer': 'tfidf_vectorizer_enhanced.pkl',
+        'metadata': 'model_metadata_enhanced.json'
+    }
+}
+DEFAULT_FAMILY = 'high_accuracy'
+
+# Per-campus shards: SHARDS_DIR/registry.json maps campus name -> shard directory
+SHARDS_DIR = 'campus_models'
+SHARD_FILES = {'model': 'model.pkl', 'vectorizer': 'vectorizer.pkl', 'metadata': 'metadata.json'}
+SHARD_CACHE_BYTES = 512 * 1024 * 1024
+
+# Hot-swap: registry poll interval and the batch a new version must pass before it serves traffic
+WATCH_SECONDS = 5.0
+SMOKE_MIN_ACCURACY = 0.75
+SMOKE_REPORTS = [
+    ("Person with a knife threatening students near the library entrance", 'real'),
+    ("Broken street light near KK8 makes the walkway very dark at night", 'real'),
+    ("Someone stole my laptop from the study area in the main library", 'real'),
+    ("Suspicious man following female students from the library to the parking lot", 'real'),
+    ("Congratulations you won a free iPhone click here to claim your prize", 'fake'),
+    ("test test testing the app", 'fake'),
+    ("Win free money now limited time offer act now", 'fake'),
+    ("Share this message to 20 people and your crush will text you today", 'fake'),
+]
+
+# Shadow scoring: per-window comparison summaries of candidate families against the primary
+SHADOW_SAMPLE_RATE = 0.1
+SHADOW_WINDOW_SECONDS = 300
+SHADOW_QUEUE_SIZE = 256
+SHADOW_LOG_PATH = 'shadow_summaries.jsonl'
+# Latency histogram bucket upper edges (ms per report); the last bucket is open
+LATENCY_EDGES_MS = [0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500]
+PROMOTION_MIN_REPORTS = 1000
+PROMOTION_MIN_AGREEMENT = 0.95
+PROMOTION_MAX_LATENCY_RATIO = 1.5
+
+class ModelService:
+    """One vectorizer/classifier pair answering batches of reports"""
+
+    def __init__(self, model, vectorizer, metadata=None, monitor=None):
+        self.model = model
+        self.vectorizer = vectorizer
+        self.metadata = metadata or {}
+        self.monitor = monitor
+        self.real_index = list(model.classes_).index('real')
+
+    @classmethod
+    def from_paths(cls, model_path, vectorizer_path, metadata_path=None, monitor=True):
+        metadata = {}
+        if metadata_path and os.path.exists(metadata_path):
+            with open(metadata_path, 'r') as f:
+                metadata = json.load(f)
+        drift = None
+        if monitor and 'reference_distribution' in metadata:
+            from drift_monitor import DriftMonitor
+            drift = DriftMonitor(metadata['reference_distribution'])
+        return cls(joblib.load(model_path), joblib.load(vectorizer_path), metadata, drift)
+
+    @classmethod
+    def from_family(cls, family=DEFAULT_FAMILY, monitor=True):
+        paths = FAMILIES[family]
+        return cls.from_paths(paths['model'], paths['vectorizer'], paths['metadata'], monitor)
+
+    def memory_bytes(self):
+        """Approximate resident size: arrays plus the vectorizer's vocabulary dict"""
+        from compact_export import array_nbytes
+        vocabulary = getattr(self.vectorizer, 'vocabulary_', {})
+        vocabulary_bytes = sys.getsizeof(vocabulary) + sum(sys.getsizeof(term) + 32 for term in vocabulary)
+        return array_nbytes(self.model) + array_nbytes(self.vectorizer) + vocabulary_bytes
+
+    def real_probability(self, texts):
+        return self.model.predict_proba(self.vectorizer.transform(texts))[:, self.real_index]
+
+    def predict(self, reports):
+        """prediction, confidence and realProbability for every report in one batch"""
+        reports = [as_report(r) for r in reports]
+        if not reports:
+            return []
+        texts = [r.get('description') or '' for r in reports]
+        probabilities = self.real_probability(texts)
+
+        if self.monitor is not None:
+            for alert in self.monitor.observe(probabilities, [r.get('alertType') or 'Other' for r in reports], texts):
+                print(f"⚠️ Drift: {alert['metric']} = {alert['value']} (threshold {alert['threshold']})",
+                      file=sys.stderr)
+
+        return [{
+            'prediction': 'real' if p >= 0.5 else 'fake',
+            'confidence': round(float(max(p, 1 - p)) * 100, 2),
+            'realProbability': round(float(p), 6)
+        } for p in probabilities]
+
+def report_campus(report):
+    return (report.get('location') or {}).get('campus') or report.get('campus') or DEFAULT_CAMPUS
+
+def shard_dirname(campus):
+    return re.sub(r'[^a-z0-9]+', '_', campus.lower()).strip('_')
+
+def register_shard(campus, model_path, vectorizer_path, metadata_path=None, shards_dir=SHARDS_DIR):
+    """Copy a trained artifact pair into the shard registry for one campus"""
+    target = os.path.join(shards_dir, shard_dirname(campus))
+    os.makedirs(target, exist_ok=True)
+    shutil.copyfile(model_path, os.path.join(target, SHARD_FILES['model']))
+    shutil.copyfile(vectorizer_path, os.path.join(target, SHARD_FILES['vectorizer']))
+    if metadata_path:
+        shutil.copyfile(metadata_path, os.path.join(target, SHARD_FILES['metadata']))
+
+    registry_path = os.path.join(shards_dir, 'registry.json')
+    registry = {}
+    if os.path.exists(registry_path):
+        with open(registry_path, 'r') as f:
+            registry = json.load(f)
+    registry[campus] = shard_dirname(campus)
+    with open(registry_path, 'w') as f:
+        json.dump(registry, f, indent=2)
+
+class CampusShards:
+    """Per-campus services loaded on first use and kept in an LRU cache bounded by memory.
+
+    Campuses without a registered shard are answered by the shared fallback family.
+    """
+
+    def __init__(self, shards_dir=SHARDS_DIR, fallback_family=DEFAULT_FAMILY,
+                 max_bytes=SHARD_CACHE_BYTES, monitor=True):
+        self.shards_dir = shards_dir
+        self.max_bytes = max_bytes
+        self.monitor = monitor
+        self.fallback = ModelService.from_family(fallback_family, monitor)
+        self.registry = {}
+        registry_path = os.path.join(shards_dir, 'registry.json')
+        if os.path.exists(registry_path):
+            with open(registry_path, 'r') as f:
+                self.registry = json.load(f)
+        self.cache = OrderedDict()
+        self.resident_bytes = 0
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def _stats(self, name):
+        return self.stats.setdefault(name, {'loads': 0, 'load_ms': 0.0, 'evictions': 0, 'bytes': 0,
+                                            'batches': 0, 'reports': 0, 'score_ms': 0.0})
+
+    def shard(self, campus):
+        """(name, service) for a campus, loading and evicting shards as needed"""
+        if campus not in self.registry:
+            return 'fallback', self.fallback
+        with self.lock:
+            if campus in self.cache:
+                self.cache.move_to_end(campus)
+                return campus, self.cache[campus][0]
+
+            directory = os.path.join(self.shards_dir, self.registry[campus])
+            start = time.perf_counter()
+            service = ModelService.from_paths(*(os.path.join(directory, SHARD_FILES[k])
+                                                for k in ('model', 'vectorizer', 'metadata')), self.monitor)
+            size = service.memory_bytes()
+            stats = self._stats(campus)
+            stats['loads'] += 1
+            stats['load_ms'] = round((time.perf_counter() - start) * 1000, 3)
+            stats['bytes'] = size
+
+            # Evict least recently used shards until the new one fits; a lone oversized shard still loads
+            while self.cache and self.resident_bytes + size > self.max_bytes:
+                cold, (_, cold_size) = self.cache.popitem(last=False)
+                self.resident_bytes -= cold_size
+                self._stats(cold)['evictions'] += 1
+            self.cache[campus] = (service, size)
+            self.resident_bytes += size
+            return campus, service
+
+    def predict(self, reports):
+        """Score a mixed-campus batch with one call per shard, keeping input order"""
+        reports = [as_report(r) for r in reports]
+        groups = OrderedDict()
+        for i, report in enumerate(reports):
+            groups.setdefault(report_campus(report), []).append(i)
+
+        results = [None] * len(reports)
+        for campus, positions in groups.items():
+            name, service = self.shard(campus)
+            start = time.perf_counter()
+            scored = service.predict([reports[i] for i in positions])
+            stats = self._stats(name)
+            stats['batches'] += 1
+            stats['reports'] += len(positions)
+            stats['score_ms'] += (time.perf_counter() - start) * 1000
+            for i, result in zip(positions, scored):
+                results[i] = dict(result, shard=name)
+        return results
+
+    def metrics(self):
+        shards = {}
+        for name, stats in self.stats.items():
+            shards[name] = dict(stats, resident=name in self.cache or name == 'fallback',
+                                ms_per_report=round(stats['score_ms'] / stats['reports'], 4) if stats['reports'] else None)
+            shards[name]['score_ms'] = round(stats['score_ms'], 3)
+        return {'resident_bytes': self.resident_bytes, 'max_bytes': self.max_bytes, 'shards': shards}
+
+def smoke_test(service, reports=SMOKE_REPORTS, min_accuracy=SMOKE_MIN_ACCURACY):
+    """Score a fixed labelled batch; a version must return sane probabilities and enough correct labels"""
+    texts = [text for text, _ in reports]
+    labels = np.array([label for _, label in reports])
+    start = time.perf_counter()
+    try:
+        probabilities = np.asarray(service.real_probability(texts), dtype=np.float64)
+    except Exception as e:
+        return {'passed': False, 'error': str(e)}
+    latency_ms = (time.perf_counter() - start) * 1000
+
+    sane = bool(np.all(np.isfinite(probabilities)) and np.all((probabilities >= 0) & (probabilities <= 1)))
+    accuracy = float(np.mean(np.where(probabilities >= 0.5, 'real', 'fake') == labels))
+    return {'passed': sane and accuracy >= min_accuracy, 'accuracy': round(accuracy, 4),
+            'latency_ms': round(latency_ms, 3)}
+
+class HotSwapService:
+    """Serves the CURRENT registry version of a family and swaps to new versions without a restart.
+
+    New versions are loaded and smoke-tested on the watcher thread. A request
+    reads the active (version, service) pair once, so batches in flight finish
+    on the model they started with. The replaced version stays loaded for rollback().
+    """
+
+    def __init__(self, family=DEFAULT_FAMILY, registry_dir=REGISTRY_DIR, poll_seconds=WATCH_SECONDS, monitor=True):
+        self.family = family
+        self.registry_dir = registry_dir
+        self.poll_seconds = poll_seconds
+        self.monitor = monitor
+        self.previous = None
+        self.rejected = set()
+        self.events = []
+        self.lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        version = current_version(family, registry_dir)
+        if version is None:
+            raise FileNotFoundError(f"No published {family} version in {registry_dir}; run the trainer first")
+        self.active = (version, self._load(version))
+
+    def _load(self, version):
+        paths = version_paths(self.family, version, self.registry_dir)
+        return ModelService.from_paths(paths['model'], paths['vectorizer'], paths['metadata'], self.monitor)
+
+    def _log(self, event, version, **details):
+        self.events.append(dict(details, event=event, version=version, time=time.time()))
+        del self.events[:-100]
+        print(f"🔄 {self.family} {event}: {version} {json.dumps(details) if details else ''}", file=sys.stderr)
+
+    def check_for_update(self):
+        """Load, smoke-test and activate CURRENT if it changed; returns True on a swap"""
+        version = current_version(self.family, self.registry_dir)
+        if version is None or version == self.active[0] or version in self.rejected:
+            return False
+        if self.previous is not None and version == self.previous[0]:
+            self.rollback()
+            return True
+
+        start = time.perf_counter()
+        service = self._load(version)
+        load_ms = round((time.perf_counter() - start) * 1000, 3)
+        result = smoke_test(service)
+        if not result['passed']:
+            self.rejected.add(version)
+            self._log('rejected', version, load_ms=load_ms, **result)
+            return False
+
+        with self.lock:
+            self.previous, self.active = self.active, (version, service)
+        self._log('activated', version, load_ms=load_ms, **result)
+        return True
+
+    def rollback(self):
+        """Swap back to the previously active version instantly and make it CURRENT again"""
+        with self.lock:
+            if self.previous is None:
+                raise RuntimeError(f"No previous {self.family} version loaded")
+            self.active, self.previous = self.previous, self.active
+        set_current(self.family, self.active[0], self.registry_dir)
+        self._log('rolled back', self.active[0])
+        return self.active[0]
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.check_for_update()
+            except Exception as e:
+                # A broken publish must never take down the serving process
+                print(f"❌ Registry watch failed: {e}", file=sys.stderr)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name=f"registry-watch-{self.family}", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def predict(self, reports):
+        version, service = self.active
+        return [dict(result, modelVersion=version) for result in service.predict(reports)]
+
+class ShadowWindow:
+    """Running sums for one candidate over one window; a fixed-size record whatever the traffic"""
+
+    def __init__(self):
+        self.reports = 0
+        self.agree = 0
+        self.delta_sum = 0.0
+        self.delta_max = 0.0
+        self.primary_ms = 0.0
+        self.candidate_ms = 0.0
+        self.latency_hist = np.zeros(len(LATENCY_EDGES_MS) + 1, dtype=np.int64)
+        self.errors = 0
+
+    def add(self, primary, candidate, primary_ms, candidate_ms):
+        delta = np.abs(candidate - primary)
+        self.reports += len(primary)
+        self.agree += int(((candidate >= 0.5) == (primary >= 0.5)).sum())
+        self.delta_sum += float(delta.sum())
+        self.delta_max = max(self.delta_max, float(delta.max()))
+        self.primary_ms += primary_ms
+        self.candidate_ms += candidate_ms
+        self.latency_hist[np.searchsorted(LATENCY_EDGES_MS, candidate_ms / len(primary))] += 1
+
+    def summary(self):
+        per_report = (lambda ms: round(ms / self.reports, 4) if self.reports else None)
+        batches = self.latency_hist.sum()
+        p95_bucket = int(np.searchsorted(np.cumsum(self.latency_hist), 0.95 * batches)) if batches else None
+        return {
+            'reports': self.reports,
+            'agreement': round(self.agree / self.reports, 4) if self.reports else None,
+            'mean_confidence_delta': round(self.delta_sum / self.reports * 100, 3) if self.reports else None,
+            'max_confidence_delta': round(self.delta_max * 100, 3),
+            'primary_ms_per_report': per_report(self.primary_ms),
+            'candidate_ms_per_report': per_report(self.candidate_ms),
+            # Upper edge of the bucket holding the 95th percentile batch; None means above the last edge
+            'candidate_p95_ms_per_report': (LATENCY_EDGES_MS[p95_bucket]
+                                            if p95_bucket is not None and p95_bucket < len(LATENCY_EDGES_MS)
+                                            else None),
+            'errors': self.errors
+        }
+
+class ShadowScorer:
+    """Serves the primary service and re-scores a sample of traffic with candidates on a worker thread.
+
+    The request path only samples and enqueues; when the bounded queue is full the
+    sample is dropped rather than delaying the response.
+    """
+
+    def __init__(self, primary, candidates, sample_rate=SHADOW_SAMPLE_RATE, window_seconds=SHADOW_WINDOW_SECONDS,
+                 log_path=SHADOW_LOG_PATH, queue_size=SHADOW_QUEUE_SIZE, seed=None):
+        self.primary = primary
+        self.candidates = dict(candidates)
+        self.sample_rate = sample_rate
+        self.window_seconds = window_seconds
+        self.log_path = log_path
+        self.rng = random.Random(seed)
+        self.queue = queue.Queue(maxsize=queue_size)
+        # Samples dropped on a full queue in the current window, and since start-up
+        self.dropped = 0
+        self.dropped_total = 0
+        self.window_start = None
+        self.windows = {name: ShadowWindow() for name in self.candidates}
+        self.totals = {name: ShadowWindow() for name in self.candidates}
+        self._thread = threading.Thread(target=self._work, name='shadow-scorer', daemon=True)
+        self._thread.start()
+
+    def predict(self, reports):
+        reports = [as_report(r) for r in reports]
+        start = time.perf_counter()
+        results = self.primary.predict(reports)
+        primary_ms = (time.perf_counter() - start) * 1000
+
+        sampled = [i for i in range(len(reports)) if self.rng.random() < self.sample_rate]
+        if sampled:
+            texts = [reports[i].get('description') or '' for i in sampled]
+            primary = np.array([results[i]['realProbability'] for i in sampled], dtype=np.float64)
+            try:
+                self.queue.put_nowait((time.time(), texts, primary, primary_ms * len(sampled) / len(reports)))
+            except queue.Full:
+                self.dropped += len(sampled)
+                self.dropped_total += len(sampled)
+        return results
+
+    def _work(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            timestamp, texts, primary, primary_ms = item
+            self._roll(timestamp)
+            for name, candidate in self.candidates.items():
+                try:
+                    start = time.perf_counter()
+                    probabilities = np.asarray(candidate.real_probability(texts), dtype=np.float64)
+                    candidate_ms = (time.perf_counter() - start) * 1000
+                except Exception:
+                    self.windows[name].errors += 1
+                    self.totals[name].errors += 1
+                    continue
+                for record in (self.windows[name], self.totals[name]):
+                    record.add(primary, probabilities, primary_ms, candidate_ms)
+
+    def _roll(self, timestamp):
+        window_start = timestamp - timestamp % self.window_seconds
+        if self.window_start is None:
+            self.window_start = window_start
+        if window_start > self.window_start:
+            self.flush()
+            self.window_start = window_start
+
+    def flush(self):
+        """Write the current window's summary per candidate and start a new window"""
+        if self.window_start is None:
+            return
+        dropped, self.dropped = self.dropped, 0
+        lines = [{'windowStart': self.window_start, 'candidate': name, 'dropped': dropped,
+                  'droppedTotal': self.dropped_total, **window.summary()}
+                 for name, window in self.windows.items() if window.reports or window.errors]
+        self.windows = {name: ShadowWindow() for name in self.candidates}
+        if lines and self.log_path:
+            with open(self.log_path, 'a') as f:
+                for line in lines:
+                    f.write(json.dumps(line) + '\n')
+
+    def close(self):
+        """Drain queued samples, stop the worker and flush the last window"""
+        self.queue.put(None)
+        self._thread.join()
+        self.flush()
+
+    def promotion_report(self):
+        """Cumulative comparison per candidate and whether it meets the promotion bar"""
+        report = {}
+        for name, totals in self.totals.items():
+            summary = totals.summary()
+            ratio = (summary['candidate_ms_per_report'] / summary['primary_ms_per_report']
+                     if summary['reports'] and summary['primary_ms_per_report'] else None)
+            summary['latency_ratio'] = round(ratio, 3) if ratio is not None else None
+            summary['ready_to_promote'] = bool(
+                summary['reports'] >= PROMOTION_MIN_REPORTS and not summary['errors'] and
+                summary['agreement'] >= PROMOTION_MIN_AGREEMENT and
+                ratio is not None and ratio <= PROMOTION_MAX_LATENCY_RATIO)
+            report[name] = summary
+        return report
+
+def main():
+    parser = argparse.ArgumentParser(description='Score report JSON lines from stdin')
+    parser.add_argument('--family', choices=sorted(FAMILIES), default=DEFAULT_FAMILY)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--no-drift', action='store_true', help='Disable drift monitoring')
+    parser.add_argument('--shards', metavar='DIR', help='Route reports to per-campus shards in DIR, '
+                                                         'falling back to --family')
+    parser.add_argument('--shard-cache-mb', type=float, default=SHARD_CACHE_BYTES / 2 ** 20)
+    parser.add_argument('--registry', metavar='DIR', help='Serve the CURRENT version of --family from a '
+                                                           'model registry and hot-swap new versions')
+    parser.add_argument('--shadow', nargs='+', choices=sorted(FAMILIES), default=[],
+                        help='Candidate families scored off the request path')
+    parser.add_argument('--shadow-rate', type=float, default=SHADOW_SAMPLE_RATE)
+    args = parser.parse_args()
+
+    if args.registry:
+        service = HotSwapService(args.family, args.registry, monitor=not args.no_drift).start()
+    elif args.shards:
+        service = CampusShards(args.shards, args.family, int(args.shard_cache_mb * 2 ** 20),
+                               monitor=not args.no_drift)
+    else:
+        service = ModelService.from_family(args.family, monitor=not args.no_drift)
+    primary = service
+    if args.shadow:
+        candidates = {name: ModelService.from_family(name, monitor=False) for name in args.shadow}
+        service = ShadowScorer(primary, candidates, args.shadow_rate)
+
+    batch = []
+    for line in sys.stdin:
+        if line.strip():
+            batch.append(json.loads(line))
+        if len(batch) >= args.batch_size:
+            for result in service.predict(batch):
+                print(json.dumps(result), flush=True)
+            batch = []
+    for result in service.predict(batch):
+        print(json.dumps(result), flush=True)
+    if args.shards:
+        print(json.dumps(primary.metrics()), file=sys.stderr)
+    if args.shadow:
+        service.close()
+        print(json.dumps(service.promotion_report(), indent=2), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+SafeZoneX Model Registry
+Versioned artifact directories per model family with an atomically switched CURRENT pointer
+"""
+import argparse
+import os
+import shutil
+import tempfile
+from datetime import datetime
+
+REGISTRY_DIR = 'model_registry'
+VERSION_FILES = {'model': 'model.pkl', 'vectorizer': 'vectorizer.pkl', 'metadata': 'metadata.json'}
+
+def family_dir(family, registry_dir=REGISTRY_DIR):
+    return os.path.join(registry_dir, family)
+
+def version_paths(family, version, registry_dir=REGISTRY_DIR):
+    directory = os.path.join(family_dir(family, registry_dir), version)
+    return {key: os.path.join(directory, name) for key, name in VERSION_FILES.items()}
+
+def list_versions(family, registry_dir=REGISTRY_DIR):
+    """Published versions, oldest first (names sort chronologically)"""
+    directory = family_dir(family, registry_dir)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name for name in os.listdir(directory)
+                  if name.startswith('v') and os.path.isdir(os.path.join(directory, name)))
+
+def current_version(family, registry_dir=REGISTRY_DIR):
+    try:
+        with open(os.path.join(family_dir(family, registry_dir), 'CURRENT'), 'r') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def set_current(family, version, registry_dir=REGISTRY_DIR):
+    """Point CURRENT at a published version; readers see either the old or the new name"""
+    if version not in list_versions(family, registry_dir):
+        raise ValueError(f"{family} has no published version {version}")
+    directory = family_dir(family, registry_dir)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.CURRENT.')
+    with os.fdopen(fd, 'w') as f:
+        f.write(version + '\n')
+    os.replace(tmp, os.path.join(directory, 'CURRENT'))
+
+def publish_version(family, model_path, vectorizer_path, metadata_path, registry_dir=REGISTRY_DIR,
+                    activate=True):
+    """Copy freshly saved artifacts into a new version directory, then optionally activate it.
+
+    Files are staged in a hidden directory and renamed into place, so a watcher
+    never sees a half-written version.
+    """
+    directory = family_dir(family, registry_dir)
+    os.makedirs(directory, exist_ok=True)
+    version = datetime.now().strftime('v%Y%m%d-%H%M%S-%f')
+    staging = tempfile.mkdtemp(dir=directory, prefix='.staging-')
+    for key, source in (('model', model_path), ('vectorizer', vectorizer_path), ('metadata', metadata_path)):
+        shutil.copyfile(source, os.path.join(staging, VERSION_FILES[key]))
+    os.rename(staging, os.path.join(directory, version))
+    if activate:
+        set_current(family, version, registry_dir)
+    return version
+
+def publish_validated(family, model_path, vectorizer_path, metadata_path, validation, registry_dir=REGISTRY_DIR):
+    """Publish a trained family's artifacts after its validation suites ran.
+
+    CURRENT only moves (and running inference services only hot-swap) when every
+    gated suite in validation meets its pass rate; otherwise the version is kept
+    for inspection. Returns the version and whether it was activated.
+    """
+    from validation_suite import gate_failures
+    failures = gate_failures(validation)
+    version = publish_version(family, model_path, vectorizer_path, metadata_path, registry_dir,
+                              activate=not failures)
+    print(f"\n📦 Registry version: {family_dir(family, registry_dir)}/{version}")
+    if failures:
+        print(f"⚠️ Validation gate failed ({'; '.join(failures)}), so CURRENT was not moved; "
+              f"activate it with: python model_registry.py activate {family} {version}")
+    else:
+        print("✅ Validation gates passed; CURRENT now points at this version")
+    return version, not failures
+
+def rollback(family, registry_dir=REGISTRY_DIR):
+    """Point CURRENT at the version published before the current one"""
+    versions = list_versions(family, registry_dir)
+    current = current_version(family, registry_dir)
+    if current not in versions or versions.index(current) == 0:
+        raise ValueError(f"{family} has no version before {current}")
+    previous = versions[versions.index(current) - 1]
+    set_current(family, previous, registry_dir)
+    return previous
+
+def main():
+    parser = argparse.ArgumentParser(description='Versioned model registry')
+    parser.add_argument('--registry', default=REGISTRY_DIR)
+    sub = parser.add_subparsers(dest='command', required=True)
+    show = sub.add_parser('list', help='List published versions of a family')
+    show.add_argument('family')
+    activate = sub.add_parser('activate', help='Point CURRENT at a version')
+    activate.add_argument('family')
+    activate.add_argument('version')
+    back = sub.add_parser('rollback', help='Point CURRENT at the previous version')
+    back.add_argument('family')
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        current = current_version(args.family, args.registry)
+        for version in list_versions(args.family, args.registry):
+            print(f"{'*' if version == current else ' '} {version}")
+    elif args.command == 'activate':
+        set_current(args.family, args.version, args.registry)
+        print(f"✅ {args.family} now serves {args.version}")
+    else:
+        print(f"✅ {args.family} rolled back to {rollback(args.family, args.registry)}")
+
+if __name__ == "__main__":
+    main()
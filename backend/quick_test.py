@@ -112,30 +112,12 @@ def main():
 
 def show_examples(model, vectorizer):
     """Show example tests"""
+    from validation_suite import load_suites, run_suites, print_results
     
     print("\n🧪 EXAMPLE TESTS:")
     print("-" * 30)
     
-    examples = [
-        ("Real Safety Report", "Someone broke into my dorm room last night and stole my laptop and books"),
-        ("Real Emergency", "Gas leak detected in dining hall, students evacuating immediately"),
-        ("Real Harassment", "Professor making inappropriate comments to female students in class"),
-        ("Fake Spam", "WIN $5000 NOW! Click here for free money! Limited time offer!"),
-        ("Fake Marketing", "Lose weight fast with miracle pills! No diet needed!"),
-        ("Fake Nonsense", "Purple unicorns flying around campus with rainbow wings")
-    ]
-    
-    for category, text in examples:
-        prediction, confidence, _ = test_text(model, vectorizer, text)
-        
-        # Check if prediction matches expected
-        expected_real = category.startswith("Real")
-        is_correct = (expected_real and prediction == "real") or (not expected_real and prediction == "fake")
-        status = "✅" if is_correct else "❌"
-        
-        print(f"\n{status} {category}:")
-        print(f"   Text: '{text}'")
-        print(f"   Result: {prediction.upper()} ({confidence:.1%})")
+    print_results(run_suites(model, vectorizer, load_suites(), ['quick_test_examples']), show_cases=True)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,308 @@
+"""
+SafeZoneX Unified Report Scorer
+Folds the server's keyword heuristics into vectorized features next to TF-IDF and
+returns confidence, status band and priority for a batch of reports in one call
+"""
+import argparse
+import json
+import re
+import sys
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+from scipy import sparse
+
+from alerts_export import ALERT_TYPES
+
+VECTORIZER_PATH = 'tfidf_vectorizer_high_accuracy.pkl'
+SCORER_PATH = 'report_scorer.pkl'
+METADATA_PATH = 'model_metadata_report_scorer.json'
+
+# Keyword groups and weights from calculateConfidence in server.js, compiled once per process
+KEYWORD_GROUPS = [
+    ('critical', re.compile(r'theft|robbery|stolen|steal|attack|assault|weapon|knife|gun|rape|murder|kidnap|abduct|drug deal|overdose|unconscious', re.I), 35),
+    ('high', re.compile(r'suspicious person|following|loiter|harassment|vandalism|graffiti|damage|broken|fight|threat|intimidat|unsafe|hazard|leak|fire|smoke', re.I), 25),
+    ('medium', re.compile(r'concern|worry|strange|unusual|unauthorized|trespass|noise|disturbance', re.I), 15),
+    ('infrastructure', re.compile(r'broken|faulty|not working|malfunctioning|damaged|leaking|blocked|unsafe|light|elevator|door lock|fire alarm|air conditioning|security camera|emergency exit|window|garbage|electrical|flood|handrail|street light|um accommodation|kk8', re.I), 20),
+    ('fake', re.compile(r'win|prize|click here|free money|congratulations|lottery|\$\d+|limited time offer|act now|claim|verify account|suspended|click link|download|sign up now', re.I), -40),
+    ('test', re.compile(r'test|testing|demo|sample|example|trying|check|dummy', re.I), -35),
+]
+KEYWORD_WEIGHTS = np.array([weight for _, _, weight in KEYWORD_GROUPS], dtype=np.float32)
+
+# Word lists from determineStatusAndPriority in server.js
+PRIORITY_WORDS = {
+    'critical': re.compile(r'weapon|gun|knife|attack|assault|rape|murder|kidnap|overdose|unconscious|emergency|critical|urgent', re.I),
+    'high': re.compile(r'theft|robbery|drug|harassment|following|stalk|threat|unsafe|fire|gas leak|chemical spill', re.I),
+    'medium': re.compile(r'suspicious|vandalism|damage|broken|unauthorized|trespass', re.I),
+}
+
+ALERT_TYPE_INDEX = {name: i for i, name in enumerate(ALERT_TYPES)}
+HIGH_PRIORITY_TYPES = {'Theft/Robbery', 'Drug Activity', 'Harassment', 'Safety Hazard'}
+CRITICAL_BOOST_TYPES = {'Theft/Robbery', 'Drug Activity', 'Harassment'}
+HIGH_BOOST_TYPES = {'Safety Hazard', 'Unauthorized Access'}
+
+FEATURE_NAMES = ([f'kw_{name}' for name, _, _ in KEYWORD_GROUPS] +
+                 ['len_over_80', 'len_over_150', 'evidence_images'] +
+                 [f'type_{name}' for name in ALERT_TYPES] +
+                 ['burst_score', 'reputation'])
+
+def as_report(report):
+    """Accept a bare description string or an Alert-like dict"""
+    if isinstance(report, str):
+        return {'description': report}
+    return report
+
+def _columns(reports):
+    reports = [as_report(r) for r in reports]
+    texts = [(r.get('description') or '').lower() for r in reports]
+    images = np.array([len(r.get('evidenceImages') or []) for r in reports], dtype=np.float32)
+    types = np.array([ALERT_TYPE_INDEX.get(r.get('alertType') or 'Other', ALERT_TYPE_INDEX['Other'])
+                      for r in reports], dtype=np.intp)
+    bursts = np.array([r.get('burstScore') or 0.0 for r in reports], dtype=np.float32)
+    reputations = np.array([r.get('reputation') or 0.0 for r in reports], dtype=np.float32)
+    return texts, images, types, bursts, reputations
+
+def keyword_matrix(texts):
+    """(n, groups) 0/1 matrix of keyword-group hits"""
+    hits = np.zeros((len(texts), len(KEYWORD_GROUPS)), dtype=np.float32)
+    for j, (_, pattern, _) in enumerate(KEYWORD_GROUPS):
+        search = pattern.search
+        hits[:, j] = [search(text) is not None for text in texts]
+    return hits
+
+def heuristic_features(reports):
+    """Dense heuristic block: keyword groups, length flags, evidence count, alertType one-hot,
+    burst score and reporter reputation"""
+    texts, images, types, bursts, reputations = _columns(reports)
+    lengths = np.fromiter((len(text) for text in texts), dtype=np.int32, count=len(texts))
+    one_hot = np.zeros((len(texts), len(ALERT_TYPES)), dtype=np.float32)
+    one_hot[np.arange(len(texts)), types] = 1.0
+    return np.hstack([
+        keyword_matrix(texts),
+        (lengths > 80)[:, None].astype(np.float32),
+        (lengths > 150)[:, None].astype(np.float32),
+        np.log1p(images)[:, None],
+        one_hot,
+        bursts[:, None],
+        reputations[:, None]
+    ])
+
+def heuristic_confidence(reports):
+    """Vectorized port of calculateConfidence: the regex-only path"""
+    reports = [as_report(r) for r in reports]
+    features = heuristic_features(reports)
+    n_groups = len(KEYWORD_GROUPS)
+    confidence = 40 + features[:, :n_groups] @ KEYWORD_WEIGHTS
+    confidence += 10 * features[:, n_groups] + 10 * features[:, n_groups + 1]
+    confidence += 15 * (features[:, n_groups + 2] > 0)
+    high_types = [n_groups + 3 + ALERT_TYPE_INDEX[t] for t in HIGH_PRIORITY_TYPES]
+    confidence += 10 * features[:, high_types].sum(axis=1)
+    return np.clip(confidence, 15, 95)
+
+def status_and_priority(confidence, reports):
+    """Vectorized port of determineStatusAndPriority"""
+    reports = [as_report(r) for r in reports]
+    texts = _columns(reports)[0]
+    alert_types = [r.get('alertType') or 'Other' for r in reports]
+    confidence = np.asarray(confidence)
+
+    band = np.select([confidence >= 70, confidence >= 30], [0, 1], default=2)
+    statuses = np.array(['verified', 'needs_review', 'unverified'])[band]
+    tags = np.array(['Verified', 'Needs Review', 'Unverified'])[band]
+
+    words = {level: np.array([pattern.search(t) is not None for t in texts], dtype=bool)
+             for level, pattern in PRIORITY_WORDS.items()}
+    critical_type = np.array([t in CRITICAL_BOOST_TYPES for t in alert_types], dtype=bool)
+    high_type = np.array([t in HIGH_BOOST_TYPES for t in alert_types], dtype=bool)
+
+    priority = np.select(
+        [words['critical'] | ((confidence >= 80) & critical_type),
+         words['high'] | ((confidence >= 65) & high_type),
+         words['medium'] | (confidence >= 50)],
+        ['critical', 'high', 'medium'], default='low')
+    return statuses, tags, priority
+
+class ReportScorer:
+    """TF-IDF plus heuristic features feeding one classifier"""
+
+    def __init__(self, vectorizer, model):
+        self.vectorizer = vectorizer
+        self.model = model
+        self.real_index = list(model.classes_).index('real') if hasattr(model, 'classes_') else 1
+
+    def features(self, reports):
+        reports = [as_report(r) for r in reports]
+        tfidf = self.vectorizer.transform([r.get('description') or '' for r in reports])
+        heuristics = sparse.csr_matrix(heuristic_features(reports))
+        return sparse.hstack([tfidf, heuristics], format='csr')
+
+    def real_probability(self, reports):
+        return self.model.predict_proba(self.features(reports))[:, self.real_index]
+
+    def score(self, reports):
+        """Confidence (0-100), status band and priority for every report in one call"""
+        reports = [as_report(r) for r in reports]
+        if not reports:
+            return []
+        confidence = np.round(self.real_probability(reports) * 100, 2)
+        statuses, tags, priorities = status_and_priority(confidence, reports)
+        return [{
+            'confidence': float(c),
+            'status': str(s),
+            'verificationTag': str(t),
+            'priority': str(p)
+        } for c, s, t, p in zip(confidence, statuses, tags, priorities)]
+
+    def save(self, path=SCORER_PATH):
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path=SCORER_PATH):
+        return joblib.load(path)
+
+def load_scoring_corpus(alerts_path=None):
+    """Deduplicated reports from both trainers plus moderated alerts, as (reports, labels)"""
+    import pandas as pd
+    from train_high_accuracy import create_comprehensive_dataset as high_accuracy_dataset
+    from train_ml_enhanced import create_comprehensive_dataset as enhanced_dataset
+
+    high = high_accuracy_dataset()
+    enhanced = enhanced_dataset()
+    frames = [
+        pd.DataFrame({'description': high['text'], 'alertType': 'Other', 'label': high['label']}),
+        pd.DataFrame({
+            'description': enhanced['content'],
+            'alertType': [c if c in ALERT_TYPE_INDEX else 'Other' for c in enhanced['category']],
+            'label': enhanced['label']
+        })
+    ]
+    df = pd.concat(frames, ignore_index=True)
+    df['evidenceImages'] = [[] for _ in range(len(df))]
+    df['burstScore'] = 0.0
+    df['reputation'] = 0.0
+
+    if alerts_path:
+        from alerts_export import iter_alerts, alert_label
+        from burst_detector import annotate_bursts
+        from reputation_store import outcome_columns, prior_reputation
+        alerts = list(iter_alerts(alerts_path))
+        # Reputation only counts each reporter's earlier outcomes, never the alert's own label
+        reputations = prior_reputation(*outcome_columns(alerts))
+        # Burst rates depend on all traffic, moderated or not, so replay the whole export
+        rows = [{
+            'description': alert.get('description', ''),
+            'alertType': alert.get('alertType', 'Other'),
+            'evidenceImages': alert.get('evidenceImages') or [],
+            'burstScore': float(burst),
+            'reputation': float(reputation),
+            'label': alert_label(alert)
+        } for alert, burst, reputation in zip(alerts, annotate_bursts(alerts), reputations)]
+        labelled = pd.DataFrame([row for row in rows if row['label'] is not None])
+        df = pd.concat([df, labelled], ignore_index=True)
+
+    df = df.drop_duplicates(subset='description').reset_index(drop=True)
+    return (df[['description', 'alertType', 'evidenceImages', 'burstScore', 'reputation']].to_dict('records'),
+            list(df['label']))
+
+def _latency_ms(fn, reports, repeats=3):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for report in reports:
+            fn([report])
+    single = (time.perf_counter() - start) / (repeats * len(reports)) * 1000
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(reports)
+    batched = (time.perf_counter() - start) / (repeats * len(reports)) * 1000
+    return round(single, 4), round(batched, 4)
+
+def benchmark(scorer, reports, labels):
+    """Accuracy and per-report latency of the combined scorer versus the regex-only path"""
+    labels = np.asarray(labels)
+
+    regex_pred = np.where(heuristic_confidence(reports) >= 50, 'real', 'fake')
+    combined_pred = np.where(scorer.real_probability(reports) >= 0.5, 'real', 'fake')
+
+    results = {}
+    for name, predictions, fn in (
+        ('regex_only', regex_pred, lambda batch: status_and_priority(heuristic_confidence(batch), batch)),
+        ('combined', combined_pred, scorer.score)
+    ):
+        single, batched = _latency_ms(fn, reports)
+        results[name] = {
+            'accuracy': round(float(np.mean(predictions == labels)), 4),
+            'single_ms_per_report': single,
+            'batched_ms_per_report': batched
+        }
+
+    print(f"\n{'Path':<11} {'Accuracy':>9} {'Single ms':>10} {'Batched ms':>11}")
+    for name, row in results.items():
+        print(f"{name:<11} {row['accuracy']:>9.3f} {row['single_ms_per_report']:>10.4f} "
+              f"{row['batched_ms_per_report']:>11.4f}")
+    return results
+
+def train_report_scorer(vectorizer_path=VECTORIZER_PATH, alerts_path=None):
+    """Fit the combined classifier on the saved vectorizer plus heuristic features"""
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.model_selection import train_test_split
+
+    print("🤖 Training unified report scorer...")
+    reports, labels = load_scoring_corpus(alerts_path)
+    train_reports, test_reports, y_train, y_test = train_test_split(
+        reports, labels, test_size=0.2, random_state=42, stratify=labels)
+
+    model = LogisticRegression(C=10, max_iter=1000, random_state=42, class_weight='balanced')
+    scorer = ReportScorer(joblib.load(vectorizer_path), model)
+    model.fit(scorer.features(train_reports), y_train)
+    scorer.real_index = list(model.classes_).index('real')
+
+    print(f"📊 {len(train_reports)} training / {len(test_reports)} held-out reports")
+    results = benchmark(scorer, test_reports, y_test)
+
+    scorer.save()
+    metadata = {
+        'model_name': 'Logistic Regression',
+        'training_date': datetime.now().isoformat(),
+        'version': '1.0_report_scorer',
+        'vectorizer': vectorizer_path,
+        'heuristic_features': FEATURE_NAMES,
+        'dataset_size': len(reports),
+        'benchmark': results
+    }
+    with open(METADATA_PATH, 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+    print("✅ Report scorer saved:")
+    print(f"   - {SCORER_PATH}")
+    print(f"   - {METADATA_PATH}")
+    return scorer
+
+def main():
+    parser = argparse.ArgumentParser(description='Unified SafeZoneX report scorer')
+    sub = parser.add_subparsers(dest='command', required=True)
+    train = sub.add_parser('train', help='Train and benchmark the combined scorer')
+    train.add_argument('--vectorizer', default=VECTORIZER_PATH)
+    train.add_argument('--alerts', help='Moderated alerts export (JSONL) to train on as well')
+    score = sub.add_parser('score', help='Score report JSON (object or list) read from stdin')
+    score.add_argument('--scorer', default=SCORER_PATH)
+    score.add_argument('--reputation', metavar='DIR', help='Reputation store to look reporters\' userId up in')
+    args = parser.parse_args()
+
+    if args.command == 'train':
+        train_report_scorer(args.vectorizer, args.alerts)
+        return
+
+    data = json.loads(sys.stdin.read())
+    reports = data if isinstance(data, list) else [data]
+    if args.reputation:
+        from reputation_store import ReputationStore, annotate_reputation
+        annotate_reputation([r for r in reports if isinstance(r, dict) and 'reputation' not in r],
+                            ReputationStore(args.reputation))
+    results = ReportScorer.load(args.scorer).score(reports)
+    print(json.dumps(results if isinstance(data, list) else results[0]))
+
+if __name__ == "__main__":
+    main()
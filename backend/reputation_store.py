@@ -0,0 +1,273 @@
+"""
+SafeZoneX Reporter Reputation Store
+Exponentially decayed verified/rejected/spam counts per userId in memory-mapped arrays
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from alerts_export import alert_label, alert_timestamp, iter_alerts
+
+REPUTATION_DIR = 'reputation_store'
+OUTCOMES = ('verified', 'rejected', 'spam')
+OUTCOME_INDEX = {name: i for i, name in enumerate(OUTCOMES)}
+# An outcome counts half as much after this long
+HALF_LIFE_DAYS = 90
+# A spam outcome weighs this many rejections in the reputation score
+SPAM_WEIGHT = 3.0
+INITIAL_CAPACITY = 1024
+
+def reputation_score(counts):
+    """(n, 3) decayed counts -> (n,) score in (-1, 1); 0 for a reporter with no history.
+
+    2p - 1 for the Beta(1, 1) posterior mean p of a report being verified.
+    """
+    counts = np.asarray(counts, dtype=np.float64).reshape(-1, len(OUTCOMES))
+    verified, rejected, spam = counts[:, 0], counts[:, 1], counts[:, 2]
+    p = (verified + 1) / (verified + rejected + SPAM_WEIGHT * spam + 2)
+    return (2 * p - 1).astype(np.float32)
+
+def alert_outcome(alert, prefilter=None):
+    """Index into OUTCOMES for a moderated alert, -1 otherwise.
+
+    An explicit moderationOutcome wins; false alarms whose text trips the
+    scam/spam prefilter rules count as spam rather than a plain rejection.
+    """
+    explicit = alert.get('moderationOutcome')
+    if explicit in OUTCOME_INDEX:
+        return OUTCOME_INDEX[explicit]
+    label = alert_label(alert)
+    if label == 'real':
+        return OUTCOME_INDEX['verified']
+    if label == 'fake':
+        if prefilter is not None and prefilter.check(alert.get('description') or '') is not None:
+            return OUTCOME_INDEX['spam']
+        return OUTCOME_INDEX['rejected']
+    return -1
+
+def outcome_columns(alerts):
+    """userId list, createdAt epoch seconds and outcome index (-1 unmoderated) per alert"""
+    from rule_prefilter import RulePrefilter
+    prefilter = RulePrefilter.from_file()
+    alerts = list(alerts)
+    return ([alert.get('userId') for alert in alerts],
+            np.array([alert_timestamp(alert.get('createdAt')) for alert in alerts], dtype=np.float64),
+            np.array([alert_outcome(alert, prefilter) for alert in alerts], dtype=np.int8))
+
+def prior_reputation(user_ids, timestamps, outcomes, half_life_days=HALF_LIFE_DAYS):
+    """Each alert's reputation from its reporter's strictly earlier outcomes, fully vectorized.
+
+    Rows are sorted by user then time. Decayed sums are cumulative sums of outcome
+    weights scaled by 2^(t / half-life), measured from the user's first alert and
+    rescaled at each row. Each user's run starts from zero, so training features
+    never see their own label.
+    """
+    n = len(user_ids)
+    if not n:
+        return np.zeros(0, dtype=np.float32)
+    half_life = half_life_days * 86400.0
+    keys = np.array([str(u) if u is not None else '' for u in user_ids], dtype=object)
+    _, users = np.unique(keys, return_inverse=True)
+    times = np.nan_to_num(timestamps, nan=np.nanmin(timestamps) if np.isfinite(timestamps).any() else 0.0)
+    order = np.lexsort((times, users))
+
+    sorted_users, sorted_times = users[order], times[order]
+    starts = np.flatnonzero(np.r_[True, sorted_users[1:] != sorted_users[:-1]])
+    run_start = starts[np.searchsorted(starts, np.arange(n), side='right') - 1]
+
+    scale = np.exp2((sorted_times - sorted_times[run_start]) / half_life)
+    contributions = np.zeros((n, len(OUTCOMES)))
+    moderated = outcomes[order] >= 0
+    contributions[np.flatnonzero(moderated), outcomes[order][moderated]] = scale[moderated]
+    # Cancel the previous users' totals at each run start so the running sum restarts near zero
+    shifted = contributions.copy()
+    shifted[starts[1:]] -= np.add.reduceat(contributions, starts, axis=0)[:-1]
+    counts = (np.cumsum(shifted, axis=0) - contributions) / scale[:, None]
+    # Alerts without a userId share no history
+    counts[keys[order] == ''] = 0.0
+
+    scores = np.empty(n, dtype=np.float32)
+    scores[order] = reputation_score(counts)
+    return scores
+
+class ReputationStore:
+    """Per-user decayed outcome counts: (capacity, 3) float32 and (capacity,) last-update arrays,
+    memory-mapped from directory, with a userId -> row dict for O(1) lookups"""
+
+    def __init__(self, directory=REPUTATION_DIR, capacity=INITIAL_CAPACITY, half_life_days=HALF_LIFE_DAYS):
+        self.directory = directory
+        self.half_life = half_life_days * 86400.0
+        os.makedirs(directory, exist_ok=True)
+        users_path = os.path.join(directory, 'users.json')
+        if os.path.exists(users_path):
+            with open(users_path, 'r') as f:
+                users = json.load(f)
+            self.half_life = users.get('halfLifeDays', half_life_days) * 86400.0
+            self.users = users['users']
+        else:
+            self.users = []
+        self.row_of = {user: i for i, user in enumerate(self.users)}
+        self.counts = self._open('counts.npy', (capacity, len(OUTCOMES)), np.float32)
+        self.updated = self._open('updated.npy', (capacity,), np.float64)
+
+    def _open(self, name, shape, dtype):
+        path = os.path.join(self.directory, name)
+        if os.path.exists(path):
+            return np.load(path, mmap_mode='r+')
+        return open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+
+    @property
+    def capacity(self):
+        return self.counts.shape[0]
+
+    def _grow(self):
+        """Double the arrays: copy into larger files and swap them in"""
+        capacity = self.capacity * 2
+        for name in ('counts', 'updated'):
+            old = getattr(self, name)
+            path = os.path.join(self.directory, f'{name}.npy')
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.npy')
+            os.close(fd)
+            grown = open_memmap(tmp, mode='w+', dtype=old.dtype, shape=(capacity,) + old.shape[1:])
+            grown[:len(old)] = old
+            grown.flush()
+            del grown
+            os.replace(tmp, path)
+            setattr(self, name, np.load(path, mmap_mode='r+'))
+
+    def _row(self, user_id):
+        row = self.row_of.get(user_id)
+        if row is None:
+            if len(self.users) == self.capacity:
+                self._grow()
+            row = len(self.users)
+            # Rows past the flushed user list may hold counts from an unflushed session
+            self.counts[row] = 0
+            self.updated[row] = 0
+            self.users.append(user_id)
+            self.row_of[user_id] = row
+        return row
+
+    def record(self, user_id, outcome, timestamp=None):
+        """Add one moderation outcome ('verified', 'rejected' or 'spam') for user_id"""
+        if not user_id:
+            return
+        timestamp = time.time() if timestamp is None else timestamp
+        row = self._row(str(user_id))
+        elapsed = timestamp - self.updated[row]
+        if elapsed >= 0:
+            self.counts[row] *= np.float32(np.exp2(-elapsed / self.half_life))
+            self.counts[row, OUTCOME_INDEX[outcome]] += 1
+            self.updated[row] = timestamp
+        else:
+            # Late outcome: add it already decayed to the row's last update
+            self.counts[row, OUTCOME_INDEX[outcome]] += np.float32(np.exp2(elapsed / self.half_life))
+
+    def lookup(self, user_id, now=None):
+        """Decayed counts and reputation for one user (zeros for an unknown user)"""
+        counts = self.decayed_counts([user_id], now)[0]
+        result = {name: round(float(c), 4) for name, c in zip(OUTCOMES, counts)}
+        result['reputation'] = round(float(reputation_score(counts)[0]), 4)
+        return result
+
+    def decayed_counts(self, user_ids, now=None):
+        now = time.time() if now is None else now
+        rows = np.array([self.row_of.get(str(u), -1) if u else -1 for u in user_ids], dtype=np.int64)
+        known = rows >= 0
+        counts = np.zeros((len(rows), len(OUTCOMES)), dtype=np.float64)
+        if known.any():
+            elapsed = np.maximum(now - self.updated[rows[known]], 0)
+            counts[known] = self.counts[rows[known]] * np.exp2(-elapsed / self.half_life)[:, None]
+        return counts
+
+    def reputation(self, user_ids, now=None):
+        """Reputation feature for a batch of userIds"""
+        return reputation_score(self.decayed_counts(user_ids, now))
+
+    def flush(self):
+        self.counts.flush()
+        self.updated.flush()
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix='.users.')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'users': self.users, 'halfLifeDays': self.half_life / 86400.0}, f)
+        os.replace(tmp, os.path.join(self.directory, 'users.json'))
+
+    @classmethod
+    def rebuild(cls, alerts, directory=REPUTATION_DIR, half_life_days=HALF_LIFE_DAYS):
+        """Fresh store from an alert stream, aggregated with NumPy group-bys instead of per-alert updates.
+
+        Every user's counts are decayed to their latest outcome, as incremental
+        record() calls in time order would leave them.
+        """
+        user_ids, timestamps, outcomes = outcome_columns(alerts)
+        keep = (outcomes >= 0) & np.array([bool(u) for u in user_ids], dtype=bool) & np.isfinite(timestamps)
+        keys = np.array([str(u) for u, k in zip(user_ids, keep) if k], dtype=object)
+        times, codes = timestamps[keep], outcomes[keep].astype(np.int64)
+
+        users, inverse = np.unique(keys, return_inverse=True)
+        latest = np.full(len(users), -np.inf)
+        np.maximum.at(latest, inverse, times)
+        weights = np.exp2(-(latest[inverse] - times) / (half_life_days * 86400.0))
+        counts = np.bincount(inverse * len(OUTCOMES) + codes, weights=weights,
+                             minlength=len(users) * len(OUTCOMES)).reshape(len(users), len(OUTCOMES))
+
+        if os.path.isdir(directory):
+            shutil.rmtree(directory)
+        capacity = max(INITIAL_CAPACITY, 1 << int(np.ceil(np.log2(max(len(users), 1)))))
+        store = cls(directory, capacity, half_life_days)
+        store.users = [str(u) for u in users]
+        store.row_of = {user: i for i, user in enumerate(store.users)}
+        store.counts[:len(users)] = counts
+        store.updated[:len(users)] = latest
+        store.flush()
+        return store
+
+def annotate_reputation(reports, store, now=None):
+    """Set each report's reputation from its userId, for ReportScorer features"""
+    scores = store.reputation([report.get('userId') for report in reports], now)
+    for report, score in zip(reports, scores):
+        report['reputation'] = float(score)
+    return reports
+
+def main():
+    parser = argparse.ArgumentParser(description='Reporter reputation store')
+    parser.add_argument('--store', default=REPUTATION_DIR)
+    sub = parser.add_subparsers(dest='command', required=True)
+    rebuild = sub.add_parser('rebuild', help='Rebuild the store from an alerts export')
+    rebuild.add_argument('alerts')
+    rebuild.add_argument('--half-life-days', type=float, default=HALF_LIFE_DAYS)
+    sub.add_parser('record', help='Apply {"userId", "outcome", "timestamp"?} JSON lines from stdin')
+    lookup = sub.add_parser('lookup', help='Show decayed counts and reputation for users')
+    lookup.add_argument('user_ids', nargs='+')
+    args = parser.parse_args()
+
+    if args.command == 'rebuild':
+        start = time.perf_counter()
+        store = ReputationStore.rebuild(iter_alerts(args.alerts), args.store, args.half_life_days)
+        print(f"✅ Reputation for {len(store.users)} reporters rebuilt in {time.perf_counter() - start:.2f}s")
+        return
+
+    store = ReputationStore(args.store)
+    if args.command == 'record':
+        recorded = 0
+        for line in sys.stdin:
+            if line.strip():
+                event = json.loads(line)
+                store.record(event['userId'], event['outcome'], event.get('timestamp'))
+                recorded += 1
+        store.flush()
+        print(f"✅ Recorded {recorded} outcomes ({len(store.users)} reporters)")
+        return
+
+    for user_id in args.user_ids:
+        print(json.dumps({'userId': user_id, **store.lookup(user_id)}))
+
+if __name__ == "__main__":
+    main()
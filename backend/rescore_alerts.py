@@ -0,0 +1,156 @@
+"""
+SafeZoneX Alert Rescoring Backfill
+Rescores every exported Alert with the saved scorer across a process pool and
+writes chunked columnar results with old-versus-new deltas
+"""
+import argparse
+import json
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from alerts_export import iter_alerts, iter_chunks
+from report_scorer import SCORER_PATH, ReportScorer
+
+CHECKPOINT_NAME = 'checkpoint.json'
+
+# Set once per worker process by _init_worker
+_scorer = None
+
+def _init_worker(scorer_path):
+    global _scorer
+    _scorer = ReportScorer.load(scorer_path)
+
+def _part_path(out_dir, chunk_id, fmt):
+    extension = 'parquet' if fmt == 'parquet' else 'arrow'
+    return os.path.join(out_dir, f"part-{chunk_id:06d}.{extension}")
+
+def _write_table(columns, path, fmt):
+    import pyarrow as pa
+    table = pa.table(columns)
+    tmp_path = path + '.tmp'
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        pq.write_table(table, tmp_path, compression='zstd')
+    else:
+        with pa.OSFile(tmp_path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    # Parts appear atomically, so a crash never leaves a truncated file behind
+    os.replace(tmp_path, path)
+
+def rescore_chunk(chunk_id, alerts, out_dir, fmt):
+    """Worker: score one chunk, write its part file and return throughput stats"""
+    start = time.perf_counter()
+    scores = _scorer.score(alerts)
+
+    old_confidence = [(a.get('aiAnalysis') or {}).get('confidence') for a in alerts]
+    columns = {
+        'alertId': [a.get('alertId') for a in alerts],
+        'alertType': [a.get('alertType', 'Other') for a in alerts],
+        'old_confidence': [float(c) if c is not None else None for c in old_confidence],
+        'new_confidence': [s['confidence'] for s in scores],
+        'confidence_delta': [s['confidence'] - c if c is not None else None
+                             for s, c in zip(scores, old_confidence)],
+        'old_verificationTag': [a.get('verificationTag') for a in alerts],
+        'new_verificationTag': [s['verificationTag'] for s in scores],
+        'old_priority': [a.get('priority') for a in alerts],
+        'new_priority': [s['priority'] for s in scores],
+    }
+    columns['tag_changed'] = [o != n for o, n in zip(columns['old_verificationTag'], columns['new_verificationTag'])]
+    columns['priority_changed'] = [o != n for o, n in zip(columns['old_priority'], columns['new_priority'])]
+
+    _write_table(columns, _part_path(out_dir, chunk_id, fmt), fmt)
+    return {
+        'chunk_id': chunk_id,
+        'pid': os.getpid(),
+        'docs': len(alerts),
+        'seconds': time.perf_counter() - start,
+        'tag_changes': sum(columns['tag_changed']),
+        'priority_changes': sum(columns['priority_changed'])
+    }
+
+def load_checkpoint(out_dir, settings):
+    path = os.path.join(out_dir, CHECKPOINT_NAME)
+    if not os.path.exists(path):
+        return set()
+    with open(path, 'r') as f:
+        checkpoint = json.load(f)
+    if checkpoint.get('settings') != settings:
+        raise ValueError(f"{path} was written with different settings {checkpoint.get('settings')}; "
+                         f"use a new output directory or the same input/chunk size/format")
+    return set(checkpoint['completed_chunks'])
+
+def save_checkpoint(out_dir, settings, completed):
+    path = os.path.join(out_dir, CHECKPOINT_NAME)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'settings': settings, 'completed_chunks': sorted(completed)}, f)
+    os.replace(tmp_path, path)
+
+def rescore_alerts(alerts_path, out_dir, scorer_path=SCORER_PATH, chunk_size=5000,
+                   workers=None, fmt='parquet'):
+    """Stream an alerts export through the worker pool; resumes from out_dir's checkpoint"""
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    settings = {'alerts': os.path.abspath(alerts_path), 'chunk_size': chunk_size,
+                'format': fmt, 'scorer': os.path.abspath(scorer_path)}
+    completed = load_checkpoint(out_dir, settings)
+    if completed:
+        print(f"↩️ Resuming: {len(completed)} chunks already done")
+
+    per_worker = defaultdict(lambda: {'docs': 0, 'seconds': 0.0})
+    totals = {'docs': 0, 'tag_changes': 0, 'priority_changes': 0}
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(scorer_path,)) as pool:
+        pending = set()
+        for chunk_id, chunk in enumerate(iter_chunks(iter_alerts(alerts_path), chunk_size)):
+            if chunk_id in completed:
+                continue
+            # Bounded in-flight work keeps memory flat on very large exports
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                _collect(done, completed, per_worker, totals, out_dir, settings)
+            pending.add(pool.submit(rescore_chunk, chunk_id, chunk, out_dir, fmt))
+        done, _ = wait(pending)
+        _collect(done, completed, per_worker, totals, out_dir, settings)
+
+    elapsed = time.perf_counter() - start
+    print(f"\n✅ Rescored {totals['docs']} alerts in {elapsed:.1f}s "
+          f"({totals['docs'] / elapsed if elapsed else 0:.0f} docs/sec overall)")
+    print(f"   verificationTag changed: {totals['tag_changes']}")
+    print(f"   priority changed: {totals['priority_changes']}")
+    print("\n📊 Throughput per worker:")
+    for pid, stats in sorted(per_worker.items()):
+        rate = stats['docs'] / stats['seconds'] if stats['seconds'] else 0
+        print(f"   pid {pid}: {stats['docs']} docs, {rate:.0f} docs/sec")
+    return totals
+
+def _collect(done, completed, per_worker, totals, out_dir, settings):
+    for future in done:
+        stats = future.result()
+        completed.add(stats['chunk_id'])
+        per_worker[stats['pid']]['docs'] += stats['docs']
+        per_worker[stats['pid']]['seconds'] += stats['seconds']
+        for key in totals:
+            totals[key] += stats[key]
+    save_checkpoint(out_dir, settings, completed)
+
+def main():
+    parser = argparse.ArgumentParser(description='Rescore exported alerts with the saved model')
+    parser.add_argument('alerts', help='Alerts export (.jsonl or mongodump .bson)')
+    parser.add_argument('--out', default='rescored_alerts', help='Output directory for part files')
+    parser.add_argument('--scorer', default=SCORER_PATH)
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--format', choices=('parquet', 'arrow'), default='parquet')
+    args = parser.parse_args()
+
+    print("🔁 SafeZoneX Alert Rescoring")
+    print("=" * 50)
+    rescore_alerts(args.alerts, args.out, args.scorer, args.chunk_size, args.workers, args.format)
+
+if __name__ == "__main__":
+    main()
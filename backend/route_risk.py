@@ -0,0 +1,197 @@
+"""
+SafeZoneX Route Risk Scoring
+Grid spatial index over past incidents, weighted by priority and recency, for scoring walk routes
+"""
+import argparse
+import json
+import math
+import time
+from array import array
+
+import joblib
+import numpy as np
+
+from alerts_export import ALERT_TYPES, PRIORITIES, iter_alerts, iter_chunks, alert_columns
+
+ROUTE_INDEX_PATH = 'route_risk_index.pkl'
+
+# University Malaya campus centre, the origin of the local metric projection
+CAMPUS_ORIGIN = (3.1225, 101.6532)
+EARTH_RADIUS_M = 6371008.8
+
+CELL_SIZE_M = 50.0
+BUFFER_M = 75.0
+HALF_LIFE_DAYS = 30.0
+PRIORITY_WEIGHTS = np.array([1.0, 2.0, 4.0, 8.0])  # low, medium, high, critical
+# Risk per km at which routeSafetyScore drops to ~37 (1/e of 100)
+RISK_SCALE = 10.0
+
+def route_distances(points, route_xy, block=4096):
+    """Distance from each point to the nearest segment of a polyline, in blocks of points"""
+    a = route_xy[:-1][None]
+    ab = np.diff(route_xy, axis=0)[None]
+    ab_len2 = (ab ** 2).sum(axis=2)
+    safe_len2 = np.where(ab_len2 > 0, ab_len2, 1.0)
+
+    distance = np.empty(len(points))
+    for start in range(0, len(points), block):
+        p = points[start:start + block, None, :]
+        # Projection onto each segment, clamped to its end points (zero-length segments use a)
+        t = np.clip(((p - a) * ab).sum(axis=2) / safe_len2, 0, 1) * (ab_len2 > 0)
+        closest = a + t[..., None] * ab
+        distance[start:start + block] = np.sqrt(((p - closest) ** 2).sum(axis=2)).min(axis=1)
+    return distance
+
+class RouteRiskIndex:
+    """Uniform grid of incident positions in local metres; inserts are O(1)"""
+
+    def __init__(self, origin=CAMPUS_ORIGIN, cell_size=CELL_SIZE_M):
+        self.origin = origin
+        self.cell_size = cell_size
+        self.cos_lat = math.cos(math.radians(origin[0]))
+        self.cells = {}
+        self.alert_ids = []
+        self.size = 0
+        self.xy = np.zeros((64, 2), dtype=np.float64)
+        self.created = np.zeros(64, dtype=np.float64)
+        self.priority = np.zeros(64, dtype=np.int16)
+        self.alert_type = np.zeros(64, dtype=np.int16)
+
+    def project(self, latitude, longitude):
+        """Equirectangular metres from the origin; accurate at campus scale"""
+        lat = np.radians(np.asarray(latitude, dtype=np.float64) - self.origin[0])
+        lon = np.radians(np.asarray(longitude, dtype=np.float64) - self.origin[1])
+        return np.stack([lon * self.cos_lat * EARTH_RADIUS_M, lat * EARTH_RADIUS_M], axis=-1)
+
+    def _grow(self, needed):
+        capacity = len(self.created)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        self.xy = np.resize(self.xy, (capacity, 2))
+        self.created = np.resize(self.created, capacity)
+        self.priority = np.resize(self.priority, capacity)
+        self.alert_type = np.resize(self.alert_type, capacity)
+
+    def add_columns(self, columns):
+        """Insert alerts from alert_columns() output; skips alerts without coordinates"""
+        valid = ~(np.isnan(columns['latitude']) | np.isnan(columns['longitude']))
+        if not valid.any():
+            return
+        xy = self.project(columns['latitude'][valid], columns['longitude'][valid])
+        start, count = self.size, len(xy)
+        self._grow(start + count)
+
+        self.xy[start:start + count] = xy
+        self.created[start:start + count] = columns['createdAt'][valid]
+        self.priority[start:start + count] = columns['priority'][valid]
+        self.alert_type[start:start + count] = columns['alertType'][valid]
+        self.alert_ids.extend(np.asarray(columns['alertId'], dtype=object)[valid])
+        self.size += count
+
+        cell_xy = np.floor(xy / self.cell_size).astype(np.int64)
+        for point_id, (cx, cy) in zip(range(start, start + count), cell_xy.tolist()):
+            self.cells.setdefault((cx, cy), array('i')).append(point_id)
+
+    def add_alert(self, alert):
+        self.add_columns(alert_columns([alert]))
+
+    @classmethod
+    def rebuild(cls, alerts_path, chunk_size=50000, **kwargs):
+        index = cls(**kwargs)
+        for chunk in iter_chunks(iter_alerts(alerts_path), chunk_size):
+            index.add_columns(alert_columns(chunk))
+        return index
+
+    def _candidates(self, route_xy, buffer_m):
+        # Cells under each segment's buffered bounding box; a route touches few cells
+        a, b = route_xy[:-1], route_xy[1:]
+        low = np.floor((np.minimum(a, b) - buffer_m) / self.cell_size).astype(np.int64)
+        high = np.floor((np.maximum(a, b) + buffer_m) / self.cell_size).astype(np.int64)
+        cells = set()
+        for (x0, y0), (x1, y1) in zip(low.tolist(), high.tolist()):
+            cells.update((cx, cy) for cx in range(x0, x1 + 1) for cy in range(y0, y1 + 1))
+        ids = [self.cells[cell] for cell in cells if cell in self.cells]
+        if not ids:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate([np.frombuffer(i, dtype=np.int32) for i in ids]).astype(np.int64)
+
+    def score_route(self, coordinates, buffer_m=BUFFER_M, half_life_days=HALF_LIFE_DAYS, now=None, top_n=5):
+        """Risk of a [[lat, lng], ...] polyline plus its top contributing incidents"""
+        route = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+        route_xy = self.project(route[:, 0], route[:, 1])
+        if len(route_xy) == 1:
+            route_xy = np.vstack([route_xy, route_xy])
+        length_km = float(np.linalg.norm(np.diff(route_xy, axis=0), axis=1).sum()) / 1000
+
+        candidates = self._candidates(route_xy, buffer_m)
+        if not len(candidates):
+            return {'riskScore': 0.0, 'riskPerKm': 0.0, 'routeSafetyScore': 100,
+                    'lengthKm': round(length_km, 3), 'incidents': []}
+
+        distance = route_distances(self.xy[candidates], route_xy)
+
+        now = time.time() if now is None else now
+        age_days = np.maximum(now - self.created[candidates], 0) / 86400
+        recency = 0.5 ** (age_days / half_life_days)
+        recency[np.isnan(recency)] = 0.0  # alerts without createdAt do not count
+        proximity = np.clip(1 - distance / buffer_m, 0, None)
+        contribution = PRIORITY_WEIGHTS[self.priority[candidates]] * recency * proximity
+
+        risk = float(contribution.sum())
+        risk_per_km = risk / max(length_km, 0.1)
+        order = np.argsort(-contribution)[:top_n]
+        incidents = [{
+            'alertId': self.alert_ids[candidates[i]],
+            'alertType': ALERT_TYPES[self.alert_type[candidates[i]]],
+            'priority': PRIORITIES[self.priority[candidates[i]]],
+            'distanceM': round(float(distance[i]), 1),
+            'contribution': round(float(contribution[i]), 4)
+        } for i in order if contribution[i] > 0]
+
+        return {
+            'riskScore': round(risk, 4),
+            'riskPerKm': round(risk_per_km, 4),
+            'routeSafetyScore': int(round(100 * math.exp(-risk_per_km / RISK_SCALE))),
+            'lengthKm': round(length_km, 3),
+            'incidents': incidents
+        }
+
+    def save(self, path=ROUTE_INDEX_PATH):
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path=ROUTE_INDEX_PATH):
+        return joblib.load(path)
+
+def main():
+    parser = argparse.ArgumentParser(description='Walk route risk scoring')
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help='Build the incident index from an alerts export')
+    build.add_argument('alerts')
+    build.add_argument('--out', default=ROUTE_INDEX_PATH)
+    score = sub.add_parser('score', help='Score a WalkSession (or plannedRoute) JSON read from a file')
+    score.add_argument('session')
+    score.add_argument('--buffer', type=float, default=BUFFER_M)
+    score.add_argument('--index', default=ROUTE_INDEX_PATH)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        index = RouteRiskIndex.rebuild(args.alerts)
+        index.save(args.out)
+        print(f"✅ Indexed {index.size} incidents in {len(index.cells)} cells, saved to {args.out}")
+        return
+
+    with open(args.session, 'r') as f:
+        session = json.load(f)
+    route = session.get('plannedRoute', session) if isinstance(session, dict) else {'coordinates': session}
+    index = RouteRiskIndex.load(args.index)
+
+    start = time.perf_counter()
+    result = index.score_route(route['coordinates'], buffer_m=args.buffer)
+    result['elapsedMs'] = round((time.perf_counter() - start) * 1000, 3)
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
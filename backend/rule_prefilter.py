@@ -0,0 +1,327 @@
+"""
+SafeZoneX Rule Prefilter
+Aho-Corasick phrase/URL matching plus Bloom-filtered domain lists in front of the ML classifier
+"""
+import hashlib
+import json
+import math
+import time
+from collections import deque
+
+RULES_PATH = 'prefilter_rules.json'
+
+# Genuine reports that use wording common in scams; none of them may be short-circuited
+EMERGENCY_TEXTS = [
+    "Fire in the lab, please act now and evacuate the building",
+    "Someone stole my wallet with my bank details and cards inside at the cafeteria",
+    "Man at KK8 selling lottery tickets is following students and grabbing their arms",
+    "Stranger told me to click here on his phone and then grabbed my bag near the library",
+    "My account frozen after my phone was stolen, thief is still near the bus stop",
+    "Guy with a knife said forward this to your friends or else, he is outside block B"
+]
+
+# Markers that open a URL token; found by the same automaton as the phrases
+URL_MARKERS = ('http://', 'https://', 'www.')
+# Characters a bare host (no scheme or www.) is made of
+HOST_CHARS = frozenset('abcdefghijklmnopqrstuvwxyz0123456789-_.')
+
+class AhoCorasick:
+    """Multi-pattern matcher: one pass over the text finds every pattern"""
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+
+        for pattern_id, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = next_state
+            self.output[state].append(pattern_id)
+
+        # Breadth-first failure links; outputs are merged along the links
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def iter_matches(self, text):
+        """Yield (end_index, pattern_id) for every occurrence in text"""
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for pattern_id in output[state]:
+                yield index, pattern_id
+
+class BloomFilter:
+    """Fixed-size Bloom filter for large URL/domain lists"""
+
+    def __init__(self, capacity, error_rate=0.001):
+        capacity = max(capacity, 1)
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, item):
+        # Double hashing: k positions from one 128-bit digest
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+def _is_word_char(char):
+    return char.isalnum() or char == '_'
+
+def _normalize_url(url):
+    """Lowered URL without scheme, leading 'www.' or trailing slash, as hosts are compared"""
+    host = url.lower().split('://', 1)[-1]
+    if host.startswith('www.'):
+        host = host[4:]
+    return host.rstrip('/')
+
+def _domain_suffixes(domain):
+    """'a.b.example.com' -> ['a.b.example.com', 'b.example.com', 'example.com']"""
+    parts = domain.split('.')
+    return ['.'.join(parts[i:]) for i in range(len(parts) - 1)]
+
+class RulePrefilter:
+    """Compiled blocklist/allowlist stage that can short-circuit classification.
+
+    Only block phrases (specific multi-word scam wording) and blocked URLs
+    short-circuit. Review phrases are generic wording that also turns up in
+    real emergencies ("act now", "bank details"); they never decide a verdict
+    and are only surfaced as reasons next to the model's prediction.
+    """
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.block_phrases = [p.lower() for p in rules.get('block_phrases', [])]
+        self.allow_phrases = [p.lower() for p in rules.get('allow_phrases', [])]
+        self.review_phrases = [p.lower() for p in rules.get('review_phrases', [])]
+
+        blocked = [d.lower() for d in rules.get('block_domains', [])] + \
+                  [_normalize_url(u) for u in rules.get('block_urls', [])]
+        self.blocked_urls = BloomFilter(len(blocked), rules.get('bloom_error_rate', 0.001))
+        for item in blocked:
+            self.blocked_urls.add(item)
+        # Allowlists are small, so an exact set is cheaper than another filter
+        self.allow_domains = {d.lower() for d in rules.get('allow_domains', [])}
+
+        # Pattern ids: block, allow and review phrases, URL markers, then listed domains,
+        # which find bare links such as 'bit.ly/xyz' that have no marker
+        domains = dict.fromkeys([item.split('/', 1)[0] for item in blocked] + sorted(self.allow_domains))
+        patterns = self.block_phrases + self.allow_phrases + self.review_phrases + list(URL_MARKERS) + list(domains)
+        self.num_block = len(self.block_phrases)
+        self.num_allow = len(self.allow_phrases)
+        self.first_marker = self.num_block + self.num_allow + len(self.review_phrases)
+        self.first_domain = self.first_marker + len(URL_MARKERS)
+        self.automaton = AhoCorasick(patterns)
+
+    @classmethod
+    def from_file(cls, path=RULES_PATH):
+        with open(path, 'r') as f:
+            return cls(json.load(f))
+
+    def _url_at(self, text, start):
+        end = start
+        while end < len(text) and not text[end].isspace():
+            end += 1
+        url = text[start:end].rstrip('.,;:!?)"\'')
+        host = _normalize_url(url)
+        domain = host.split('/', 1)[0].split(':', 1)[0]
+        return url, host, domain, end
+
+    def _bare_host_start(self, text, start, end):
+        """Start of the bare host a listed domain ends at text[start:end + 1], or None when the
+        match is inside a longer name ('notbit.ly', 'bit.lyx', 'bit.ly.evil.com')"""
+        after = end + 1
+        if after < len(text) and (text[after] in HOST_CHARS - {'.'} or
+                                  (text[after] == '.' and after + 1 < len(text) and text[after + 1] in HOST_CHARS)):
+            return None
+        if start > 0 and text[start - 1] in HOST_CHARS and text[start - 1] != '.':
+            return None
+        # Include subdomains ('a.bit.ly')
+        while start > 0 and text[start - 1] in HOST_CHARS:
+            start -= 1
+        return start
+
+    def _check_url(self, text, start, block_hits, allow_hits):
+        url, host, domain, end = self._url_at(text, start)
+        if not domain:
+            return end
+        if any(s in self.allow_domains for s in _domain_suffixes(domain)):
+            allow_hits.append(f"allowed domain '{domain}'")
+        elif host in self.blocked_urls:
+            block_hits.append(f"blocked URL '{url}'")
+        elif any(s in self.blocked_urls for s in _domain_suffixes(domain)):
+            block_hits.append(f"blocked domain '{domain}'")
+        return end
+
+    def scan(self, text):
+        """(block, allow, review) reasons for every rule that matched text, in one pass"""
+        lowered = text.lower()
+        block_hits, allow_hits, review_hits = [], [], []
+        # URLs already judged from a marker; a listed domain inside them is not judged again
+        checked_until = 0
+
+        for end, pattern_id in self.automaton.iter_matches(lowered):
+            pattern = self.automaton.patterns[pattern_id]
+            start = end - len(pattern) + 1
+
+            if pattern_id >= self.first_domain:
+                if start < checked_until:
+                    continue
+                host_start = self._bare_host_start(lowered, start, end)
+                if host_start is not None:
+                    checked_until = self._check_url(lowered, host_start, block_hits, allow_hits)
+                continue
+            if pattern_id >= self.first_marker:
+                checked_until = max(checked_until, self._check_url(lowered, start, block_hits, allow_hits))
+                continue
+
+            # Phrases only count on word boundaries ("win" must not match "window")
+            if start > 0 and _is_word_char(lowered[start - 1]) and _is_word_char(pattern[0]):
+                continue
+            if end + 1 < len(lowered) and _is_word_char(lowered[end + 1]) and _is_word_char(pattern[-1]):
+                continue
+
+            if pattern_id < self.num_block:
+                block_hits.append(f"blocked phrase '{pattern}'")
+            elif pattern_id < self.num_block + self.num_allow:
+                allow_hits.append(f"allowed phrase '{pattern}'")
+            else:
+                review_hits.append(f"review phrase '{pattern}'")
+
+        return block_hits, allow_hits, review_hits
+
+    def check(self, text):
+        """Return a verdict dict when a blocking rule fires, or None to defer to the model"""
+        block_hits, allow_hits, _ = self.scan(text)
+        return self.verdict(block_hits, allow_hits)
+
+    @staticmethod
+    def verdict(block_hits, allow_hits):
+        """The short-circuit verdict for scan() hits: blocked and not allowed, else None"""
+        if allow_hits or not block_hits:
+            return None
+        return {
+            'prediction': 'fake',
+            'confidence': 1.0,
+            'source': 'prefilter',
+            'reason': '; '.join(dict.fromkeys(block_hits))
+        }
+
+def predict_with_prefilter(texts, model, vectorizer, prefilter):
+    """Batch prediction that only sends texts no blocking rule fired on to the model.
+
+    Review phrases found in a text sent to the model become its reason.
+    """
+    texts = list(texts)
+    results, review = [], []
+    for text in texts:
+        block_hits, allow_hits, review_hits = prefilter.scan(text)
+        results.append(prefilter.verdict(block_hits, allow_hits))
+        review.append('; '.join(dict.fromkeys(review_hits)) or None)
+    remaining = [i for i, verdict in enumerate(results) if verdict is None]
+
+    if remaining:
+        X = vectorizer.transform([texts[i] for i in remaining])
+        predictions = model.predict(X)
+        probabilities = model.predict_proba(X).max(axis=1)
+        for i, prediction, confidence in zip(remaining, predictions, probabilities):
+            results[i] = {
+                'prediction': prediction,
+                'confidence': float(confidence),
+                'source': 'model',
+                'reason': review[i]
+            }
+    return results
+
+def load_labelled_corpora():
+    """(name, texts, labels) for each trainer's hand-labelled dataset"""
+    from train_high_accuracy import create_comprehensive_dataset as high_accuracy_dataset
+    from train_ml_enhanced import create_comprehensive_dataset as enhanced_dataset
+
+    high = high_accuracy_dataset()
+    enhanced = enhanced_dataset()
+    return [
+        ('high_accuracy', list(high['text']), list(high['label'])),
+        ('enhanced', list(enhanced['content']), list(enhanced['label']))
+    ]
+
+def evaluate_prefilter(prefilter, corpora=None):
+    """Report removed model traffic and false-positive rate per corpus.
+
+    The default corpora add EMERGENCY_TEXTS, real reports worded like scams.
+    """
+    corpora = corpora or load_labelled_corpora() + [
+        ('emergency_wording', EMERGENCY_TEXTS, ['real'] * len(EMERGENCY_TEXTS))]
+    report = {}
+
+    for name, texts, labels in corpora:
+        start = time.perf_counter()
+        verdicts = [prefilter.check(text) for text in texts]
+        elapsed = time.perf_counter() - start
+        reviewed = sum(1 for text in texts if prefilter.scan(text)[2])
+
+        fired = [v is not None for v in verdicts]
+        real_total = sum(1 for label in labels if label == 'real')
+        fake_total = len(labels) - real_total
+        false_positives = sum(1 for f, label in zip(fired, labels) if f and label == 'real')
+        true_positives = sum(1 for f, label in zip(fired, labels) if f and label == 'fake')
+
+        report[name] = {
+            'examples': len(texts),
+            'short_circuited': sum(fired),
+            'traffic_removed': sum(fired) / len(texts) if texts else 0.0,
+            'fake_recall': true_positives / fake_total if fake_total else 0.0,
+            'false_positive_rate': false_positives / real_total if real_total else 0.0,
+            'review_phrase_hits': reviewed,
+            'us_per_report': elapsed / len(texts) * 1e6 if texts else 0.0
+        }
+
+        print(f"\n📊 {name} corpus ({len(texts)} examples):")
+        print(f"   Model traffic removed: {report[name]['traffic_removed']:.1%}")
+        print(f"   Fake reports caught: {report[name]['fake_recall']:.1%}")
+        print(f"   False-positive rate (real flagged): {report[name]['false_positive_rate']:.1%}")
+        print(f"   Review-phrase hits (left to the model): {reviewed}")
+        print(f"   Prefilter cost: {report[name]['us_per_report']:.1f} µs/report")
+        for text, verdict, label in zip(texts, verdicts, labels):
+            if verdict is not None and label == 'real':
+                print(f"   ⚠️ False positive: '{text[:60]}' ({verdict['reason']})")
+
+    return report
+
+if __name__ == "__main__":
+    print("🧱 SafeZoneX Rule Prefilter Evaluation")
+    print("=" * 50)
+    prefilter = RulePrefilter.from_file()
+    print(f"✅ Compiled {prefilter.num_block} block / {prefilter.num_allow} allow / "
+          f"{len(prefilter.review_phrases)} review phrases "
+          f"into {len(prefilter.automaton.goto)} automaton states")
+    evaluate_prefilter(prefilter)
@@ -1,3 +1,5 @@
+const fs = require('fs');
+const { spawn } = require('child_process');
 const path = require('path');
 require('dotenv').config({ path: path.resolve(__dirname, '.env') });
 
@@ -91,9 +93,29 @@ app.get('/api/status', (req, res) => {
   return res.json({ success: true, message: 'SafeZoneX API server is running' });
 });
 
-// ML status endpoint (stub) - mobile expects this; returns basic info
-app.get('/api/ml/status', (req, res) => {
-  return res.json({ success: true, status: 'idle', message: 'ML subsystem not active on this deployment' });
+// ML status endpoint - serves the progress file the Python trainers keep updated (training_status.py)
+const TRAINING_STATUS_PATH = path.join(__dirname, 'training_status.json');
+const TRAINING_STALE_SECONDS = 120;
+
+app.get('/api/ml/status', async (req, res) => {
+  let status;
+  try {
+    status = JSON.parse(await fs.promises.readFile(TRAINING_STATUS_PATH, 'utf8'));
+  } catch (error) {
+    if (error.code === 'ENOENT') {
+      return res.json({ success: true, status: 'idle', message: 'No training run recorded' });
+    }
+    logger.error('❌ Failed to read training status:', error);
+    return res.status(500).json({ success: false, status: 'unknown', message: 'Training status unreadable' });
+  }
+
+  if (status.status === 'running') {
+    // Trainers write at least once per stage and fold; a long silence means the run died
+    const age = (Date.now() - new Date(status.updatedAt).getTime()) / 1000;
+    status.secondsSinceUpdate = Math.round(age);
+    status.stale = age > TRAINING_STALE_SECONDS;
+  }
+  return res.json({ success: true, ...status });
 });
 
 const mongoURI = process.env.MONGODB_URI;
@@ -109,6 +131,69 @@ mongoose.connect(mongoURI, {
 
 let alertsCache = new Map();
 
+// Chat moderation: chat_moderation.py scores messages in per-room micro-batches off the delivery path
+// and prints one JSON line per flagged message. Opt-in with CHAT_MODERATION=on; the process is
+// restarted with exponential backoff if it exits.
+let chatModerator = null;
+let chatModeratorRestarts = 0;
+const CHAT_MODERATION_MAX_BACKOFF_MS = 60000;
+// A run this long counts as healthy and resets the backoff
+const CHAT_MODERATION_STABLE_MS = 60000;
+// Messages are skipped rather than buffered in Node while this much is waiting on the pipe
+const CHAT_MODERATION_MAX_PENDING_BYTES = 8 * 1024 * 1024;
+
+function startChatModerator() {
+  if (!['on', 'true', '1'].includes(process.env.CHAT_MODERATION)) return;
+  const args = ['chat_moderation.py', 'stream', '--workers', process.env.CHAT_MODERATION_WORKERS || '1'];
+  const child = spawn(process.env.PYTHON || 'python3', args, { cwd: __dirname, stdio: ['pipe', 'pipe', 'inherit'] });
+  const startedAt = Date.now();
+  let stopped = false;
+  const restart = (reason) => {
+    // 'error' and 'exit' can both fire for one failure
+    if (stopped) return;
+    stopped = true;
+    chatModerator = null;
+    if (Date.now() - startedAt >= CHAT_MODERATION_STABLE_MS) chatModeratorRestarts = 0;
+    const delay = Math.min(1000 * 2 ** chatModeratorRestarts, CHAT_MODERATION_MAX_BACKOFF_MS);
+    chatModeratorRestarts += 1;
+    logger.warn(`⚠️ Chat moderation stopped (${reason}); restarting in ${delay / 1000}s`);
+    setTimeout(startChatModerator, delay);
+  };
+  child.on('error', (error) => restart(error.message));
+  child.on('exit', (code, signal) => restart(signal ? `signal ${signal}` : `exit code ${code}`));
+  // Writes after the process exits fail with EPIPE; the exit handler already disabled moderation
+  child.stdin.on('error', () => {});
+
+  let buffered = '';
+  child.stdout.setEncoding('utf8');
+  child.stdout.on('data', (chunk) => {
+    buffered += chunk;
+    const lines = buffered.split('\n');
+    buffered = lines.pop();
+    for (const line of lines) {
+      if (!line.trim()) continue;
+      try {
+        const flag = JSON.parse(line);
+        io.to('security_dashboard').emit('message_flagged', flag);
+        logger.warn(`🚩 Message ${flag.messageId} flagged: ${flag.flags.join(', ')}`);
+      } catch (error) {
+        logger.error('❌ Unreadable chat moderation output:', error);
+      }
+    }
+  });
+  chatModerator = child;
+}
+
+// Queue a message for moderation; never delays delivery
+function moderateMessage(message) {
+  if (!chatModerator || !chatModerator.stdin.writable) return;
+  if (chatModerator.stdin.writableLength > CHAT_MODERATION_MAX_PENDING_BYTES) {
+    logger.warn(`⚠️ Chat moderation backlogged; message ${message.messageId} not moderated`);
+    return;
+  }
+  chatModerator.stdin.write(JSON.stringify(message) + '\n');
+}
+
 // IMPROVED AI confidence calculation
 function calculateConfidence(description, evidenceImages, alertType) {
   let confidence = 40;
@@ -885,6 +970,7 @@ app.post('/api/messages/send', async (req, res) => {
     });
 
     logger.info(`📤 Message sent from ${senderName} to user room: ${recipientRoom}`);
+    moderateMessage({ messageId: newMessage.messageId, senderId, recipientId, message, messageType });
 
     res.json({ 
       success: true, 
@@ -1234,6 +1320,16 @@ io.on('connection', (socket) => {
         io.emit('security_sos_alert', sosAlert);
 
         logger.info(`📡 SOS (envelope) broadcasted to all friends and security`);
+      } else if (payload && typeof payload.message === 'string') {
+        // Chat relayed over the socket is moderated like REST-sent messages
+        moderateMessage({
+          messageId: payload.messageId || payload.id || uuidv4(),
+          senderId: payload.senderId,
+          recipientId: payload.recipientId,
+          roomId: payload.roomId,
+          message: payload.message,
+          messageType: payload.messageType || 'text'
+        });
       }
     } catch (err) {
       logger.error('❌ Error processing generic message envelope:', err);
@@ -1309,4 +1405,5 @@ const PORT = process.env.PORT || 8080;
 server.listen(PORT, "0.0.0.0", () => {
   logger.info(`🚀 Server running on port ${PORT}`);
   logger.info(`📊 Dashboard available at: /dashboard-enhanced.html`);
+  startChatModerator();
 });
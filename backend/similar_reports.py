@@ -0,0 +1,173 @@
+"""
+SafeZoneX Similar Reports Lookup
+Inverted index over TF-IDF report vectors for top-k similar past incidents
+"""
+import argparse
+import time
+from array import array
+
+import joblib
+import numpy as np
+from sklearn.preprocessing import normalize
+
+from alerts_export import iter_alerts, iter_chunks, alert_label
+
+VECTORIZER_PATH = 'tfidf_vectorizer_high_accuracy.pkl'
+INDEX_PATH = 'similar_reports_index.pkl'
+
+# Same bands as determineStatusAndPriority in server.js
+REVIEW_BAND = (30, 70)
+
+class SimilarReportIndex:
+    """Incrementally updatable inverted index with cosine top-k retrieval.
+
+    Each vocabulary term keeps a postings list of (report position, weight)
+    pairs in growable typed arrays, so adding reports never rebuilds the index
+    and a query only touches the postings of its own terms.
+    """
+
+    def __init__(self, vectorizer):
+        self.vectorizer = vectorizer
+        self.postings = {}
+        self.report_ids = []
+        self.texts = []
+        self.labels = []
+
+    def __len__(self):
+        return len(self.texts)
+
+    def _vectorize(self, texts):
+        # Explicit L2 normalisation makes the dot product a cosine similarity
+        return normalize(self.vectorizer.transform(texts), norm='l2', copy=False)
+
+    def add_reports(self, texts, labels=None, report_ids=None):
+        """Append reports to the index and return their positions"""
+        texts = list(texts)
+        if not texts:
+            return range(0, 0)
+        labels = list(labels) if labels is not None else [None] * len(texts)
+        if report_ids is None:
+            report_ids = [f"report_{len(self) + i}" for i in range(len(texts))]
+
+        offset = len(self)
+        X = self._vectorize(texts).tocsc()
+        X.sort_indices()
+
+        # Column-major walk: one append per (term, batch) instead of per entry
+        for term in np.flatnonzero(np.diff(X.indptr)):
+            start, end = X.indptr[term], X.indptr[term + 1]
+            ids, weights = self.postings.setdefault(int(term), (array('i'), array('f')))
+            ids.frombytes((X.indices[start:end] + offset).astype(np.int32).tobytes())
+            weights.frombytes(X.data[start:end].astype(np.float32).tobytes())
+
+        self.texts.extend(texts)
+        self.labels.extend(labels)
+        self.report_ids.extend(report_ids)
+        return range(offset, len(self))
+
+    def _scores(self, q_indices, q_data):
+        scores = np.zeros(len(self), dtype=np.float32)
+        for term, q_weight in zip(q_indices, q_data):
+            posting = self.postings.get(int(term))
+            if posting is None:
+                continue
+            ids = np.frombuffer(posting[0], dtype=np.int32)
+            weights = np.frombuffer(posting[1], dtype=np.float32)
+            # Positions are unique within a postings list, so += is safe
+            scores[ids] += q_weight * weights
+        return scores
+
+    def _top_k(self, scores, k):
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            top = np.argpartition(scores[candidates], -k)[-k:]
+            candidates = candidates[top]
+        order = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return [{
+            'reportId': self.report_ids[i],
+            'text': self.texts[i],
+            'label': self.labels[i],
+            'similarity': round(float(scores[i]), 4)
+        } for i in order]
+
+    def query(self, text, k=5):
+        """Return the k most cosine-similar indexed reports for one text"""
+        return self.query_batch([text], k)[0]
+
+    def query_batch(self, texts, k=5):
+        """Vectorize all query texts at once and return top-k lists per text"""
+        Q = self._vectorize(list(texts))
+        results = []
+        for row in range(Q.shape[0]):
+            start, end = Q.indptr[row], Q.indptr[row + 1]
+            scores = self._scores(Q.indices[start:end], Q.data[start:end])
+            results.append(self._top_k(scores, k))
+        return results
+
+    def lookup_for_review(self, text, confidence, k=5):
+        """Similar past reports for medium-confidence reports only"""
+        low, high = REVIEW_BAND
+        if not (low <= confidence < high):
+            return []
+        return self.query(text, k)
+
+    def save(self, path=INDEX_PATH):
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path=INDEX_PATH):
+        return joblib.load(path)
+
+def build_index(vectorizer_path=VECTORIZER_PATH, alerts_path=None, include_training=True):
+    """Build an index from the training corpus and/or an alerts export"""
+    index = SimilarReportIndex(joblib.load(vectorizer_path))
+
+    if include_training:
+        from train_high_accuracy import create_comprehensive_dataset
+        df = create_comprehensive_dataset()
+        index.add_reports(df['text'], df['label'],
+                          [f"training_{i}" for i in range(len(df))])
+
+    if alerts_path:
+        for chunk in iter_chunks(iter_alerts(alerts_path), 10000):
+            index.add_reports([alert.get('description', '') for alert in chunk],
+                              [alert_label(alert) or alert.get('verificationTag') for alert in chunk],
+                              [alert.get('alertId') for alert in chunk])
+
+    print(f"✅ Indexed {len(index)} reports over {len(index.postings)} terms")
+    return index
+
+def main():
+    parser = argparse.ArgumentParser(description='Similar past reports lookup')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build = sub.add_parser('build', help='Build the index and save it')
+    build.add_argument('--alerts', help='Alerts export (JSONL) to index')
+    build.add_argument('--no-training', action='store_true', help='Skip the training corpus')
+    build.add_argument('--vectorizer', default=VECTORIZER_PATH)
+    build.add_argument('--index', default=INDEX_PATH)
+
+    query = sub.add_parser('query', help='Find reports similar to a text')
+    query.add_argument('text')
+    query.add_argument('-k', type=int, default=5)
+    query.add_argument('--index', default=INDEX_PATH)
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        index = build_index(args.vectorizer, args.alerts, not args.no_training)
+        index.save(args.index)
+        print(f"💾 Saved index to {args.index}")
+        return
+
+    index = SimilarReportIndex.load(args.index)
+    start = time.perf_counter()
+    matches = index.query(args.text, args.k)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    print(f"🔎 Top {len(matches)} similar reports ({elapsed_ms:.2f} ms over {len(index)} reports):")
+    for match in matches:
+        print(f"   {match['similarity']:.3f} [{match['label']}] {match['text'][:70]}")
+
+if __name__ == "__main__":
+    main()
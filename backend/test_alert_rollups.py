@@ -0,0 +1,75 @@
+"""
+SafeZoneX Alert Rollups Tests
+Compaction and streaming ingest of AlertRollups against brute-force counts (run with pytest)
+"""
+import numpy as np
+
+from alert_rollups import DAY, HOUR, AlertRollups
+from alerts_export import alert_columns
+
+NOW = 1_750_000_000.0
+ZONES = [(3.1209, 101.6538), (3.1250, 101.6570), (3.1180, 101.6500)]
+
+def make_alerts(n, days, seed=0):
+    rng = np.random.default_rng(seed)
+    alerts = []
+    for i in range(n):
+        lat, lon = ZONES[rng.integers(len(ZONES))]
+        alerts.append({
+            'alertId': f'a{i}',
+            'alertType': ['Harassment', 'Theft/Robbery', 'Other'][rng.integers(3)],
+            'priority': ['low', 'high'][rng.integers(2)],
+            'location': {'latitude': lat, 'longitude': lon},
+            'createdAt': float(NOW - rng.uniform(0, days * DAY)) * 1000
+        })
+    return alerts
+
+def brute_force(alerts, start, end, column):
+    return sum(1 for a in alerts if start <= a['createdAt'] / 1000 < end
+               and column in (a['alertType'], a['priority']))
+
+def total(rollups, start, end, column):
+    return sum(rollups.by_zone(start, end, column).values())
+
+def test_compact_moves_expired_hours_into_days():
+    alerts = make_alerts(2000, days=10)
+    rollups = AlertRollups(hourly_retention_days=30)
+    for alert in alerts:
+        rollups.add_alert(alert, now=NOW)
+    assert rollups.daily.origin is None
+    hours_before = len(rollups.hourly.cum) - 1
+
+    # Twenty days later, everything older than five days must have left the hourly tier
+    later = NOW + 20 * DAY
+    rollups.hourly_retention_days = 25
+    rollups.compact(now=later)
+    assert rollups.hourly.origin * HOUR >= rollups.hourly_start(later)
+    assert len(rollups.hourly.cum) - 1 < hours_before
+    assert rollups.daily.origin is not None
+
+    # Whole-day queries agree with a brute-force count across both tiers
+    first_day = (int(NOW // DAY) - 11) * DAY
+    last_day = (int(NOW // DAY) + 1) * DAY
+    for column in ('Harassment', 'high'):
+        assert total(rollups, first_day, last_day, column) == brute_force(alerts, first_day, last_day, column)
+
+def test_ingest_compacts_without_explicit_call():
+    alerts = sorted(make_alerts(500, days=3, seed=1), key=lambda a: a['createdAt'])
+    rollups = AlertRollups(hourly_retention_days=1)
+    for alert in alerts:
+        rollups.add_alert(alert, now=alert['createdAt'] / 1000)
+    assert rollups.hourly.origin * HOUR >= rollups.hourly_start(alerts[-1]['createdAt'] / 1000)
+    start, end = NOW - 4 * DAY, NOW + DAY
+    assert total(rollups, start, end, 'Other') == brute_force(alerts, start, end, 'Other')
+
+def test_streaming_matches_batch_rebuild():
+    alerts = make_alerts(1500, days=40, seed=2)
+    streamed, batched = AlertRollups(), AlertRollups()
+    for alert in alerts:
+        streamed.add_alert(alert, now=NOW)
+    for i in range(0, len(alerts), 400):
+        batched.add_columns(alert_columns(alerts[i:i + 400]), now=NOW)
+    for start, end in ((NOW - 7 * DAY, NOW), (NOW - 35 * DAY, NOW - 31 * DAY), (NOW - 3 * HOUR, NOW)):
+        assert streamed.by_zone(start, end, 'high') == batched.by_zone(start, end, 'high')
+    # Capacity grows geometrically rather than one bucket per new hour
+    assert streamed.hourly.buffer.shape[0] < 2 * len(streamed.hourly.cum) + 2
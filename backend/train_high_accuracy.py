@@ -4,7 +4,7 @@ Improved algorithms, more data, better features for higher accuracy
 """
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
+from sklearn.model_selection import train_test_split, GridSearchCV
 from sklearn.feature_extraction.text import TfidfVectorizer, CountVectorizer
 from sklearn.naive_bayes import MultinomialNB
 from sklearn.linear_model import LogisticRegression
@@ -12,8 +12,12 @@ from sklearn.ensemble import RandomForestClassifier, VotingClassifier, GradientB
 from sklearn.svm import SVC
 from sklearn.metrics import classification_report, confusion_matrix
 from sklearn.pipeline import Pipeline
+from sklearn.feature_selection import chi2, mutual_info_classif
 import joblib
 import json
+import io
+import sys
+import time
 from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
@@ -428,32 +432,65 @@ def create_comprehensive_dataset():
     
     return df
 
-def train_high_accuracy_models(df):
-    """Train multiple advanced models for maximum accuracy"""
+def split_dataset(df):
+    """Stratified 80/20 train/test split shared by training and evaluation"""
+    return train_test_split(df['text'], df['label'], test_size=0.2, random_state=42, stratify=df['label'])
+
+def create_vectorizer(vocabulary=None):
+    """Advanced TF-IDF vectorizer; a fixed vocabulary skips the df/max_features cuts"""
+    return TfidfVectorizer(
+        max_features=5000,  # Increased features
+        ngram_range=(1, 3),  # Include 1, 2, and 3-grams
+        min_df=2,
+        max_df=0.95,
+        stop_words='english',
+        sublinear_tf=True,
+        analyzer='word',
+        vocabulary=vocabulary
+    )
+
+def create_ensemble():
+    """Soft-voting ensemble of NB, LR and RF (the deployed high-accuracy model)"""
+    return VotingClassifier([
+        ('nb', MultinomialNB(alpha=0.1)),
+        ('lr', LogisticRegression(C=10, max_iter=1000, random_state=42, class_weight='balanced')),
+        ('rf', RandomForestClassifier(n_estimators=100, max_depth=15, random_state=42, class_weight='balanced'))
+    ], voting='soft')
+
+def train_high_accuracy_models(df, featurize=None, progress=None, dense=None, calibration='auto'):
+    """Train multiple advanced models for maximum accuracy
+
+    featurize(X_train, X_test) -> (vectorizer, X_train_vec, X_test_vec) replaces the
+    vectorizer fit, e.g. with features derived from the shared corpus store.
+    progress, a training_status.TrainingProgress, receives stage/model/fold events.
+    dense ('svd' or 'random_projection') adds low-rank dense variants of the tree
+    and kernel models, plus histogram gradient boosting, as extra candidates.
+    Every candidate's predict_proba is calibrated ('sigmoid' or 'isotonic') on
+    its out-of-fold decision scores from cross-validation; 'auto' picks either,
+    or no calibration, by out-of-fold ECE. A calibrator that raises test ECE is
+    dropped. CV accuracies come from the uncalibrated fold models.
+    """
+    from training_status import cross_val_progress
+    from dense_features import latency_ms
+    from calibration import calibrate, calibration_report, uncalibrated_if_worse
     
     print("🤖 Training High-Accuracy ML Models...")
     
     # Split data
-    X = df['text']
-    y = df['label']
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    X_train, X_test, y_train, y_test = split_dataset(df)
     
     print(f"📊 Training set: {len(X_train)} examples")
     print(f"📊 Test set: {len(X_test)} examples")
     
     # Advanced TF-IDF Vectorizer with optimized parameters
-    vectorizer = TfidfVectorizer(
-        max_features=5000,  # Increased features
-        ngram_range=(1, 3),  # Include 1, 2, and 3-grams
-        min_df=2,
-        max_df=0.95,
-        stop_words='english',
-        sublinear_tf=True,
-        analyzer='word'
-    )
-    
-    X_train_vec = vectorizer.fit_transform(X_train)
-    X_test_vec = vectorizer.transform(X_test)
+    if progress is not None:
+        progress.stage('vectorizing')
+    if featurize is not None:
+        vectorizer, X_train_vec, X_test_vec = featurize(X_train, X_test)
+    else:
+        vectorizer = create_vectorizer()
+        X_train_vec = vectorizer.fit_transform(X_train)
+        X_test_vec = vectorizer.transform(X_test)
     
     print(f"🔤 Feature dimensions: {X_train_vec.shape[1]}")
     
@@ -479,31 +516,53 @@ def train_high_accuracy_models(df):
             max_depth=10,
             random_state=42
         ),
+        # No internal Platt-scaling CV; the shared calibration layer supplies probabilities
         'SVM': SVC(
             C=10, 
             kernel='rbf', 
-            probability=True, 
             random_state=42,
             class_weight='balanced'
         )
     }
     
+    if dense:
+        from dense_features import dense_candidates, prefit_projections
+        if progress is not None:
+            progress.stage('projecting')
+        # Each fold's projection is fitted on its own training rows; cached, so the
+        # dense candidates share them and the fit cost is added to each one below
+        projection_seconds = prefit_projections(X_train_vec, y_train, dense)
+        models.update(dense_candidates(dense, {name: models[name] for name in
+                                               ('Random Forest', 'Gradient Boosting', 'SVM')}))
+    
     best_model = None
     best_score = 0
     best_name = ""
     model_results = {}
     
+    if progress is not None:
+        # Five CV folds plus the final fit for every model and the ensemble
+        progress.total_steps = (len(models) + 1) * 6
+        progress.stage('training', models=list(models) + ['Ensemble'])
+    
     # Train and evaluate each model
     for name, model in models.items():
         print(f"\n🔧 Training {name}...")
         
         # Cross-validation
-        cv_scores = cross_val_score(model, X_train_vec, y_train, cv=5, scoring='accuracy')
+        start = time.perf_counter()
+        cv_scores, oof_scores = cross_val_progress(model, X_train_vec, y_train, 5, progress, name, return_oof=True)
         cv_mean = cv_scores.mean()
         cv_std = cv_scores.std()
         
-        # Train on full training set
-        model.fit(X_train_vec, y_train)
+        # Train on full training set, calibrated on the out-of-fold scores unless
+        # the calibrator makes test-split probabilities worse
+        model = calibrate(model.fit(X_train_vec, y_train), oof_scores, y_train, calibration)
+        model = uncalibrated_if_worse(model, X_test_vec, y_test)
+        train_seconds = time.perf_counter() - start
+        if progress is not None:
+            progress.step(model=name, fold=None)
+            progress.result(name, cv_mean)
         
         # Test accuracy
         test_score = model.score(X_test_vec, y_test)
@@ -511,8 +570,14 @@ def train_high_accuracy_models(df):
         # Predictions for detailed metrics
         y_pred = model.predict(X_test_vec)
         
+        latency = latency_ms(model, X_test_vec)
+        reliability = calibration_report(model, X_test_vec, y_test)
+        
         print(f"   Cross-validation: {cv_mean:.3f} ± {cv_std:.3f}")
         print(f"   Test accuracy: {test_score:.3f}")
+        print(f"   Training (CV + fit): {train_seconds:.2f}s, latency: {latency:.4f} ms/report")
+        print(f"   ECE: {reliability['ece']:.3f} (uncalibrated: {reliability['ece_uncalibrated']}, "
+              f"calibration: {reliability['method']})")
         
         # Store results
         model_results[name] = {
@@ -520,8 +585,13 @@ def train_high_accuracy_models(df):
             'cv_mean': cv_mean,
             'cv_std': cv_std,
             'test_accuracy': test_score,
-            'predictions': y_pred
+            'predictions': y_pred,
+            'train_seconds': train_seconds,
+            'latency_ms': latency,
+            'calibration': reliability
         }
+        if name.endswith(' (dense)'):
+            model_results[name]['projection_seconds'] = projection_seconds
         
         # Track best model
         if cv_mean > best_score:
@@ -531,33 +601,63 @@ def train_high_accuracy_models(df):
     
     # Create ensemble model (Voting Classifier)
     print(f"\n🔧 Training Ensemble Model...")
-    ensemble = VotingClassifier([
-        ('nb', MultinomialNB(alpha=0.1)),
-        ('lr', LogisticRegression(C=10, max_iter=1000, random_state=42, class_weight='balanced')),
-        ('rf', RandomForestClassifier(n_estimators=100, max_depth=15, random_state=42, class_weight='balanced'))
-    ], voting='soft')
+    ensemble = create_ensemble()
     
     # Train ensemble
+    start = time.perf_counter()
     ensemble.fit(X_train_vec, y_train)
-    ensemble_cv = cross_val_score(ensemble, X_train_vec, y_train, cv=5, scoring='accuracy')
+    ensemble_cv, ensemble_oof = cross_val_progress(ensemble, X_train_vec, y_train, 5, progress, 'Ensemble',
+                                                   return_oof=True)
+    # Calibrates the soft-voted output; members keep their own probabilities inside the vote
+    ensemble = uncalibrated_if_worse(calibrate(ensemble, ensemble_oof, y_train, calibration), X_test_vec, y_test)
+    ensemble_seconds = time.perf_counter() - start
+    if progress is not None:
+        progress.step(model='Ensemble', fold=None)
+        progress.result('Ensemble', ensemble_cv.mean())
     ensemble_test = ensemble.score(X_test_vec, y_test)
     ensemble_pred = ensemble.predict(X_test_vec)
     
     print(f"   Ensemble CV: {ensemble_cv.mean():.3f} ± {ensemble_cv.std():.3f}")
     print(f"   Ensemble Test: {ensemble_test:.3f}")
     
-    # Check if ensemble is better
-    if ensemble_cv.mean() > best_score:
-        best_model = ensemble
-        best_name = "Ensemble"
-        best_score = ensemble_cv.mean()
-        model_results["Ensemble"] = {
-            'model': ensemble,
-            'cv_mean': ensemble_cv.mean(),
-            'cv_std': ensemble_cv.std(),
-            'test_accuracy': ensemble_test,
-            'predictions': ensemble_pred
-        }
+    model_results["Ensemble"] = {
+        'model': ensemble,
+        'cv_mean': ensemble_cv.mean(),
+        'cv_std': ensemble_cv.std(),
+        'test_accuracy': ensemble_test,
+        'predictions': ensemble_pred,
+        'train_seconds': ensemble_seconds,
+        'latency_ms': latency_ms(ensemble, X_test_vec),
+        'calibration': calibration_report(ensemble, X_test_vec, y_test)
+    }
+    
+    if dense:
+        from dense_features import compare_paths
+        print(f"\n🧮 Dense ({dense}) vs sparse path:")
+        for name, change in compare_paths(model_results).items():
+            print(f"   {name}: CV {change['cv_delta']:+.3f}, test {change['test_delta']:+.3f}, "
+                  f"training {change['train_speedup']:.1f}x faster, inference {change['latency_speedup']:.1f}x faster")
+    
+    # Bootstrap intervals on the test split; keep the best CV model unless another
+    # model is significantly more accurate on the same resamples. Dense variants rank
+    # after every sparse model, so they only win with a significant test-split lead
+    from bootstrap_metrics import N_RESAMPLES, bootstrap_metrics, paired, select_model
+    if progress is not None:
+        progress.stage('bootstrap')
+    print(f"\n📏 Bootstrapping test metrics ({N_RESAMPLES} resamples)...")
+    bootstrap = bootstrap_metrics(y_test, {name: r['predictions'] for name, r in model_results.items()})
+    preference = sorted(model_results, key=lambda name: (name.endswith(' (dense)'), -model_results[name]['cv_mean']))
+    best_name = select_model(bootstrap, preference)
+    best_model = model_results[best_name]['model']
+    best_score = model_results[best_name]['cv_mean']
+    for name, results in model_results.items():
+        results['bootstrap'] = bootstrap['models'][name]
+        if name != best_name:
+            results['vs_best'] = paired(bootstrap, name, best_name, 'accuracy')
+        ci = results['bootstrap']['accuracy']
+        print(f"   {name}: test accuracy {results['test_accuracy']:.3f} [{ci['low']:.3f}, {ci['high']:.3f}]")
+    if best_name != preference[0]:
+        print(f"   ⚠️ {best_name} is significantly more accurate than the best CV model {preference[0]}")
     
     print(f"\n🏆 Best model: {best_name}")
     print(f"   CV accuracy: {best_score:.3f}")
@@ -570,8 +670,10 @@ def train_high_accuracy_models(df):
     
     return best_model, vectorizer, model_results, best_name
 
-def save_high_accuracy_model(model, vectorizer, model_results, best_name):
+def save_high_accuracy_model(model, vectorizer, model_results, best_name, reference=None):
     """Save the best performing model"""
+    from bootstrap_metrics import CONFIDENCE, N_RESAMPLES
+    from dense_features import compare_paths
     
     print("💾 Saving high-accuracy model...")
     
@@ -595,9 +697,24 @@ def save_high_accuracy_model(model, vectorizer, model_results, best_name):
         "all_model_results": {name: {
             'cv_mean': results['cv_mean'],
             'cv_std': results['cv_std'], 
-            'test_accuracy': results['test_accuracy']
-        } for name, results in model_results.items()}
+            'test_accuracy': results['test_accuracy'],
+            'train_seconds': round(results['train_seconds'], 3),
+            'projection_seconds': round(results['projection_seconds'], 3) if 'projection_seconds' in results else None,
+            'latency_ms': round(results['latency_ms'], 4),
+            'ece': results['calibration']['ece'],
+            'ece_uncalibrated': results['calibration']['ece_uncalibrated'],
+            'calibration_method': results['calibration']['method'],
+            'bootstrap_ci': results.get('bootstrap'),
+            'vs_selected': results.get('vs_best')
+        } for name, results in model_results.items()},
+        "bootstrap": {"n_resamples": N_RESAMPLES, "confidence": CONFIDENCE, "selection": "cv_unless_significantly_worse"}
     }
+    if reference is not None:
+        metadata["reference_distribution"] = reference
+    metadata["calibration"] = model_results[best_name]['calibration']
+    dense_vs_sparse = compare_paths(model_results)
+    if dense_vs_sparse:
+        metadata["dense_vs_sparse"] = dense_vs_sparse
     
     # Save metadata
     with open('model_metadata_high_accuracy.json', 'w') as f:
@@ -608,140 +725,199 @@ def save_high_accuracy_model(model, vectorizer, model_results, best_name):
     print("   - tfidf_vectorizer_high_accuracy.pkl") 
     print("   - model_metadata_high_accuracy.json")
 
-def test_high_accuracy_model():
-    """Test the high accuracy model with sample data"""
+def measure_artifacts(model, vectorizer, texts):
+    """Serialized size, load time and single-report latency of a model/vectorizer pair"""
+    
+    buffer = io.BytesIO()
+    joblib.dump((model, vectorizer), buffer)
+    size_bytes = buffer.tell()
+    
+    buffer.seek(0)
+    start = time.perf_counter()
+    joblib.load(buffer)
+    load_seconds = time.perf_counter() - start
+    
+    # One report at a time, the way the server submits them
+    texts = list(texts)
+    start = time.perf_counter()
+    for text in texts:
+        model.predict_proba(vectorizer.transform([text]))
+    latency_ms = (time.perf_counter() - start) / max(len(texts), 1) * 1000
+    
+    return {
+        'artifact_kb': round(size_bytes / 1024, 1),
+        'load_ms': round(load_seconds * 1000, 2),
+        'latency_ms': round(latency_ms, 3)
+    }
+
+def prune_vocabulary(df, sizes=(100, 250, 500, 1000, 2000, 5000), method='chi2', tolerance=0.01):
+    """Rank n-grams by chi-squared or mutual information and retrain at several vocabulary sizes"""
     
-    print("\n🧪 Testing High-Accuracy Model...")
+    print(f"✂️ Pruning vocabulary by {method}...")
     
-    # Load model
-    model = joblib.load('safety_report_classifier_high_accuracy.pkl')
-    vectorizer = joblib.load('tfidf_vectorizer_high_accuracy.pkl')
+    X_train, X_test, y_train, y_test = split_dataset(df)
     
-    # Test examples
-    test_examples = [
-        ("Real Safety Report", "Someone broke into my dorm room and stole my laptop and textbooks"),
-        ("Real Emergency", "Chemical spill in chemistry lab creating toxic fumes, need immediate evacuation"),
-        ("Fake Spam", "WIN $10000 NOW! Click here for free money! Limited time offer!"),
-        ("Fake Nonsense", "Purple elephants dancing with unicorns in rainbow meadows"),
-        ("Real Harassment", "Professor making inappropriate sexual comments to female students"),
-        ("Fake Marketing", "Lose 30 pounds in 30 days with revolutionary diet pill!")
-    ]
+    full_vectorizer = create_vectorizer()
+    X_train_vec = full_vectorizer.fit_transform(X_train)
+    feature_names = full_vectorizer.get_feature_names_out()
+    
+    # Rank every n-gram once; each size keeps a prefix of the ranking
+    if method == 'mutual_info':
+        scores = mutual_info_classif(X_train_vec, y_train, discrete_features=True, random_state=42)
+    else:
+        scores, _ = chi2(X_train_vec, y_train)
+    ranking = np.argsort(-np.nan_to_num(scores), kind='stable')
     
-    print("📝 Sample Predictions:")
-    for category, text in test_examples:
-        X = vectorizer.transform([text])
-        prediction = model.predict(X)[0]
-        probability = model.predict_proba(X)[0]
-        confidence = max(probability)
+    results = []
+    candidates = {}
+    for size in sorted(set(min(s, len(feature_names)) for s in sizes)):
+        vocabulary = sorted(feature_names[ranking[:size]])
+        vectorizer = create_vectorizer(vocabulary=vocabulary)
+        X_train_sel = vectorizer.fit_transform(X_train)
+        X_test_sel = vectorizer.transform(X_test)
         
-        status = "✅" if (category.startswith("Real") and prediction == "real") or (category.startswith("Fake") and prediction == "fake") else "❌"
+        model = create_ensemble()
+        model.fit(X_train_sel, y_train)
+        accuracy = model.score(X_test_sel, y_test)
         
-        print(f"   {status} {category}: {prediction.upper()} ({confidence:.3f})")
-        print(f"      '{text[:60]}...'")
-
-# Ensure vectorizer is loaded before usage
-vectorizer = joblib.load("tfidf_vectorizer_high_accuracy.pkl")
-
-# Ensure best_model is loaded before usage
-best_model = joblib.load("safety_report_classifier_high_accuracy.pkl")
-
-# Initialize metadata if not already defined
-try:
-    with open("model_metadata.json", "r") as f:
-        metadata = json.load(f)
-except FileNotFoundError:
-    metadata = {}
-
-# === CATEGORY-SPECIFIC VALIDATION (SafeZoneX) ===
-category_tests = {
-    "Suspicious Person": [
-        "A stranger is loitering near the dorm.",
-        "Someone is following me around campus."
-    ],
-    "Harassment": [
-        "A student is being verbally harassed.",
-        "Someone is making inappropriate comments."
-    ],
-    "Safety Hazard": [
-        "There is broken glass on the walkway.",
-        "The fire exit is blocked."
-    ],
-    "Theft": [
-        "My laptop was stolen from the library.",
-        "Someone snatched my bag in the cafeteria."
-    ],
-    "Vandalism": [
-        "Graffiti was found on the wall.",
-        "Someone broke a classroom window."
-    ],
-    "Lost Item": [
-        "I lost my phone near the sports hall.",
-        "My ID card is missing."
-    ],
-    "Fake/Spam": [
-        "Click this link to win a prize!",
-        "Get free money by signing up now."
-    ]
-}
-
-category_results = {}
-for category, examples in category_tests.items():
-    results = []
-    for text in examples:
-        X_input = vectorizer.transform([text])
-        probs = best_model.predict_proba(X_input)[0]
-        pred = best_model.predict(X_input)[0]
-        confidence = max(probs) * 100
-        results.append({
-            "input": text,
-            "predicted": pred,
-            "confidence": round(confidence, 2)
-        })
-    category_results[category] = results
+        row = {'features': size, 'test_accuracy': round(accuracy, 4)}
+        row.update(measure_artifacts(model, vectorizer, X_test))
+        results.append(row)
+        candidates[size] = (model, vectorizer)
+    
+    print(f"\n{'Features':>8} {'Accuracy':>9} {'Size KB':>9} {'Load ms':>8} {'Latency ms':>11}")
+    for row in results:
+        print(f"{row['features']:>8} {row['test_accuracy']:>9.3f} {row['artifact_kb']:>9.1f} "
+              f"{row['load_ms']:>8.2f} {row['latency_ms']:>11.3f}")
+    
+    # Smallest vocabulary within tolerance of the full-size accuracy
+    full_accuracy = results[-1]['test_accuracy']
+    chosen = next(row for row in results if row['test_accuracy'] >= full_accuracy - tolerance)
+    model, vectorizer = candidates[chosen['features']]
+    
+    joblib.dump(model, 'safety_report_classifier_high_accuracy_pruned.pkl')
+    joblib.dump(vectorizer, 'tfidf_vectorizer_high_accuracy_pruned.pkl')
+    
+    metadata = {
+        "model_name": "Ensemble",
+        "training_date": datetime.now().isoformat(),
+        "version": "4.0_high_accuracy_pruned",
+        "selection_method": method,
+        "selected_features": chosen['features'],
+        "test_accuracy": chosen['test_accuracy'],
+        "accuracy_tolerance": tolerance,
+        "size_report": results
+    }
+    with open('model_metadata_high_accuracy_pruned.json', 'w') as f:
+        json.dump(metadata, f, indent=2)
+    
+    print(f"\n✅ Pruned model exported with {chosen['features']} features:")
+    print("   - safety_report_classifier_high_accuracy_pruned.pkl")
+    print("   - tfidf_vectorizer_high_accuracy_pruned.pkl")
+    print("   - model_metadata_high_accuracy_pruned.json")
+    
+    return results
 
-# Log results to console
-print("\n=== Category-Specific Validation ===")
-for category, results in category_results.items():
-    print(f"\n{category}:")
-    for r in results:
-        print(f"  Input: {r['input']}")
-        print(f"  Predicted: {r['predicted']} (Confidence: {r['confidence']}%)")
+def test_high_accuracy_model():
+    """Run the sample-prediction suite against the saved model and record it in the metadata"""
+    from validation_suite import load_suites, run_suites, print_results
+    
+    print("\n🧪 Testing High-Accuracy Model...")
+    
+    model = joblib.load('safety_report_classifier_high_accuracy.pkl')
+    vectorizer = joblib.load('tfidf_vectorizer_high_accuracy.pkl')
+    results = run_suites(model, vectorizer, load_suites(), ['high_accuracy_samples'],
+                         metadata_path='model_metadata_high_accuracy.json')
+    print_results(results, show_cases=True)
+    return results
 
-# Update metadata file with category validation results
-metadata["category_validation"] = category_results
-with open("model_metadata.json", "w") as f:
-    json.dump(metadata, f, indent=4)
+def validate_categories():
+    """Run the category-specific validation suite and log it to model_metadata.json"""
+    from validation_suite import load_suites, run_suites, print_results
+    
+    print("\n=== Category-Specific Validation ===")
+    
+    vectorizer = joblib.load("tfidf_vectorizer_high_accuracy.pkl")
+    best_model = joblib.load("safety_report_classifier_high_accuracy.pkl")
+    results = run_suites(best_model, vectorizer, load_suites(), ['category_validation'],
+                         metadata_path='model_metadata.json', key='category_validation')
+    print_results(results, show_cases=True)
+    return results
 
-# Load vectorizer and best_model
-vectorizer = joblib.load("tfidf_vectorizer_high_accuracy.pkl")
-best_model = joblib.load("safety_report_classifier_high_accuracy.pkl")
+def train_and_save(df, featurize=None, dense=None):
+    """Train and save the best high-accuracy model, validate it, then publish it to the registry.
 
-# Initialize metadata if not already defined
-try:
-    with open("model_metadata.json", "r") as f:
-        metadata = json.load(f)
-except FileNotFoundError:
-    metadata = {}
+    Returns the best model's name and whether the registry activated it (every
+    gated validation suite passed).
+    """
+    
+    from training_status import TrainingProgress
+    progress = TrainingProgress('high_accuracy')
+    try:
+        # Train high-accuracy models
+        best_model, vectorizer, model_results, best_name = train_high_accuracy_models(df, featurize, progress, dense)
+        
+        # Held-out prediction distribution for the drift monitor
+        progress.stage('saving', bestModel=best_name)
+        from drift_monitor import reference_distribution
+        _, X_test, _, _ = split_dataset(df)
+        reference = reference_distribution(best_model, vectorizer, X_test)
+        
+        # Save the best model; the registry version is only published after validation
+        save_high_accuracy_model(best_model, vectorizer, model_results, best_name, reference)
+        
+        # Test the saved candidate; results are written into its metadata
+        progress.stage('validating')
+        validation = test_high_accuracy_model()
+        
+        # Category-specific validation
+        validation.update(validate_categories())
+        
+        # Publish, moving CURRENT only if the gated suites passed
+        progress.stage('publishing')
+        from model_registry import publish_validated
+        _, activated = publish_validated('high_accuracy', 'safety_report_classifier_high_accuracy.pkl',
+                                         'tfidf_vectorizer_high_accuracy.pkl', 'model_metadata_high_accuracy.json',
+                                         validation)
+    except Exception as e:
+        progress.fail(e)
+        raise
+    
+    progress.finish(bestModel=best_name, testAccuracy=round(float(model_results[best_name]['test_accuracy']), 4),
+                    activated=activated)
+    return best_name, activated
 
 if __name__ == "__main__":
     print("🚀 SafeZoneX High-Accuracy ML Training")
     print("=" * 50)
     
+    # Optional low-rank dense candidates: --dense svd | --dense random_projection
+    dense = None
+    if '--dense' in sys.argv:
+        from dense_features import METHODS
+        position = sys.argv.index('--dense') + 1
+        dense = sys.argv[position] if position < len(sys.argv) else None
+        if dense not in METHODS:
+            print(f"❌ --dense needs one of: {', '.join(METHODS)}")
+            sys.exit(2)
+    
     # Create comprehensive dataset
     df = create_comprehensive_dataset()
     
-    # Train high-accuracy models
-    best_model, vectorizer, model_results, best_name = train_high_accuracy_models(df)
-    
-    # Save the best model
-    save_high_accuracy_model(best_model, vectorizer, model_results, best_name)
+    # Optional stage: vocabulary pruning report and pruned export only
+    if '--prune-vocabulary' in sys.argv:
+        method = 'mutual_info' if '--mutual-info' in sys.argv else 'chi2'
+        prune_vocabulary(df, method=method)
+        sys.exit(0)
     
-    # Test the model
-    test_high_accuracy_model()
+    best_name, activated = train_and_save(df, dense=dense)
     
     print(f"\n🎉 HIGH-ACCURACY TRAINING COMPLETED!")
     print("=" * 50)
     print(f"Best Model: {best_name}")
     print(f"Dataset: 275 examples (200 real + 75 fake)")
     print(f"Features: Advanced TF-IDF with n-grams")
-    print("✅ Ready for deployment with improved accuracy!")
\ No newline at end of file
+    if activated:
+        print("✅ Ready for deployment with improved accuracy!")
+    else:
+        print("⚠️ Saved but not activated in the registry: a validation gate failed")
\ No newline at end of file
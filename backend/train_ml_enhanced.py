@@ -1,6 +1,6 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split, cross_val_score
+from sklearn.model_selection import train_test_split
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.naive_bayes import MultinomialNB
 from sklearn.linear_model import LogisticRegression
@@ -268,8 +268,32 @@ def create_comprehensive_dataset():
     
     return df
 
-def train_enhanced_models(df):
-    """Train models with enhanced dataset"""
+def create_vectorizer(vocabulary=None):
+    """Enhanced TF-IDF vectorizer; a fixed vocabulary skips the df/max_features cuts"""
+    return TfidfVectorizer(
+        max_features=2000,  # Increased features
+        stop_words='english',
+        ngram_range=(1, 3),  # Include trigrams
+        min_df=2,  # Minimum document frequency
+        max_df=0.8,  # Maximum document frequency
+        lowercase=True,
+        strip_accents='unicode',
+        vocabulary=vocabulary
+    )
+
+def train_enhanced_models(df, featurize=None, progress=None):
+    """Train models with enhanced dataset
+
+    featurize(X_train, X_test) -> (vectorizer, X_train_vec, X_test_vec) replaces the
+    vectorizer fit, e.g. with features derived from the shared corpus store.
+    progress, a training_status.TrainingProgress, receives stage/model events.
+    Each model's predict_proba is calibrated on its out-of-fold decision scores,
+    with sigmoid, isotonic or no calibration chosen by out-of-fold ECE; a
+    calibrator that raises test ECE is dropped. CV accuracies come from the
+    uncalibrated fold models.
+    """
+    from training_status import cross_val_progress
+    from calibration import calibrate, calibration_report, uncalibrated_if_worse
     print("\n🤖 Training Enhanced ML Models...")
     
     # Prepare features and labels
@@ -286,18 +310,14 @@ def train_enhanced_models(df):
     
     # Enhanced text vectorization
     print("🔤 Vectorizing text with enhanced TF-IDF...")
-    vectorizer = TfidfVectorizer(
-        max_features=2000,  # Increased features
-        stop_words='english',
-        ngram_range=(1, 3),  # Include trigrams
-        min_df=2,  # Minimum document frequency
-        max_df=0.8,  # Maximum document frequency
-        lowercase=True,
-        strip_accents='unicode'
-    )
-    
-    X_train_vec = vectorizer.fit_transform(X_train)
-    X_test_vec = vectorizer.transform(X_test)
+    if progress is not None:
+        progress.stage('vectorizing')
+    if featurize is not None:
+        vectorizer, X_train_vec, X_test_vec = featurize(X_train, X_test)
+    else:
+        vectorizer = create_vectorizer()
+        X_train_vec = vectorizer.fit_transform(X_train)
+        X_test_vec = vectorizer.transform(X_test)
     
     print(f"🔤 Feature dimensions: {X_train_vec.shape[1]}")
     
@@ -322,19 +342,30 @@ def train_enhanced_models(df):
     }
     
     results = {}
+    if progress is not None:
+        # The final fit plus ten CV folds per model
+        progress.total_steps = len(models) * 11
+        progress.stage('training', models=list(models))
     
     for name, model in models.items():
         print(f"\n🔧 Training {name}...")
         
         # Train model
+        if progress is not None:
+            progress.emit(model=name, fold=None)
         model.fit(X_train_vec, y_train)
+        if progress is not None:
+            progress.step(model=name)
         
         # Cross-validation with stratification
-        cv_scores = cross_val_score(
-            model, X_train_vec, y_train, 
-            cv=10, scoring='accuracy', 
-            n_jobs=-1  # Use all cores
+        cv_scores, oof_scores = cross_val_progress(
+            model, X_train_vec, y_train, 10, progress, name,
+            n_jobs=-1,  # Use all cores
+            return_oof=True
         )
+        model = uncalibrated_if_worse(calibrate(model, oof_scores, y_train), X_test_vec, y_test)
+        if progress is not None:
+            progress.result(name, cv_scores.mean())
         
         # Test predictions
         y_pred = model.predict(X_test_vec)
@@ -351,7 +382,8 @@ def train_enhanced_models(df):
             'test_accuracy': test_accuracy,
             'classification_report': class_report,
             'confusion_matrix': conf_matrix.tolist(),
-            'cv_scores': cv_scores.tolist()
+            'cv_scores': cv_scores.tolist(),
+            'calibration': calibration_report(model, X_test_vec, y_test)
         }
         
         print(f"   Cross-validation: {cv_scores.mean():.3f} ± {cv_scores.std():.3f}")
@@ -362,6 +394,9 @@ def train_enhanced_models(df):
         print(f"   Precision (fake): {class_report['fake']['precision']:.3f}")
         print(f"   Recall (fake): {class_report['fake']['recall']:.3f}")
         print(f"   F1-score (fake): {class_report['fake']['f1-score']:.3f}")
+        reliability = results[name]['calibration']
+        print(f"   ECE: {reliability['ece']:.3f} (uncalibrated: {reliability['ece_uncalibrated']}, "
+              f"calibration: {reliability['method']})")
     
     # Select best model
     best_model_name = max(results.keys(), key=lambda k: results[k]['cv_mean'])
@@ -374,97 +409,15 @@ def train_enhanced_models(df):
     return best_model, vectorizer, results, best_model_name
 
 def test_flutter_categories(model, vectorizer):
-    """Test model with examples from each Flutter category"""
+    """Run the Flutter category suite in one batch; returns the suite results"""
+    from validation_suite import load_suites, run_suites, print_results
     print(f"\n🎯 Testing with Flutter App Categories...")
     
-    flutter_test_cases = {
-        'Suspicious Person': [
-            "Unknown person has been watching students and taking photos near dormitory entrance",
-            "Individual following female students from parking lot and asking personal questions"
-        ],
-        'Theft/Robbery': [
-            "Witnessed laptop theft from library table while student was in bathroom",
-            "Group of people breaking into cars in parking lot using crowbar tools"
-        ],
-        'Vandalism': [
-            "Graffiti spray painted all over library walls with inappropriate messages",
-            "Someone smashed multiple windows in student union with rocks and bottles"
-        ],
-        'Drug Activity': [
-            "Suspected drug dealing behind chemistry building with money and package exchange",
-            "Strong marijuana smell and drug paraphernalia found in dormitory bathroom"
-        ],
-        'Harassment': [
-            "Student being sexually harassed by professor during private office hours meeting",
-            "Racial discrimination and verbal abuse toward international students in cafeteria"
-        ],
-        'Safety Hazard': [
-            "Broken staircase railing creating serious fall risk for all students",
-            "Chemical spill in laboratory creating toxic fumes and breathing hazards"
-        ],
-        'Unauthorized Access': [
-            "Unknown person accessed restricted laboratory using stolen faculty keycard",
-            "Individual without credentials entered faculty-only building after hours"
-        ],
-        'Other': [
-            "Power outage affecting entire campus including emergency lighting systems",
-            "Food poisoning outbreak suspected from campus dining hall affecting students"
-        ]
-    }
-    
-    fake_examples = [
-        "WIN $10000 NOW! Click here for free money! Limited time offer!",
-        "Hot singles want to meet you! Create dating profile now!"
-    ]
-    
-    category_results = {}
-    
-    for category, examples in flutter_test_cases.items():
-        print(f"\n📱 {category}:")
-        correct = 0
-        total = len(examples)
-        
-        for example in examples:
-            text_vec = vectorizer.transform([example])
-            prediction = model.predict(text_vec)[0]
-            probabilities = model.predict_proba(text_vec)[0]
-            confidence = max(probabilities)
-            
-            is_correct = prediction == 'real'
-            if is_correct:
-                correct += 1
-            
-            status = "✅" if is_correct else "❌"
-            print(f"   {status} '{example[:60]}...'")
-            print(f"      Prediction: {prediction.upper()} (confidence: {confidence:.3f})")
-        
-        accuracy = correct / total
-        category_results[category] = accuracy
-        print(f"   Category Accuracy: {accuracy:.3f} ({correct}/{total})")
-    
-    # Test fake examples
-    print(f"\n📱 Fake/Spam Examples:")
-    fake_correct = 0
-    for example in fake_examples:
-        text_vec = vectorizer.transform([example])
-        prediction = model.predict(text_vec)[0]
-        probabilities = model.predict_proba(text_vec)[0]
-        confidence = max(probabilities)
-        
-        is_correct = prediction == 'fake'
-        if is_correct:
-            fake_correct += 1
-        
-        status = "✅" if is_correct else "❌"
-        print(f"   {status} '{example[:60]}...'")
-        print(f"      Prediction: {prediction.upper()} (confidence: {confidence:.3f})")
-    
-    fake_accuracy = fake_correct / len(fake_examples)
-    print(f"   Fake Detection Accuracy: {fake_accuracy:.3f} ({fake_correct}/{len(fake_examples)})")
-    
-    return category_results
+    results = run_suites(model, vectorizer, load_suites(), ['flutter_categories'])
+    print_results(results, show_cases=True)
+    return results
 
-def save_enhanced_model(model, vectorizer, results, model_name, category_results):
+def save_enhanced_model(model, vectorizer, results, model_name, category_results, reference=None):
     """Save the enhanced model with comprehensive metadata"""
     print("💾 Saving enhanced model...")
     
@@ -482,6 +435,7 @@ def save_enhanced_model(model, vectorizer, results, model_name, category_results
         'cv_std': results[model_name]['cv_std'],
         'classification_report': results[model_name]['classification_report'],
         'confusion_matrix': results[model_name]['confusion_matrix'],
+        'calibration': results[model_name]['calibration'],
         'flutter_category_accuracy': category_results,
         'notes': 'Enhanced model with comprehensive dataset matching Flutter app categories',
         'flutter_categories': [
@@ -489,6 +443,8 @@ def save_enhanced_model(model, vectorizer, results, model_name, category_results
             'Harassment', 'Safety Hazard', 'Unauthorized Access', 'Other'
         ]
     }
+    if reference is not None:
+        metadata['reference_distribution'] = reference
     
     with open('model_metadata_enhanced.json', 'w') as f:
         json.dump(metadata, f, indent=2)
@@ -498,20 +454,54 @@ def save_enhanced_model(model, vectorizer, results, model_name, category_results
     print("   - tfidf_vectorizer_enhanced.pkl") 
     print("   - model_metadata_enhanced.json")
 
-def main():
-    """Main enhanced training pipeline"""
+def train_and_save(df, featurize=None):
+    """Train, validate and save the best enhanced model, then publish it to the registry.
+
+    Returns the per-model results, the best model's name and whether the registry
+    activated it (every gated validation suite passed).
+    """
+    from training_status import TrainingProgress
+    progress = TrainingProgress('enhanced')
     try:
-        # Create comprehensive dataset
-        df = create_comprehensive_dataset()
-        
         # Train enhanced models
-        best_model, vectorizer, results, model_name = train_enhanced_models(df)
+        best_model, vectorizer, results, model_name = train_enhanced_models(df, featurize, progress)
         
         # Test with Flutter categories
-        category_results = test_flutter_categories(best_model, vectorizer)
+        progress.stage('validating', bestModel=model_name)
+        validation = test_flutter_categories(best_model, vectorizer)
+        category_results = validation['flutter_categories']['by_category']
+        
+        # Held-out prediction and category distribution for the drift monitor
+        progress.stage('saving')
+        from drift_monitor import reference_distribution
+        _, test_df = train_test_split(df, test_size=0.25, random_state=42, stratify=df['label'])
+        reference = reference_distribution(best_model, vectorizer, test_df['content'],
+                                           test_df['flutter_category'])
         
         # Save enhanced model
-        save_enhanced_model(best_model, vectorizer, results, model_name, category_results)
+        save_enhanced_model(best_model, vectorizer, results, model_name, category_results, reference)
+        
+        # Publish, moving CURRENT only if the gated suites passed
+        progress.stage('publishing')
+        from model_registry import publish_validated
+        _, activated = publish_validated('enhanced', 'safety_report_classifier_enhanced.pkl',
+                                         'tfidf_vectorizer_enhanced.pkl', 'model_metadata_enhanced.json',
+                                         validation)
+    except Exception as e:
+        progress.fail(e)
+        raise
+    
+    progress.finish(bestModel=model_name, testAccuracy=round(float(results[model_name]['test_accuracy']), 4),
+                    activated=activated)
+    return results, model_name, activated
+
+def main():
+    """Main enhanced training pipeline"""
+    try:
+        # Create comprehensive dataset
+        df = create_comprehensive_dataset()
+        
+        results, model_name, activated = train_and_save(df)
         
         print("\n" + "="*70)
         print("🎉 ENHANCED TRAINING COMPLETED!")
@@ -521,7 +511,10 @@ def main():
         print(f"Test Accuracy: {results[model_name]['test_accuracy']:.3f}")
         print(f"Dataset Size: {len(df)} examples")
         print(f"Features: Enhanced with Flutter app categories")
-        print("✅ Model ready for deployment with Flutter app!")
+        if activated:
+            print("✅ Model ready for deployment with Flutter app!")
+        else:
+            print("⚠️ Model saved but not activated in the registry: a validation gate failed")
         
     except Exception as e:
         print(f"❌ Enhanced training failed: {e}")
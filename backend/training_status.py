@@ -0,0 +1,206 @@
+"""
+SafeZoneX Training Status
+Structured progress events from the trainers, written to an atomically replaced status file
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+
+STATUS_PATH = 'training_status.json'
+# Minimum seconds between routine writes; stage changes and the final state always go out
+MIN_INTERVAL = 1.0
+# A running status not refreshed for this long is reported as stale (trainer killed or hung)
+STALE_AFTER = 120
+
+def _resource_usage():
+    """Process CPU seconds and resident memory in MB, from the stdlib"""
+    times = os.times()
+    cpu = times.user + times.system
+    memory = None
+    try:
+        with open('/proc/self/statm') as f:
+            memory = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except (OSError, ValueError):
+        try:
+            import resource
+            # Peak rather than current RSS where /proc is unavailable (KB on Linux, bytes on macOS)
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            memory = peak / 1e6 if os.uname().sysname == 'Darwin' else peak / 1e3
+        except (ImportError, AttributeError):
+            pass
+    return cpu, memory
+
+def write_status(status, path=STATUS_PATH):
+    """Replace the status file in one rename so readers never see a partial write"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.training_status.')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(status, f, indent=2)
+    os.replace(tmp, path)
+
+class TrainingProgress:
+    """Progress of one training run: stage, model, fold, ETA, best score and resource use.
+
+    total_steps counts the units of work (e.g. CV folds plus final fits over all
+    models) the ETA is extrapolated from; step() marks one done.
+    """
+
+    def __init__(self, trainer, total_steps=None, path=STATUS_PATH, min_interval=MIN_INTERVAL):
+        self.path = path
+        self.min_interval = min_interval
+        self.total_steps = total_steps
+        self.steps = 0
+        self.started = time.time()
+        self.last_write = 0.0
+        self.last_cpu = (time.perf_counter(), _resource_usage()[0])
+        self.status = {
+            'trainer': trainer,
+            'pid': os.getpid(),
+            'status': 'running',
+            'startedAt': datetime.now().isoformat(),
+            'stage': None,
+            'model': None,
+            'fold': None,
+            'folds': None,
+            'bestScore': None,
+            'bestModel': None,
+            'history': []
+        }
+        self.emit(force=True)
+
+    def _usage(self):
+        wall, cpu = time.perf_counter(), _resource_usage()
+        previous_wall, previous_cpu = self.last_cpu
+        self.last_cpu = (wall, cpu[0])
+        # CPU use since the previous write, in cores (2.0 = two cores busy)
+        cores = (cpu[0] - previous_cpu) / (wall - previous_wall) if wall > previous_wall else None
+        return {'cpuCores': None if cores is None else round(cores, 2),
+                'cpuSeconds': round(cpu[0], 1),
+                'memoryMB': None if cpu[1] is None else round(cpu[1], 1)}
+
+    def emit(self, force=False, **fields):
+        """Merge fields into the status and write it if the rate limit allows"""
+        self.status.update(fields)
+        now = time.time()
+        if not force and now - self.last_write < self.min_interval:
+            return
+        elapsed = now - self.started
+        eta = None
+        if self.total_steps and self.steps:
+            eta = elapsed / self.steps * max(self.total_steps - self.steps, 0)
+        self.status.update({
+            'updatedAt': datetime.now().isoformat(),
+            'elapsedSeconds': round(elapsed, 1),
+            'etaSeconds': None if eta is None else round(eta, 1),
+            'progress': round(self.steps / self.total_steps, 3) if self.total_steps else None,
+            'resources': self._usage()
+        })
+        write_status(self.status, self.path)
+        self.last_write = now
+
+    def stage(self, name, **fields):
+        self.emit(force=True, stage=name, model=None, fold=None, folds=None, **fields)
+
+    def step(self, n=1, **fields):
+        self.steps += n
+        self.emit(**fields)
+
+    def result(self, model, score):
+        """Record a model's selection score and keep the best one seen so far"""
+        self.status['history'].append({'model': model, 'score': round(float(score), 4),
+                                       'elapsedSeconds': round(time.time() - self.started, 1)})
+        if self.status['bestScore'] is None or score > self.status['bestScore']:
+            self.status['bestScore'] = round(float(score), 4)
+            self.status['bestModel'] = model
+        self.emit(force=True)
+
+    def finish(self, **fields):
+        self.steps = self.total_steps or self.steps
+        self.emit(force=True, status='completed', stage='done', model=None, fold=None, folds=None,
+                  finishedAt=datetime.now().isoformat(), **fields)
+
+    def fail(self, error):
+        self.emit(force=True, status='failed', error=str(error), finishedAt=datetime.now().isoformat())
+
+def _fit_fold(model, X, y, train, test, return_oof):
+    from sklearn.base import clone
+    fitted = clone(model).fit(X[train], y[train])
+    oof = None
+    if return_oof:
+        from calibration import decision_scores
+        oof = decision_scores(fitted, X[test])
+    return fitted.score(X[test], y[test]), oof
+
+def cross_val_progress(model, X, y, cv, progress=None, name=None, n_jobs=None, return_oof=False):
+    """cross_val_score accuracy (same StratifiedKFold splits) with a progress event per fold.
+
+    Folds run one by one so each can be reported; with n_jobs set they run in
+    parallel and progress advances once all are done. return_oof also returns
+    each training row's decision score from the fold that held it out.
+    """
+    from joblib import Parallel, delayed
+    from sklearn.model_selection import StratifiedKFold
+    import numpy as np
+
+    y = np.asarray(y)
+    folds = list(StratifiedKFold(cv).split(X, y))
+    if n_jobs in (None, 1):
+        results = []
+        for fold, (train, test) in enumerate(folds, 1):
+            if progress is not None:
+                progress.emit(model=name, fold=fold, folds=cv)
+            results.append(_fit_fold(model, X, y, train, test, return_oof))
+            if progress is not None:
+                progress.step(model=name, fold=fold, folds=cv)
+    else:
+        results = Parallel(n_jobs=n_jobs)(delayed(_fit_fold)(model, X, y, train, test, return_oof)
+                                          for train, test in folds)
+        if progress is not None:
+            progress.step(cv, model=name, fold=cv, folds=cv)
+
+    scores = np.array([score for score, _ in results])
+    if not return_oof:
+        return scores
+    oof = np.empty(len(y))
+    for (_, test), (_, fold_scores) in zip(folds, results):
+        oof[test] = fold_scores
+    return scores, oof
+
+def read_status(path=STATUS_PATH, stale_after=STALE_AFTER):
+    """Latest status, or an idle placeholder; running states that stopped updating are marked stale"""
+    try:
+        with open(path, 'r') as f:
+            status = json.load(f)
+    except FileNotFoundError:
+        return {'status': 'idle', 'message': 'No training run recorded'}
+    if status.get('status') == 'running':
+        age = (datetime.now() - datetime.fromisoformat(status['updatedAt'])).total_seconds()
+        status['secondsSinceUpdate'] = round(age, 1)
+        status['stale'] = age > stale_after
+    return status
+
+def main():
+    parser = argparse.ArgumentParser(description='Show the progress of the current or last training run')
+    parser.add_argument('--path', default=STATUS_PATH)
+    parser.add_argument('--watch', action='store_true', help='Refresh every second until the run ends')
+    args = parser.parse_args()
+
+    while True:
+        status = read_status(args.path)
+        if not args.watch:
+            print(json.dumps(status, indent=2))
+            return
+        eta = status.get('etaSeconds')
+        print(f"⏱️ {status.get('trainer', '-')} {status['status']} | stage {status.get('stage')} | "
+              f"model {status.get('model')} fold {status.get('fold')}/{status.get('folds')} | "
+              f"best {status.get('bestScore')} ({status.get('bestModel')}) | "
+              f"ETA {'-' if eta is None else f'{eta:.0f}s'}", flush=True)
+        if status['status'] != 'running' or status.get('stale'):
+            return
+        time.sleep(1)
+
+if __name__ == "__main__":
+    main()
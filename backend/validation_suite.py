@@ -0,0 +1,154 @@
+"""
+SafeZoneX Validation Suites
+Runs declarative regression suites against any classifier artifact, one batch per suite
+"""
+import argparse
+import json
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+
+SUITES_PATH = 'validation_suites.json'
+# Failing cases recorded per suite in metadata; the counts always cover every case
+MAX_RECORDED_FAILURES = 50
+
+def load_suites(path=SUITES_PATH):
+    """{suite name: [case, ...]} from a JSON or YAML suite file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("YAML suite files need PyYAML (pip install pyyaml)")
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    return data['suites']
+
+def load_gates(path=SUITES_PATH):
+    """{suite name: minimum pass rate} a model must meet before the registry activates it"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith(('.yaml', '.yml')):
+            import yaml
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    return data.get('gates', {})
+
+def gate_failures(results, gates=None):
+    """Suites in results whose pass rate is below their gate; an empty list means activate"""
+    gates = load_gates() if gates is None else gates
+    return [f"{name} passed {result['passed']}/{result['cases']} (needs {gates[name]:.0%})"
+            for name, result in results.items()
+            if name in gates and result['cases'] and result['pass_rate'] < gates[name]]
+
+def run_suite(model, vectorizer, cases):
+    """Score every case of a suite in one transform/predict_proba call"""
+    texts = [case['input'] for case in cases]
+    start = time.perf_counter()
+    probabilities = model.predict_proba(vectorizer.transform(texts))
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    classes = np.asarray(model.classes_)
+    # Same 0.5 threshold on the positive class as inference and CalibratedModel.predict
+    predicted = classes[(probabilities[:, 1] >= 0.5).astype(int)]
+    confidence = probabilities.max(axis=1)
+    expected = np.array([case.get('expected_label') for case in cases], dtype=object)
+    min_confidence = np.array([case.get('min_confidence', 0.0) for case in cases], dtype=np.float64)
+    categories = np.array([case.get('category', 'Uncategorised') for case in cases], dtype=object)
+
+    checked = np.array([label is not None for label in expected], dtype=bool)
+    label_ok = ~checked | (predicted == expected)
+    passed = label_ok & (confidence >= min_confidence)
+
+    by_category = {}
+    for category in dict.fromkeys(categories):
+        mask = categories == category
+        by_category[category] = round(float(passed[mask].mean()), 4)
+
+    failures = [{
+        'input': cases[i]['input'],
+        'category': str(categories[i]),
+        'expected': cases[i].get('expected_label'),
+        'predicted': str(predicted[i]),
+        'confidence': round(float(confidence[i]) * 100, 2)
+    } for i in np.flatnonzero(~passed)[:MAX_RECORDED_FAILURES]]
+
+    return {
+        'cases': len(cases),
+        'passed': int(passed.sum()),
+        'failed': int((~passed).sum()),
+        'pass_rate': round(float(passed.mean()), 4) if len(cases) else None,
+        'batch_ms': round(elapsed_ms, 3),
+        'ms_per_case': round(elapsed_ms / len(cases), 4) if len(cases) else None,
+        'by_category': by_category,
+        'failures': failures,
+        'predictions': [{'input': text, 'predicted': str(p), 'confidence': round(float(c) * 100, 2),
+                         'passed': bool(ok)}
+                        for text, p, c, ok in zip(texts, predicted, confidence, passed)]
+    }
+
+def run_suites(model, vectorizer, suites, names=None, metadata_path=None, key='validation'):
+    """Run the named suites (all by default); optionally record the results under metadata[key]"""
+    names = names or list(suites)
+    results = {name: run_suite(model, vectorizer, suites[name]) for name in names}
+
+    if metadata_path:
+        try:
+            with open(metadata_path, 'r') as f:
+                metadata = json.load(f)
+        except FileNotFoundError:
+            metadata = {}
+        recorded = metadata.get(key, {})
+        for name, result in results.items():
+            # Per-case predictions stay out of the metadata; failures and counts are enough to track
+            recorded[name] = {k: v for k, v in result.items() if k != 'predictions'}
+            recorded[name]['run_at'] = datetime.now().isoformat()
+        metadata[key] = recorded
+        with open(metadata_path, 'w') as f:
+            json.dump(metadata, f, indent=2)
+    return results
+
+def print_results(results, show_cases=False):
+    for name, result in results.items():
+        status = "✅" if not result['failed'] else "❌"
+        print(f"\n{status} {name}: {result['passed']}/{result['cases']} passed "
+              f"({result['batch_ms']:.1f} ms, {result['ms_per_case']} ms/case)")
+        for category, rate in result['by_category'].items():
+            print(f"   {category}: {rate:.3f}")
+        if show_cases:
+            for case in result['predictions']:
+                mark = "✅" if case['passed'] else "❌"
+                print(f"   {mark} {case['predicted'].upper()} ({case['confidence']}%) '{case['input'][:60]}'")
+        else:
+            for failure in result['failures']:
+                print(f"   ❌ expected {failure['expected']}, got {failure['predicted']} "
+                      f"({failure['confidence']}%): '{failure['input'][:60]}'")
+
+def main():
+    from inference import FAMILIES, DEFAULT_FAMILY
+
+    parser = argparse.ArgumentParser(description='Run validation suites against a classifier artifact')
+    parser.add_argument('--suites', default=SUITES_PATH)
+    parser.add_argument('--suite', action='append', help='Suite to run (repeatable); default all')
+    parser.add_argument('--family', choices=sorted(FAMILIES), default=DEFAULT_FAMILY)
+    parser.add_argument('--model', help='Model .pkl (overrides --family)')
+    parser.add_argument('--vectorizer', help='Vectorizer .pkl (overrides --family)')
+    parser.add_argument('--metadata', help='Metadata JSON to record results in (default: the family\'s)')
+    parser.add_argument('--no-record', action='store_true')
+    args = parser.parse_args()
+
+    paths = FAMILIES[args.family]
+    model = joblib.load(args.model or paths['model'])
+    vectorizer = joblib.load(args.vectorizer or paths['vectorizer'])
+    metadata_path = None if args.no_record else (args.metadata or (None if args.model else paths['metadata']))
+
+    results = run_suites(model, vectorizer, load_suites(args.suites), args.suite, metadata_path)
+    print_results(results)
+    if metadata_path:
+        print(f"\n✅ Results recorded in {metadata_path}")
+
+if __name__ == "__main__":
+    main()